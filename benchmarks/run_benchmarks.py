@@ -0,0 +1,266 @@
+# benchmarks/run_benchmarks.py
+#
+# Times the hot functions of both analyses on synthetic MRIO tables and records their
+# peak memory. Results are written to JSON so two runs (e.g. before and after a change)
+# can be compared:
+#
+#   python benchmarks/run_benchmarks.py --output before.json
+#   python benchmarks/run_benchmarks.py --output after.json --compare before.json
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# Extend sys.path to access config, shared modules and the modules of both parts
+sys.path.append(str(ROOT_DIR))
+sys.path.append(str(ROOT_DIR / "part_systemically_significant_prices" / "src"))
+sys.path.append(str(ROOT_DIR / "part_gas_price_shock" / "src"))
+
+import numpy as np
+import pandas as pd
+
+from config import AGGREGATION_MAPPING_FIGARO_SYSTEMIC, EU28_COUNTRIES
+from shared.aggregation import aggregate_sectors
+from shared.cpi_weights import new_apply_all_available_cpi_weights
+from shared.extraction import extract_Z_matrix, extract_X_vector, FINAL_DEMAND_CODES
+from shared.technical_coefficients import calculate_technical_coefficients
+from analyze_unweighted_shocks import compute_unweighted_shocks
+from b_sector_split import compute_b_gas_share_matrix, apply_b_gas_weights, split_b_sector, merge_countries
+from synthetic_mrio import (
+    make_figaro_table, make_price_volatility, make_gas_split_matrix, make_cpi_weight_inputs,
+)
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+BENCHMARKS = [
+    "technical_coefficients", "unweighted_shocks", "cpi_weighted_impacts",
+    "b_gas_share_matrix", "apply_b_gas_weights", "aggregate_sectors", "merge_countries",
+]
+
+
+def measure(func: Callable, setup: Callable[[], tuple], repeat: int = 3) -> dict:
+    """
+    Time func(*setup()) repeat times and record its peak memory in one extra traced run.
+
+    setup is called before every run and is not timed, so functions that modify their
+    input in place always start from fresh data. Output of the benchmarked function
+    (progress bars, prints) is suppressed.
+
+    Returns:
+        dict: times_s, min_s, median_s and peak_memory_mb.
+    """
+    times = []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        for _ in range(repeat):
+            args = setup()
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+
+        # tracemalloc slows allocation down, so memory is measured separately from timing
+        args = setup()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "times_s": times,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def build_cases(n_countries: int, n_sectors: int, density: float, seed: int, workdir: Path) -> dict:
+    """
+    Build the synthetic inputs once and return {benchmark name: (func, setup)}.
+    """
+    table = make_figaro_table(n_countries, n_sectors, density, seed)
+    Z = extract_Z_matrix(table)
+    X = extract_X_vector(table, FINAL_DEMAND_CODES)
+    A = calculate_technical_coefficients(Z, X)
+    price_vol = make_price_volatility(A.index, seed=seed)
+
+    region_maps = {"individual": None, "eu28": {c: "EU28" for c in EU28_COUNTRIES}}
+    cpi_paths = make_cpi_weight_inputs(table, price_vol, region_maps, workdir, seed=seed)
+
+    exio_Z = make_gas_split_matrix(n_countries, n_sectors, density, seed)
+    A_split = split_b_sector(A.copy())
+    gas_weights = compute_b_gas_share_matrix(exio_Z)
+
+    countries = table.index.get_level_values("Country").unique()
+    countries_to_merge = [c for c in countries if c not in EU28_COUNTRIES and c not in ("W2", "GO")][:3] or list(countries[-2:])
+
+    return {
+        "technical_coefficients": (calculate_technical_coefficients, lambda: (Z, X)),
+        "unweighted_shocks": (
+            lambda A, vol: compute_unweighted_shocks(A, 0, price_vol=vol, output_dir=workdir / "unweighted"),
+            lambda: (A, price_vol),
+        ),
+        "cpi_weighted_impacts": (
+            lambda: new_apply_all_available_cpi_weights(
+                year=2019,
+                unweighted_impacts_path=cpi_paths["unweighted"],
+                price_volatility_path=cpi_paths["price_volatility"],
+                cpi_weights_root=cpi_paths["cpi_weights_root"],
+                output_dir=cpi_paths["output_dir"],
+            ),
+            lambda: (),
+        ),
+        "b_gas_share_matrix": (compute_b_gas_share_matrix, lambda: (exio_Z,)),
+        "apply_b_gas_weights": (apply_b_gas_weights, lambda: (A_split, gas_weights)),
+        # Both relabel their input in place
+        "aggregate_sectors": (aggregate_sectors, lambda: (table.copy(), AGGREGATION_MAPPING_FIGARO_SYSTEMIC)),
+        "merge_countries": (merge_countries, lambda: (table.copy(), countries_to_merge)),
+    }
+
+
+def run_suite(
+    n_countries: int = 4,
+    n_sectors: int = 64,
+    density: float = 0.3,
+    repeat: int = 3,
+    seed: int = 0,
+    only: Optional[Iterable[str]] = None
+) -> dict:
+    """
+    Run the benchmark suite on a synthetic table of n_countries x n_sectors industries.
+
+    Parameters:
+        n_countries (int): Number of countries in the synthetic table.
+        n_sectors (int): Number of industries per country (64 = FIGARO).
+        density (float): Share of nonzero flows.
+        repeat (int): Timed runs per benchmark.
+        seed (int): Random seed for the synthetic data.
+        only (Iterable[str] | None): Subset of BENCHMARKS to run.
+
+    Returns:
+        dict: Run metadata and one entry per benchmark (see measure).
+    """
+    names = list(only) if only else BENCHMARKS
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {sorted(unknown)}. Available: {BENCHMARKS}")
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "parameters": {"countries": n_countries, "sectors": n_sectors, "density": density, "repeat": repeat, "seed": seed},
+        "benchmarks": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="mrio_bench_") as workdir:
+        print(f"Generating synthetic MRIO: {n_countries} countries x {n_sectors} sectors, density {density}")
+        cases = build_cases(n_countries, n_sectors, density, seed, Path(workdir))
+
+        for name in names:
+            func, setup = cases[name]
+            result = measure(func, setup, repeat)
+            results["benchmarks"][name] = result
+            print(f"{name:<26}{result['median_s']:>10.3f} s{result['peak_memory_mb']:>10.1f} MB")
+
+    return results
+
+
+def save_results(results: dict, output_path: Optional[Path] = None) -> Path:
+    """
+    Write benchmark results to JSON (default: benchmarks/results/benchmark_<timestamp>.json).
+    """
+    if output_path is None:
+        output_path = RESULTS_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved benchmark results to {output_path}")
+    return output_path
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1) -> list[str]:
+    """
+    Print median time and peak memory of two runs side by side.
+
+    Parameters:
+        baseline (dict): Earlier results (as written by save_results).
+        current (dict): New results.
+        threshold (float): Relative slowdown or memory growth reported as a regression (default: 10%).
+
+    Returns:
+        list[str]: Names of benchmarks that regressed.
+    """
+    if baseline.get("parameters") != current.get("parameters"):
+        print(f"Warning: parameters differ ({baseline.get('parameters')} vs {current.get('parameters')})")
+
+    regressions = []
+    print(f"{'benchmark':<26}{'before [s]':>12}{'after [s]':>12}{'ratio':>8}{'mem before':>12}{'mem after':>12}")
+    for name, new in current["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if old is None:
+            print(f"{name:<26}{'-':>12}{new['median_s']:>12.3f}")
+            continue
+
+        ratio = new["median_s"] / old["median_s"] if old["median_s"] > 0 else float("inf")
+        mem_ratio = new["peak_memory_mb"] / old["peak_memory_mb"] if old["peak_memory_mb"] > 0 else 1.0
+        flag = ""
+        if ratio > 1 + threshold or mem_ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  <- regression"
+        print(
+            f"{name:<26}{old['median_s']:>12.3f}{new['median_s']:>12.3f}{ratio:>8.2f}"
+            f"{old['peak_memory_mb']:>10.1f}MB{new['peak_memory_mb']:>10.1f}MB{flag}"
+        )
+    return regressions
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the suite options to a parser (shared with 'cli.py bench --suite').
+    """
+    parser.add_argument("--countries", type=int, default=4, help="Countries in the synthetic table (default: 4).")
+    parser.add_argument("--sectors", type=int, default=64, help="Sectors per country (default: 64).")
+    parser.add_argument("--density", type=float, default=0.3, help="Share of nonzero flows (default: 0.3).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (default: 3).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Run only these benchmarks.")
+    parser.add_argument("--output", type=Path, help="JSON output path (default: benchmarks/results/benchmark_<timestamp>.json).")
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against.")
+
+
+def run_from_args(args: argparse.Namespace) -> list[str]:
+    results = run_suite(args.countries, args.sectors, args.density, args.repeat, args.seed, args.only)
+    save_results(results, args.output)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            return compare_results(json.load(f), results)
+    return []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the hot functions on a synthetic MRIO table.")
+    add_arguments(parser)
+    regressions = run_from_args(parser.parse_args())
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,202 @@
+# benchmarks/synthetic_mrio.py
+#
+# Synthetic multi-regional input-output tables with the same layout as the processed
+# FIGARO tables: (Country, Sector) MultiIndex on both axes, industry rows followed by
+# value added rows ('W2', ...) and the gross output row ('GO', 'GO'), industry columns
+# followed by final demand columns (country, P3_S13 / P3_S14 / ...).
+
+import sys
+from pathlib import Path
+
+# Extend sys.path to access config and shared modules
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+
+from shared.extraction import FINAL_DEMAND_CODES, VALUE_ADDED_CODES
+
+# FIGARO industry codes (64 NACE Rev. 2 sectors), in FIGARO order
+FIGARO_SECTORS = [
+    "A01", "A02", "A03", "B", "C10-C12", "C13-C15", "C16", "C17", "C18", "C19", "C20", "C21",
+    "C22", "C23", "C24", "C25", "C26", "C27", "C28", "C29", "C30", "C31_32", "C33", "D35",
+    "E36", "E37-E39", "F", "G45", "G46", "G47", "H49", "H50", "H51", "H52", "H53", "I",
+    "J58", "J59_60", "J61", "J62_63", "K64", "K65", "K66", "L68", "M69_70", "M71", "M72", "M73",
+    "M74_75", "N77", "N78", "N79", "N80-N82", "O84", "P85", "Q86", "Q87_88", "R90-R92", "R93",
+    "S94", "S95", "S96", "T", "U",
+]
+
+# EU28 first so that the EU28/regional CPI weighting schemes find their countries
+FIGARO_COUNTRIES = [
+    "AT", "BE", "BG", "HR", "CY", "CZ", "DK", "EE", "FI", "FR", "DE", "GR", "HU", "IE",
+    "IT", "LV", "LT", "LU", "MT", "NL", "PL", "PT", "RO", "SK", "SI", "ES", "SE", "GB",
+    "AR", "AU", "BR", "CA", "CH", "CN", "ID", "IN", "JP", "KR", "MX", "NO", "RU", "SA",
+    "TR", "US", "ZA", "FIGW1",
+]
+
+
+def synthetic_labels(n_countries: int, n_sectors: int) -> tuple[list[str], list[str]]:
+    """
+    Return country and sector codes for a synthetic table.
+
+    Real FIGARO codes are used as long as there are enough of them ('B' is always included,
+    since the gas part splits it); beyond that, codes 'X001', ... and 'S001', ... are generated.
+    """
+    countries = FIGARO_COUNTRIES[:n_countries]
+    countries += [f"X{i:03d}" for i in range(n_countries - len(countries))]
+
+    sectors = FIGARO_SECTORS[:n_sectors]
+    if "B" not in sectors and n_sectors > 0:
+        sectors[-1] = "B"
+    sectors += [f"S{i:03d}" for i in range(n_sectors - len(sectors))]
+    return countries, sectors
+
+
+def _sparse_random(rng: np.random.Generator, shape: tuple[int, int], density: float) -> np.ndarray:
+    """
+    Lognormal flows with a given share of nonzero entries.
+    """
+    values = rng.lognormal(mean=0.0, sigma=1.5, size=shape)
+    values[rng.random(shape) >= density] = 0.0
+    return values
+
+
+def make_figaro_table(
+    n_countries: int = 8,
+    n_sectors: int = 20,
+    density: float = 0.3,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Generate a processed FIGARO-shaped full table.
+
+    Intermediate flows are sparse lognormal values with a fully populated diagonal, and
+    value added is drawn so that every industry column sum (gross output) exceeds its
+    intermediate inputs. The resulting A therefore has column sums below one and I - A
+    (and every principal submatrix of it) is invertible.
+
+    Parameters:
+        n_countries (int): Number of countries.
+        n_sectors (int): Number of industries per country.
+        density (float): Share of nonzero intermediate and final demand flows (0 < density <= 1).
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: Table with ('GO', 'GO') row, MultiIndex (Country, Sector) on both axes.
+    """
+    rng = np.random.default_rng(seed)
+    countries, sectors = synthetic_labels(n_countries, n_sectors)
+    n = n_countries * n_sectors
+
+    industries = pd.MultiIndex.from_product([countries, sectors], names=["Country", "Sector"])
+    final_demand = pd.MultiIndex.from_product([countries, sorted(FINAL_DEMAND_CODES)], names=["Country", "Sector"])
+    value_added = pd.MultiIndex.from_product([["W2"], sorted(VALUE_ADDED_CODES)], names=["Country", "Sector"])
+
+    Z = _sparse_random(rng, (n, n), density)
+    np.fill_diagonal(Z, rng.lognormal(mean=1.0, sigma=1.0, size=n))
+    Y = _sparse_random(rng, (n, len(final_demand)), density) * n_sectors
+
+    # Value added of 30-120% of intermediate inputs (plus a floor for empty columns)
+    total_va = Z.sum(axis=0) * rng.uniform(0.3, 1.2, size=n) + 1.0
+    va_shares = rng.dirichlet(np.ones(len(value_added)), size=n).T
+    VA = np.hstack([va_shares * total_va, np.zeros((len(value_added), len(final_demand)))])
+
+    body = np.vstack([np.hstack([Z, Y]), VA])
+    index = industries.append(value_added)
+    columns = industries.append(final_demand)
+    df = pd.DataFrame(body, index=index, columns=columns)
+
+    gross_output = pd.DataFrame([df.sum(axis=0).values], index=pd.MultiIndex.from_tuples([("GO", "GO")]), columns=columns)
+    df = pd.concat([df, gross_output])
+    df.index.names = ["Country", "Sector"]
+    df.columns.names = ["Country", "Sector"]
+    return df
+
+
+def make_price_volatility(index: pd.MultiIndex, zero_share: float = 0.05, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a sector price volatility table like the SEA output (column 'price_volatility').
+    A small share of sectors gets zero volatility, as in the real data.
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.gamma(shape=2.0, scale=0.02, size=len(index))
+    values[rng.random(len(index)) < zero_share] = 0.0
+    return pd.DataFrame({"price_volatility": values}, index=index)
+
+
+def split_b_labels(index: pd.MultiIndex) -> pd.MultiIndex:
+    """
+    Replace each (country, 'B') label by (country, 'B_gas') and (country, 'B_nongas').
+    """
+    labels = []
+    for country, sector in index:
+        if sector == "B":
+            labels.extend([(country, "B_gas"), (country, "B_nongas")])
+        else:
+            labels.append((country, sector))
+    return pd.MultiIndex.from_tuples(labels, names=["Country", "Sector"])
+
+
+def make_gas_split_matrix(
+    n_countries: int = 8,
+    n_sectors: int = 20,
+    density: float = 0.3,
+    seed: int = 0,
+    zero_b_share: float = 0.1
+) -> pd.DataFrame:
+    """
+    Generate an EXIOBASE-like Z matrix in which sector B is already split into B_gas and B_nongas.
+
+    Some B_gas/B_nongas rows and columns are zeroed so that the zero-total branches of
+    compute_b_gas_share_matrix are exercised as well.
+    """
+    rng = np.random.default_rng(seed)
+    countries, sectors = synthetic_labels(n_countries, n_sectors)
+    labels = split_b_labels(pd.MultiIndex.from_product([countries, sectors]))
+
+    Z = _sparse_random(rng, (len(labels), len(labels)), density)
+    is_b = labels.get_level_values("Sector").isin(["B_gas", "B_nongas"])
+    zeroed = is_b & (rng.random(len(labels)) < zero_b_share)
+    Z[zeroed, :] = 0.0
+    Z[:, zeroed] = 0.0
+    return pd.DataFrame(Z, index=labels, columns=labels)
+
+
+def make_cpi_weight_inputs(
+    table: pd.DataFrame,
+    price_vol: pd.DataFrame,
+    region_maps: dict,
+    root: Path,
+    year: int = 2019,
+    seed: int = 0
+) -> dict[str, Path]:
+    """
+    Write everything new_apply_all_available_cpi_weights reads to disk under root.
+
+    CPI weights are computed from the synthetic table with the real calculate_cpi_weights;
+    the unweighted impacts are random (exogenous sectors x endogenous sectors).
+
+    Returns:
+        dict[str, Path]: Paths 'unweighted', 'price_volatility', 'cpi_weights_root' and 'output_dir'.
+    """
+    from shared.cpi_weights import calculate_cpi_weights
+
+    rng = np.random.default_rng(seed)
+    root = Path(root)
+    cpi_root = root / "cpi_weights"
+    for tag, region_map in region_maps.items():
+        calculate_cpi_weights(table, region_map=region_map, output_path=cpi_root / tag, filename=f"cpi_weights_{tag}_{year}.csv")
+
+    industries = table.index[~table.index.get_level_values("Country").isin(["W2", "GO"])]
+    exogenous = price_vol.index[price_vol["price_volatility"] != 0]
+    unweighted = pd.DataFrame(rng.gamma(1.0, 0.001, size=(len(exogenous), len(industries))), index=exogenous, columns=industries)
+
+    paths = {
+        "unweighted": root / f"unweighted_shock_impacts_{year}.csv",
+        "price_volatility": root / "II_PI_volatility.csv",
+        "cpi_weights_root": cpi_root,
+        "output_dir": root / "weighted_impacts",
+    }
+    unweighted.to_csv(paths["unweighted"])
+    price_vol.to_csv(paths["price_volatility"])
+    return paths
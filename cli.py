@@ -0,0 +1,349 @@
+# cli.py
+#
+# Single entry point for the project:
+#
+#   python cli.py fetch        download raw FIGARO (and optionally SEA / EXIOBASE3) data
+#   python cli.py preprocess   turn raw FIGARO tables into the processed matrices
+#   python cli.py systemic     run the systemically significant prices pipeline
+#   python cli.py montecarlo   confidence bands for the systemic results under uncertain volatilities
+#   python cli.py paths        top supply chains of a sector or gas price shock (structural path analysis)
+#   python cli.py gas          run the gas price shock pipeline
+#   python cli.py reweight     re-apply CPI weights to existing shock results
+#   python cli.py serve        resident HTTP service answering shock queries from preloaded factorizations
+#   python cli.py store        collect all result CSVs into the partitioned Parquet results store
+#   python cli.py bench        measure import times (or, with --suite, benchmark the hot functions)
+#
+# Only the standard library is imported at module level. pandas, scipy, pymrio, requests
+# and tqdm are imported inside the subcommand that needs them, so `--help` and cheap
+# subcommands start quickly.
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent
+
+PART_SRC_DIRS = {
+    "gas": ROOT_DIR / "part_gas_price_shock" / "src",
+    "systemic": ROOT_DIR / "part_systemically_significant_prices" / "src",
+}
+
+BENCH_MODULES = [
+    "config", "numpy", "pandas", "scipy.linalg", "scipy.sparse", "requests", "tqdm", "pymrio",
+    "shared.preprocessing", "shared.data_loader",
+]
+
+
+def use_part(part: str) -> None:
+    """
+    Put an analysis part's src directory on sys.path (its modules import each other by bare name).
+    """
+    src_dir = str(PART_SRC_DIRS[part])
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+
+
+def parse_years(text: str) -> list[int]:
+    """
+    Parse '2019', '2010-2022' or '2010,2015,2020' into a list of years.
+    """
+    years = []
+    for part in text.split(","):
+        if "-" in part:
+            start, end = part.split("-", 1)
+            years.extend(range(int(start), int(end) + 1))
+        elif part.strip():
+            years.append(int(part))
+    return years
+
+
+def cmd_fetch(args) -> None:
+    from shared.data_loader import get_figaro_file_paths, FIGARO_BASE_URL
+
+    get_figaro_file_paths(
+        args.start_year, args.end_year, max_workers=args.workers, base_url=args.base_url or FIGARO_BASE_URL
+    )
+
+    if args.sea:
+        use_part("systemic")
+        from sea_loader import download_sea_file
+        download_sea_file()
+
+    for year in args.exiobase or []:
+        use_part("gas")
+        from exiobase3_loader import download_exiobase3_if_missing
+        download_exiobase3_if_missing(year)
+
+
+def cmd_preprocess(args) -> None:
+    from config import FIGARO_RAW_DIR, FIGARO_FULL_MATRIX_DIR
+    from shared.preprocessing import get_preprocessed_figaro_matrices
+
+    if args.years:
+        file_paths = {year: FIGARO_RAW_DIR / f"figaro_matrix_{year}.csv" for year in args.years}
+    else:
+        file_paths = {
+            int(path.stem.split("_")[-1]): path
+            for path in sorted(FIGARO_RAW_DIR.glob("figaro_matrix_*.csv"))
+            if path.stem.split("_")[-1].isdigit()
+        }
+
+    missing = [str(path) for path in file_paths.values() if not path.exists()]
+    if missing or not file_paths:
+        raise SystemExit(f"Raw FIGARO files not found: {missing or FIGARO_RAW_DIR}. Run 'python cli.py fetch' first.")
+
+    get_preprocessed_figaro_matrices(
+        file_paths,
+        processed_dir=FIGARO_FULL_MATRIX_DIR,
+        streaming=not args.in_memory,
+        chunksize=args.chunksize,
+        max_workers=args.workers or os.cpu_count() or 1,
+        force=args.force,
+    )
+
+    if args.matrix_store:
+        from shared.matrix_store import build_matrix_store
+        build_matrix_store(sorted(file_paths), overwrite=args.force)
+
+
+def cmd_systemic(args) -> None:
+    use_part("systemic")
+    import systemic_main
+    systemic_main.main(
+        force=args.force, rolling_volatility=args.rolling_volatility, cpi_only=args.cpi_only,
+        panel=args.panel, decompose=args.decompose,
+    )
+
+
+def cmd_montecarlo(args) -> None:
+    use_part("systemic")
+    import systemic_main
+    for year in args.years:
+        systemic_main.run_monte_carlo_analysis(
+            year, tag=args.scheme, n_draws=args.draws, chunk_size=args.chunk_size,
+            method=args.method, sigma=args.sigma, seed=args.seed,
+        )
+
+
+def cmd_gas(args) -> None:
+    use_part("gas")
+    import gas_main
+    gas_main.main(force=args.force)
+
+
+def cmd_paths(args) -> None:
+    options = dict(max_depth=args.depth, top_k=args.top_k, relative_threshold=args.threshold)
+    if args.part == "systemic":
+        if args.sector is None or args.year is None:
+            raise SystemExit("paths --part systemic needs --year and --sector (e.g. --sector DE_C20).")
+        if (args.scheme is None) != (args.region is None):
+            raise SystemExit("paths --part systemic needs --scheme and --region together (e.g. --scheme eu28 --region EU28).")
+        use_part("systemic")
+        import systemic_main
+        country, sector = args.sector.split("_", 1)
+        systemic_main.run_structural_paths(args.year, (country, sector), tag=args.scheme, region=args.region, **options)
+    else:
+        use_part("gas")
+        import gas_main
+        gas_main.run_structural_paths(region=args.region, **options)
+
+
+def cmd_reweight(args) -> None:
+    if args.part in ("systemic", "both"):
+        use_part("systemic")
+        import systemic_main
+        from config import SYSTEMIC_UNWEIGHTED_IMPACTS_DIR
+
+        years = args.years or sorted(
+            int(path.stem.split("_")[-1])
+            for path in SYSTEMIC_UNWEIGHTED_IMPACTS_DIR.glob("unweighted_shock_impacts_*.csv")
+        )
+        for year in years:
+            systemic_main.run_weighted_impacts_stage(year, force=args.force, rolling_volatility=args.rolling_volatility)
+
+    if args.part in ("gas", "both"):
+        use_part("gas")
+        import gas_main
+        gas_main.run_weighted_impacts_stage(force=args.force)
+
+
+def cmd_serve(args) -> None:
+    from shared.query_service import serve
+    serve(host=args.host, port=args.port, years=args.years, models=tuple(args.models), window_ms=args.window_ms)
+
+
+def cmd_store(args) -> None:
+    from shared.results_store import build_results_store
+    build_results_store(years=args.years, gas_year=None if args.no_gas else args.gas_year)
+
+
+def cmd_bench(args) -> None:
+    import subprocess
+    import time
+
+    if args.suite is not None:
+        sys.path.insert(0, str(ROOT_DIR / "benchmarks"))
+        import run_benchmarks
+
+        suite_parser = argparse.ArgumentParser(prog="cli.py bench --suite")
+        run_benchmarks.add_arguments(suite_parser)
+        regressions = run_benchmarks.run_from_args(suite_parser.parse_args(args.suite))
+        if regressions:
+            raise SystemExit(f"Regressions: {', '.join(regressions)}")
+        return
+
+    modules = args.modules or BENCH_MODULES
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT_DIR), os.environ.get("PYTHONPATH", "")]))
+
+    # Each import is timed in a fresh interpreter so already-loaded dependencies do not hide its cost
+    print(f"{'module':<28}{'import [ms]':>12}")
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=ROOT_DIR)
+        timing = f"{float(result.stdout.strip().splitlines()[-1]):.1f}" if result.returncode == 0 else "n/a"
+        print(f"{module:<28}{timing:>12}")
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(ROOT_DIR / "cli.py"), "--help"], capture_output=True, env=env)
+    print(f"{'cli.py --help (total)':<28}{(time.perf_counter() - start) * 1000:>12.1f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="FIGARO/EXIOBASE price shock pipelines.")
+    parser.add_argument("--data-dir", type=Path, help="Data root (sets MASTERTHESIS_DATA_DIR; default: ./data).")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore stage cache manifests and rerun every stage.")
+    parser.add_argument("--instrument", action="store_true", help="Write a per-stage time/memory/I/O report (data/run_reports/).")
+    parser.add_argument("--profile", action="store_true", help="Like --instrument, plus a cProfile dump per stage.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch = subparsers.add_parser("fetch", help="Download raw FIGARO tables (and optionally SEA / EXIOBASE3).")
+    fetch.add_argument("--start-year", type=int, default=2010, help="First FIGARO year (default: 2010).")
+    fetch.add_argument("--end-year", type=int, default=2022, help="Last FIGARO year (default: 2022).")
+    fetch.add_argument("--workers", type=int, default=4, help="Concurrent downloads (default: 4).")
+    fetch.add_argument("--base-url", help="FIGARO URL template with a '{year}' placeholder.")
+    fetch.add_argument("--sea", action="store_true", help="Also download the WIOD SEA file.")
+    fetch.add_argument("--exiobase", type=parse_years, help="Also download EXIOBASE3 archives for these years.")
+    fetch.set_defaults(func=cmd_fetch)
+
+    preprocess = subparsers.add_parser("preprocess", help="Preprocess raw FIGARO tables into Z, Y, X and VA.")
+    preprocess.add_argument("--years", type=parse_years, help="Years to process (default: all raw files).")
+    preprocess.add_argument("--workers", type=int, help="Worker processes (default: one per CPU).")
+    preprocess.add_argument("--chunksize", type=int, default=500, help="Rows per chunk in streaming mode.")
+    preprocess.add_argument("--in-memory", action="store_true", help="Load each table fully instead of streaming it.")
+    preprocess.add_argument("--matrix-store", action="store_true", help="Also build the memory-mapped A/Z/Y store.")
+    preprocess.add_argument("--force", action="store_true", help="Rebuild outputs even if they are up to date.")
+    preprocess.set_defaults(func=cmd_preprocess)
+
+    systemic = subparsers.add_parser("systemic", help="Run the systemically significant prices pipeline.")
+    systemic.add_argument("--force", action="store_true", help="Rerun every stage.")
+    systemic.add_argument(
+        "--rolling-volatility", action="store_true",
+        help="Shock each year with the rolling-window SEA volatility ending in that year instead of the full-sample one.",
+    )
+    systemic.add_argument(
+        "--cpi-only", action="store_true",
+        help="Compute only the CPI-weighted impacts via adjoint solves (no N x N unweighted impact matrix).",
+    )
+    systemic.add_argument(
+        "--panel", action="store_true",
+        help="Stack all years and compute the CPI-weighted impacts (and their year-over-year changes) in one batch.",
+    )
+    systemic.add_argument(
+        "--decompose", action="store_true",
+        help="Also split each unweighted price change into domestic, direct foreign input and multi-country feedback parts.",
+    )
+    systemic.set_defaults(func=cmd_systemic)
+
+    montecarlo = subparsers.add_parser(
+        "montecarlo", help="Confidence bands for the systemic shock impacts under uncertain volatilities."
+    )
+    montecarlo.add_argument("--years", type=parse_years, required=True, help="Years with a finished systemic run.")
+    montecarlo.add_argument("--scheme", default="eu28", help="CPI weighting scheme (default: eu28).")
+    montecarlo.add_argument("--draws", type=int, default=1000, help="Number of volatility draws (default: 1000).")
+    montecarlo.add_argument("--chunk-size", type=int, default=250, help="Draws evaluated at once (default: 250).")
+    montecarlo.add_argument(
+        "--method", choices=["bootstrap", "lognormal"], default="bootstrap",
+        help="Resample the SEA years (bootstrap) or perturb the point estimates (lognormal).",
+    )
+    montecarlo.add_argument("--sigma", type=float, default=0.25, help="Log standard deviation for --method lognormal.")
+    montecarlo.add_argument("--seed", type=int, default=0)
+    montecarlo.set_defaults(func=cmd_montecarlo)
+
+    gas = subparsers.add_parser("gas", help="Run the gas price shock pipeline.")
+    gas.add_argument("--force", action="store_true", help="Rerun every stage.")
+    gas.set_defaults(func=cmd_gas)
+
+    paths = subparsers.add_parser("paths", help="Top supply chains through which a price shock propagates.")
+    paths.add_argument("--part", choices=["systemic", "gas"], default="systemic")
+    paths.add_argument("--year", type=int, help="Systemic year.")
+    paths.add_argument("--sector", help="Systemic: shocked sector as <country>_<sector>, e.g. DE_C20.")
+    paths.add_argument("--scheme", help="Systemic: CPI weighting scheme (default: unweighted sum of price changes).")
+    paths.add_argument("--region", help="Region of the CPI weights (e.g. EU28); required with --scheme.")
+    paths.add_argument("--depth", type=int, default=6, help="Maximum number of links per path (default: 6).")
+    paths.add_argument("--top-k", type=int, default=20, help="Number of paths (default: 20).")
+    paths.add_argument("--threshold", type=float, default=1e-6, help="Pruning threshold as share of the total impact.")
+    paths.set_defaults(func=cmd_paths)
+
+    reweight = subparsers.add_parser("reweight", help="Re-apply CPI weights to existing unweighted shock results.")
+    reweight.add_argument("--part", choices=["systemic", "gas", "both"], default="both")
+    reweight.add_argument("--years", type=parse_years, help="Systemic years (default: all with unweighted impacts).")
+    reweight.add_argument("--force", action="store_true", help="Recompute even if inputs are unchanged.")
+    reweight.add_argument("--rolling-volatility", action="store_true", help="Systemic part: normalise with the year-matched rolling volatility.")
+    reweight.set_defaults(func=cmd_reweight)
+
+    serve = subparsers.add_parser("serve", help="Answer shock queries over local HTTP from preloaded factorizations.")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1).")
+    serve.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765).")
+    serve.add_argument("--years", type=parse_years, help="Years loaded at startup (others are loaded on first query).")
+    serve.add_argument(
+        "--models", type=lambda text: text.split(","), default=["systemic"],
+        help="Models loaded at startup: systemic, gas or both (default: systemic).",
+    )
+    serve.add_argument("--window-ms", type=float, default=2.0, help="Coalescing window for concurrent queries (default: 2).")
+    serve.set_defaults(func=cmd_serve)
+
+    store = subparsers.add_parser("store", help="Collect weighted and unweighted results into the Parquet results store.")
+    store.add_argument("--years", type=parse_years, help="Systemic years to collect (default: all).")
+    store.add_argument("--gas-year", type=int, default=2021, help="Year of the gas results (default: 2021).")
+    store.add_argument("--no-gas", action="store_true", help="Skip the gas results.")
+    store.set_defaults(func=cmd_store)
+
+    bench = subparsers.add_parser("bench", help="Measure import times, or run the function benchmarks with --suite.")
+    bench.add_argument("--modules", nargs="+", help=f"Modules to time (default: {' '.join(BENCH_MODULES)}).")
+    bench.add_argument(
+        "--suite", nargs=argparse.REMAINDER, metavar="ARGS",
+        help="Benchmark the hot functions on a synthetic MRIO table; the remaining arguments are passed "
+             "to benchmarks/run_benchmarks.py (see 'cli.py bench --suite --help')."
+    )
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+
+    # These are read lazily by config / shared.stage_cache / shared.instrumentation, so setting them here is early enough
+    if args.data_dir:
+        os.environ["MASTERTHESIS_DATA_DIR"] = str(args.data_dir)
+    if args.no_cache:
+        os.environ["MASTERTHESIS_STAGE_CACHE"] = "0"
+    if args.instrument:
+        os.environ["MASTERTHESIS_INSTRUMENT"] = "1"
+    if args.profile:
+        os.environ["MASTERTHESIS_PROFILE"] = "1"
+
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+
+    if args.instrument or args.profile:
+        from shared.instrumentation import instrumented_run
+        with instrumented_run(args.command):
+            args.func(args)
+    else:
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
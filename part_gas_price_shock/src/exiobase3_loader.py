@@ -1,26 +1,58 @@
 import sys
 from pathlib import Path
-import pymrio
 
 # Extend sys.path to access config and shared modules
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-import pymrio
+# pymrio is slow to import and only needed for downloads, classifications and the
+# pymrio reader, so it is imported inside those functions.
 from config import (
     EXIOBASE_RAW_DIR,
     EXIOBASE_PROCESSED_DIR,
+    EXIOBASE_CACHE_DIR,
     EXIOBASE_ROW_REGION_MAPPING,
-    EXIOBASE_TO_NACE_MAPPING
+    EXIOBASE_TO_NACE_MAPPING,
+    ensure_dir
 )
+from shared.binary_store import save_binary_frame, load_binary_frame, binary_frame_exists
 
+import hashlib
+import io
+import json
 import os
+import zipfile
 from shutil import copy2
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Region codes cleaned up by pymrio.parse_exiobase3 (some EXIOBASE 3 releases ship ISO3 codes)
+EXIOBASE3_REGION_FIXES = {
+    "AUS": "AU", "AUT": "AT", "BEL": "BE", "BGR": "BG", "BRA": "BR", "CAN": "CA", "CHE": "CH",
+    "CHN": "CN", "CYP": "CY", "CZE": "CZ", "DEU": "DE", "DNK": "DK", "ESP": "ES", "EST": "EE",
+    "FIN": "FI", "FRA": "FR", "GBR": "GB", "GRC": "GR", "HRV": "HR", "HUN": "HU", "IDN": "ID",
+    "IND": "IN", "IRL": "IE", "ITA": "IT", "JPN": "JP", "KOR": "KR", "LTU": "LT", "LUX": "LU",
+    "LVA": "LV", "MEX": "MX", "MLT": "MT", "NLD": "NL", "NOR": "NO", "POL": "PL", "PRT": "PT",
+    "ROM": "RO", "RUS": "RU", "SVK": "SK", "SVN": "SI", "SWE": "SE", "TUR": "TR", "TWN": "TW",
+    "USA": "US", "ZAF": "ZA", "WWA": "WA", "WWE": "WE", "WWF": "WF", "WWL": "WL", "WWM": "WM",
+}
+
+# Core matrices of the EXIOBASE3 archive: 2 header rows and 2 index columns each
+EXIOBASE3_CORE_FILES = {"Z": "Z.txt", "Y": "Y.txt"}
+EXIOBASE3_NR_HEADER = 2
+EXIOBASE3_NR_INDEX_COL = 2
+
+# NACE codes whose rows and columns feed compute_b_gas_share_matrix
+B_SPLIT_SECTORS = ["B_gas", "B_nongas"]
 
 def download_exiobase3_if_missing(year: int, system: str = "ixi") -> Path:
     """
     Ensures the EXIOBASE3 ZIP for the given year/system is present.
     Downloads only years 2010–2022 to a local cache and copies the target file.
     """
+    import pymrio
     assert 2010 <= year <= 2022, f"Year {year} is outside supported range (2010–2022)"
     zip_filename = f"IOT_{year}_{system}.zip"
     zip_path = EXIOBASE_RAW_DIR / zip_filename
@@ -55,6 +87,7 @@ def load_exiobase3(year: int, system: str = "ixi"):
     Load EXIOBASE3 data for a given year and system (ixi, pxi, etc.).
     Downloads the archive if missing.
     """
+    import pymrio
     zip_path = download_exiobase3_if_missing(year, system)
     print(f"Parsing EXIOBASE3: {zip_path}")
     exio3 = pymrio.parse_exiobase3(path=str(zip_path))
@@ -68,6 +101,7 @@ def preprocess_exiobase3(exio3):
     - Rename sectors to match NACE-based sector scheme
     - Aggregate duplicates
     """
+    import pymrio
 
     mrio_class = pymrio.get_classification(mrio_name="exio3_ixi")
 
@@ -93,6 +127,7 @@ def save_processed_exiobase(exio3, year: int):
     """
     Save preprocessed EXIOBASE3 matrices to processed directory.
     """
+    ensure_dir(EXIOBASE_PROCESSED_DIR)
     Z_path = EXIOBASE_PROCESSED_DIR / f"Z_matrix_{year}.csv"
     print(f"Saving Z matrix to {Z_path}")
     exio3.Z.to_csv(Z_path)
@@ -110,3 +145,309 @@ def load_and_process_exiobase(year: int):
     exio3 = load_exiobase3(year)
     exio3 = preprocess_exiobase3(exio3)
     return save_processed_exiobase(exio3, year)
+
+
+def find_exiobase3_member(zf: zipfile.ZipFile, matrix: str = "Z") -> str:
+    """
+    Locate the core matrix file (e.g. 'IOT_2021_ixi/Z.txt') inside an EXIOBASE3 archive.
+    Satellite and impact folders contain files with the same names and are skipped by
+    picking the shallowest match.
+    """
+    file_name = EXIOBASE3_CORE_FILES[matrix]
+    candidates = [
+        name for name in zf.namelist()
+        if name == file_name or name.endswith("/" + file_name)
+    ]
+    if not candidates:
+        raise FileNotFoundError(f"No {file_name} found in EXIOBASE3 archive {zf.filename}")
+    return min(candidates, key=lambda name: name.count("/"))
+
+def read_exiobase3_header(zip_path: Path, matrix: str = "Z") -> tuple[str, pd.MultiIndex, int]:
+    """
+    Read only the column labels of a core EXIOBASE3 matrix.
+
+    Parameters:
+        zip_path (Path): EXIOBASE3 zip archive.
+        matrix (str): 'Z' or 'Y'.
+
+    Returns:
+        tuple: (member name in the archive, column MultiIndex, number of header lines to skip).
+               The index-name line written by pandas below the header is counted as well.
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        member = find_exiobase3_member(zf, matrix)
+        with io.TextIOWrapper(zf.open(member), encoding="utf-8") as stream:
+            header_lines = [stream.readline().rstrip("\r\n").split("\t") for _ in range(EXIOBASE3_NR_HEADER)]
+            next_line = stream.readline().rstrip("\r\n").split("\t")
+
+    n_skip = EXIOBASE3_NR_HEADER
+    if not any(cell.strip() for cell in next_line[EXIOBASE3_NR_INDEX_COL:]):
+        n_skip += 1  # index-name line ('region', 'sector', '', ...)
+
+    regions = [EXIOBASE3_REGION_FIXES.get(r, r) for r in header_lines[0][EXIOBASE3_NR_INDEX_COL:]]
+    second_level = header_lines[1][EXIOBASE3_NR_INDEX_COL:]
+    names = ["region", "sector" if matrix == "Z" else "category"]
+    columns = pd.MultiIndex.from_arrays([regions, second_level], names=names)
+
+    return member, columns, n_skip
+
+def iter_exiobase3_chunks(
+    zip_path: Path,
+    matrix: str = "Z",
+    chunksize: int = 500,
+    dtype: np.dtype = np.float64,
+    column_positions: Optional[np.ndarray] = None
+) -> Iterator[tuple[pd.MultiIndex, np.ndarray]]:
+    """
+    Stream a core EXIOBASE3 matrix out of the zip archive in row chunks.
+
+    The member is decompressed on the fly; only the requested columns are converted,
+    with explicit dtypes (labels as str, values as `dtype`).
+
+    Parameters:
+        zip_path (Path): EXIOBASE3 zip archive.
+        matrix (str): 'Z' or 'Y'.
+        chunksize (int): Number of rows per chunk.
+        dtype (np.dtype): Value dtype (float64 or float32).
+        column_positions (np.ndarray | None): Positions of the data columns to keep. All if None.
+
+    Yields:
+        tuple[pd.MultiIndex, np.ndarray]: Row labels (region, sector) and values of the chunk.
+    """
+    member, columns, n_skip = read_exiobase3_header(zip_path, matrix)
+    if column_positions is None:
+        column_positions = np.arange(len(columns))
+
+    data_cols = [int(p) + EXIOBASE3_NR_INDEX_COL for p in column_positions]
+    usecols = list(range(EXIOBASE3_NR_INDEX_COL)) + data_cols
+    dtypes = {0: str, 1: str, **{c: dtype for c in data_cols}}
+
+    with zipfile.ZipFile(zip_path) as zf, zf.open(member) as raw:
+        reader = pd.read_csv(
+            raw,
+            sep="\t",
+            header=None,
+            skiprows=n_skip,
+            usecols=usecols,
+            dtype=dtypes,
+            chunksize=chunksize,
+            engine="c",
+        )
+        for chunk in reader:
+            regions = chunk[0].map(lambda r: EXIOBASE3_REGION_FIXES.get(r, r))
+            index = pd.MultiIndex.from_arrays([regions, chunk[1]], names=["region", "sector"])
+            yield index, chunk[data_cols].to_numpy(dtype=dtype)
+
+def get_exiobase_sector_mapping(system: str = "ixi") -> dict:
+    """
+    Map raw EXIOBASE sector names (ExioName) to the NACE-compatible codes used in the
+    gas analysis, i.e. ExioName -> ExioLabel -> EXIOBASE_TO_NACE_MAPPING.
+    Labels without a NACE entry are kept as ExioLabel, as in preprocess_exiobase3.
+    """
+    import pymrio
+    mrio_class = pymrio.get_classification(mrio_name=f"exio3_{system}")
+    name_to_label = mrio_class.get_sector_dict(
+        mrio_class.sectors.ExioName, mrio_class.sectors.ExioLabel
+    )
+    return {
+        name: EXIOBASE_TO_NACE_MAPPING.get(label, label)
+        for name, label in name_to_label.items()
+    }
+
+def map_exiobase_labels(labels: pd.MultiIndex, sector_map: Optional[dict]) -> pd.MultiIndex:
+    """
+    Apply EXIOBASE_ROW_REGION_MAPPING to the region level and, if given, the
+    ExioName -> NACE sector mapping to the second level of raw EXIOBASE labels.
+    Sector names missing from sector_map fall back to EXIOBASE_TO_NACE_MAPPING.
+    """
+    regions = labels.get_level_values(0).map(lambda r: EXIOBASE_ROW_REGION_MAPPING.get(r, r))
+    second = labels.get_level_values(1)
+    if sector_map is not None:
+        second = second.map(lambda s: sector_map.get(s, EXIOBASE_TO_NACE_MAPPING.get(s, s)))
+    return pd.MultiIndex.from_arrays([regions, second], names=labels.names)
+
+def build_concordance_matrix(raw_labels: pd.MultiIndex, sector_map: Optional[dict]):
+    """
+    Build the sparse 0/1 aggregation matrix for the region and sector concordances.
+
+    Parameters:
+        raw_labels (pd.MultiIndex): Raw (region, sector/category) labels of one matrix axis.
+        sector_map (dict | None): ExioName -> NACE mapping for the second level, or None
+                                  to aggregate regions only (Y columns).
+
+    Returns:
+        tuple[pd.MultiIndex, sparse.csr_matrix]: Aggregated labels in first-appearance order
+        (as pymrio's aggregate_duplicates) and the (n_aggregated x n_raw) matrix C with
+        C[g, i] = 1 if raw label i maps to aggregated label g.
+    """
+    mapped = map_exiobase_labels(raw_labels, sector_map)
+    aggregated = mapped.unique()
+    group_ids = aggregated.get_indexer(mapped)
+    concordance = sparse.csr_matrix(
+        (np.ones(len(group_ids)), (group_ids, np.arange(len(group_ids)))),
+        shape=(len(aggregated), len(group_ids))
+    )
+    return aggregated, concordance
+
+def read_aggregated_exiobase3(
+    zip_path: Path,
+    system: str = "ixi",
+    chunksize: int = 500,
+    dtype: np.dtype = np.float64,
+    cross_sectors: Optional[set] = None
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Read EXIOBASE3 Z and Y with the region and sector concordances applied at read time.
+
+    Every streamed row chunk V of Z is aggregated straight away as
+    Z_agg += C_rows[:, chunk] @ (V @ C.T), where C is the sparse concordance matrix,
+    and Y likewise with a region-only concordance on its columns. Only the aggregated
+    outputs and a single raw chunk are ever held in memory; no full-resolution
+    labelled DataFrame is created. This keeps the larger product system within reach
+    of ordinary workers.
+
+    Parameters:
+        zip_path (Path): EXIOBASE3 zip archive.
+        system (str): EXIOBASE3 system, used to pick the sector classification.
+        chunksize (int): Rows per parsed chunk.
+        dtype (np.dtype): Dtype of the raw chunks and of the aggregated matrices (float64 or float32).
+        cross_sectors (set | None): Raw sector names; if given, only their rows and (for Z)
+                                    columns contribute to the aggregated matrices.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Aggregated (Z, Y), labelled like preprocess_exiobase3 output.
+    """
+    sector_map = get_exiobase_sector_mapping(system)
+    _, raw_columns, _ = read_exiobase3_header(zip_path, "Z")
+    agg_index, concordance = build_concordance_matrix(raw_columns, sector_map)
+
+    _, raw_y_columns, _ = read_exiobase3_header(zip_path, "Y")
+    agg_y_columns, y_concordance = build_concordance_matrix(raw_y_columns, None)
+
+    cross_cols = None
+    if cross_sectors is not None:
+        cross_cols = np.asarray(raw_columns.get_level_values(1).isin(cross_sectors))
+
+    result = {}
+    for matrix, col_concordance, agg_columns in (
+        ("Z", concordance, agg_index),
+        ("Y", y_concordance, agg_y_columns),
+    ):
+        out = np.zeros((len(agg_index), len(agg_columns)), dtype=dtype)
+
+        print(f"Streaming and aggregating EXIOBASE3 {matrix} from {zip_path.name} ...")
+        for index, values in iter_exiobase3_chunks(zip_path, matrix, chunksize, dtype):
+            if cross_sectors is not None:
+                in_cross = np.asarray(index.get_level_values(1).isin(cross_sectors))
+                if matrix == "Z":
+                    values[np.ix_(~in_cross, ~cross_cols)] = 0.0
+                else:
+                    values[~in_cross] = 0.0
+
+            # Column concordance first: (n_agg_cols x chunk)
+            aggregated_cols = col_concordance @ values.T
+
+            # Row concordance for the rows of this chunk
+            row_groups = agg_index.get_indexer(map_exiobase_labels(index, sector_map))
+            if (row_groups < 0).any():
+                raise ValueError(f"EXIOBASE3 {matrix} contains rows that are not in the Z header.")
+            row_concordance = sparse.csr_matrix(
+                (np.ones(len(row_groups)), (row_groups, np.arange(len(row_groups)))),
+                shape=(len(agg_index), len(row_groups))
+            )
+            out += row_concordance @ aggregated_cols.T
+
+        result[matrix] = pd.DataFrame(out, index=agg_index, columns=agg_columns, copy=False)
+
+    return result["Z"], result["Y"]
+
+def get_exiobase_cache_key(
+    year: int,
+    system: str = "ixi",
+    reader: str = "stream",
+    b_cross_only: bool = False
+) -> str:
+    """
+    Build the cache key for a processed EXIOBASE3 system.
+
+    The key combines year, system, the reader, the cross-only flag and a hash of the region
+    and sector mappings, so editing EXIOBASE_ROW_REGION_MAPPING or EXIOBASE_TO_NACE_MAPPING
+    in config automatically invalidates previously cached matrices, and snapshots of the
+    two readers (or a cross-only snapshot) never stand in for each other.
+
+    Parameters:
+        year (int): EXIOBASE3 year.
+        system (str): EXIOBASE3 system (e.g. 'ixi').
+        reader (str): 'stream' or 'pymrio' (see load_processed_exiobase).
+        b_cross_only (bool): Whether only the B_gas/B_nongas rows and columns are kept.
+
+    Returns:
+        str: Cache key such as 'ixi_2021_stream_3f2a9c01b7de'.
+    """
+    mapping_blob = json.dumps(
+        [EXIOBASE_ROW_REGION_MAPPING, EXIOBASE_TO_NACE_MAPPING],
+        sort_keys=True
+    ).encode("utf-8")
+    mapping_hash = hashlib.sha1(mapping_blob).hexdigest()[:12]
+    variant = reader + ("_bcross" if b_cross_only else "")
+    return f"{system}_{year}_{variant}_{mapping_hash}"
+
+def load_processed_exiobase(
+    year: int,
+    system: str = "ixi",
+    use_cache: bool = True,
+    reader: str = "stream",
+    b_cross_only: bool = False
+):
+    """
+    Return the preprocessed EXIOBASE3 Z and Y matrices for a year.
+
+    On a cache hit the matrices are read from the binary snapshot in
+    EXIOBASE_CACHE_DIR and the zip archive is neither parsed nor renamed.
+    On a miss the archive is read, preprocessed and the binary snapshot is stored.
+
+    Parameters:
+        year (int): EXIOBASE3 year.
+        system (str): EXIOBASE3 system (default: 'ixi').
+        use_cache (bool): If False, always reparse the archive and refresh the cache.
+        reader (str): 'stream' reads only Z and Y straight from the zip and aggregates them
+                      while reading (read_aggregated_exiobase3); 'pymrio' uses the full
+                      pymrio parser and also writes the CSV exports.
+        b_cross_only (bool): Stream reader only. Keep just the B_gas/B_nongas rows and columns
+                             needed for the gas share computation; other entries are zero.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: (Z, Y) with MultiIndex rows and columns.
+    """
+    if reader not in ("stream", "pymrio"):
+        raise ValueError(f"Unknown EXIOBASE3 reader: {reader}")
+
+    cache_key = get_exiobase_cache_key(year, system, reader, b_cross_only)
+    cache_dir = EXIOBASE_CACHE_DIR / cache_key
+    z_path = cache_dir / "Z.npy"
+    y_path = cache_dir / "Y.npy"
+
+    if use_cache and binary_frame_exists(z_path) and binary_frame_exists(y_path):
+        print(f"Loading cached EXIOBASE3 matrices from {cache_dir}")
+        return load_binary_frame(z_path), load_binary_frame(y_path)
+
+    if reader == "pymrio":
+        exio3 = load_exiobase3(year, system)
+        exio3 = preprocess_exiobase3(exio3)
+        save_processed_exiobase(exio3, year)
+        Z, Y = exio3.Z, exio3.Y
+    else:
+        zip_path = download_exiobase3_if_missing(year, system)
+        cross_sectors = None
+        if b_cross_only:
+            cross_sectors = {
+                name for name, code in get_exiobase_sector_mapping(system).items()
+                if code in B_SPLIT_SECTORS
+            }
+        Z, Y = read_aggregated_exiobase3(zip_path, system=system, cross_sectors=cross_sectors)
+
+    print(f"Caching processed EXIOBASE3 matrices in {cache_dir}")
+    save_binary_frame(Z, z_path)
+    save_binary_frame(Y, y_path)
+
+    return Z, Y
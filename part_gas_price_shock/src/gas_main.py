@@ -1,7 +1,9 @@
 # part_gas_price_shock/src/2_gas_main.py
 
 import pandas as pd
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 import sys
 
 # Extend path to root to access config.py and shared modules
@@ -15,16 +17,27 @@ from config import (
     GAS_PRICE_SHOCK_OUTPUTS,
     GAS_FIGARO_MAPPING,
     GAS_PRICE_SHOCK_DATA,
+    EXIOBASE_RAW_DIR,
     EU28_COUNTRIES    
 )
 
-from exiobase3_loader import load_and_process_exiobase
+from exiobase3_loader import load_processed_exiobase, get_exiobase_cache_key
 from b_sector_split import compute_b_gas_share_matrix, split_b_sector, apply_b_gas_weights, merge_countries
 from shared.aggregation import aggregate_sectors, aggregate_output_vector
 from shared.cpi_weights import calculate_cpi_weights
 from shared.technical_coefficients import calculate_technical_coefficients
 from cpi_weights import split_b_sector_rows_for_final_demand, compute_origin_specific_b_gas_shares, apply_b_gas_shares_to_Y, apply_cpi_weights_to_gas_price_shock
 from shock_analysis import run_imported_gas_shock, simulate_extra_vs_full_gas_shock
+from shared.stage_cache import run_stage
+from shared.instrumentation import instrumented_run
+import b_sector_split
+import cpi_weights
+import exiobase3_loader
+import shock_analysis
+import shared.aggregation
+import shared.cpi_weights
+import shared.technical_coefficients
+import shared.spillover_decomposition
 
 # === Parameters === 
 YEAR = 2021
@@ -33,261 +46,437 @@ figaro_X_path = FIGARO_X_VECTOR_DIR / f"X_{YEAR}.csv"
 figaro_Y_path = FIGARO_Y_MATRIX_DIR / f"Y_{YEAR}.csv"
 output_path_A_gas = GAS_PRICE_SHOCK_DATA  / "processed" / f"A_gas_{YEAR}.csv"
 output_path_results = GAS_PRICE_SHOCK_OUTPUTS / f"results_{YEAR}.csv"
+exiobase_zip_path = EXIOBASE_RAW_DIR / f"IOT_{YEAR}_ixi.zip"
+A_weighted_path = GAS_PRICE_SHOCK_DATA / "processed" / f"A_gas_weighted_{YEAR}.csv"
+SHOCK_FACTOR = 5.0
 
-# === Load and aggregate FIGARO data ===
-df_figaro_Z = pd.read_csv(figaro_Z_path, header=[0, 1], index_col=[0, 1])
-df_figaro_Z = aggregate_sectors(df_figaro_Z, GAS_FIGARO_MAPPING, output_path=GAS_PRICE_SHOCK_DATA / "processed" / f"Z_aggregated_{YEAR}.csv")
-df_figaro_Z = merge_countries(df_figaro_Z, countries_to_merge=["AR", "SA"], target="FIGW1")
+# EXIOBASE3 reader ('stream' or 'pymrio') and whether only the B_gas/B_nongas cross entries are kept
+EXIOBASE_READER = "stream"
+EXIOBASE_B_CROSS_ONLY = False
 
-df_figaro_X = pd.read_csv(
-    figaro_X_path,
-    index_col=["Country", "Sector"],  # index on those two columns
-    dtype={"gross_output": float}
-)
-
-# exclude unwanted final-demand sectors
-exclude_sectors = {"P3_S13","P3_S14","P3_S15","P51G","P5M"}
-df_figaro_X = df_figaro_X[
-    ~df_figaro_X.index.get_level_values("Sector").isin(exclude_sectors)
+country_tag    = "per_country"
+country_outdir = GAS_PRICE_SHOCK_DATA / "cpi_weights" / country_tag
+eu28_cpi_file  = GAS_PRICE_SHOCK_DATA / "cpi_weights" / "eu28" / f"cpi_weights_eu28_{YEAR}.csv"
+cpi_file       = country_outdir / f"cpi_weights_{country_tag}_{YEAR}.csv"
+
+# Each stage below is skipped if its input files, these parameters and the source of
+# the listed modules are unchanged since its outputs were written (shared/stage_cache.py)
+STAGE_PARAMS = {
+    "year": YEAR,
+    "mapping": GAS_FIGARO_MAPPING,
+    "eu28": EU28_COUNTRIES,
+    "shock_factor": SHOCK_FACTOR,
+    "exiobase": get_exiobase_cache_key(YEAR, reader=EXIOBASE_READER, b_cross_only=EXIOBASE_B_CROSS_ONLY),
+    "exiobase_reader": EXIOBASE_READER,
+    "b_cross_only": EXIOBASE_B_CROSS_ONLY,
+}
+STAGE_CODE = [
+    b_sector_split, cpi_weights, exiobase3_loader, shock_analysis,
+    shared.aggregation, shared.cpi_weights, shared.technical_coefficients,
+    shared.spillover_decomposition,
 ]
 
-X_agg = aggregate_output_vector(
-    df_figaro_X,
-    sector_map=GAS_FIGARO_MAPPING,
-    country_merge_map={"AR": "FIGW1", "SA": "FIGW1"}
-)
-
-# when writing a Series with a 2-level index, explicitly pass index_label
-X_agg.to_csv(
-    GAS_PRICE_SHOCK_DATA / f"X_aggregated_{YEAR}.csv",
-    index_label=["Country", "Sector"]
-)
-
-# === Calculate technical coefficients matrix A from Z matrix ===
-df_figaro_A = calculate_technical_coefficients(df_figaro_Z, X_agg)
-df_figaro_A.index.names = ["Country", "Sector"]
-df_figaro_A.columns.names = ["Country", "Sector"]
-df_figaro_A.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"A_{YEAR}.csv")
-# Split B_gas and B_nongas rows/columns in FIGARO A matrix
-df_figaro_split_A = split_b_sector(df_figaro_A)
-
-print("Figaro A matrix loaded and processed. Shape:", df_figaro_split_A.shape)
-
-# === Split B_gas and B_nongas rows/columns in FIGARO Z matrix ===
-df_figaro_split_Z = split_b_sector(df_figaro_Z)
-df_figaro_split_Z.index.names = ["Country", "Sector"]
-df_figaro_split_Z.columns.names = ["Country", "Sector"]
-df_figaro_split_Z.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"Z_split_{YEAR}.csv")
-
-print("Figaro Z matrix split into B_gas and B_nongas. Shape:", df_figaro_split_Z.shape)
-
-# === Load and preprocess EXIOBASE Z and Y matrix ===
-z_matrix_path, y_matrix_path = load_and_process_exiobase(YEAR)
-df_exio_z = pd.read_csv(z_matrix_path, header=[0, 1], index_col=[0, 1])
-df_exio_z.index.names = ["Country", "Sector"]
-df_exio_z.columns.names = ["Country", "Sector"]
-
-# === Compute gas share matrix from EXIOBASE ===
-gas_share_matrix = compute_b_gas_share_matrix(df_exio_z)
-gas_share_matrix.to_csv(GAS_PRICE_SHOCK_DATA /"processed" / "gas_share_matrix.csv")
-
-print("Gas share matrix computed. Shape:", gas_share_matrix.shape)
-
-# === Apply gas share weights to B_gas and B_nongas rows/columns ===
-A_weighted = apply_b_gas_weights(df_figaro_split_A, gas_share_matrix)
-A_weighted.to_csv(GAS_PRICE_SHOCK_DATA/ "processed" / f"A_gas_weighted_{YEAR}.csv")
-
-print(A_weighted.head())
-
-Z_weighted = apply_b_gas_weights(df_figaro_split_Z, gas_share_matrix)
-Z_weighted.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"Z_gas_weighted_{YEAR}.csv")
-
-print(Z_weighted.head())
-
-# === Run gas price shock analysis ===
-
-# Results with domestic gas sector shocked
-results_extra = run_imported_gas_shock(
-    A_matrix=A_weighted,
-    eu28_countries=EU28_COUNTRIES,
-    shock_factor=5.0,
-    intra_eu=False,
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / "results_extra_2021.csv",
-    debug=True
-)
-
-results_intra_extra = run_imported_gas_shock(
-    A_matrix=A_weighted,
-    eu28_countries=EU28_COUNTRIES,
-    shock_factor=5.0,
-    intra_eu=True,
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / "results_intra_extra_2021.csv",
-    debug=True
-)
-
-# Results with only imported gas sectors shocked
-df_e, df_f, df_i = simulate_extra_vs_full_gas_shock(
-    A_matrix=A_weighted,
-    eu28_countries=EU28_COUNTRIES,
-    shock_factor=5.0,
-    output_dir=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"
-)
-
-print("Gas price shock analysis completed.")
-
-# === Calculate CPI weights ===
-
-# === Load EXIOBASE demand matrix for CPI calculation ===
-df_exio_Y = pd.read_csv(y_matrix_path, header=[0, 1], index_col=[0, 1])
-df_exio_Y.index.names = ["Country", "Sector"]
-df_exio_Y.columns.names = ["Country", "Sector"]
-
-print(df_exio_Y)
-
-# === Load and aggregate FIGARO data ===
-df_figaro_Y = pd.read_csv(figaro_Y_path, header=[0, 1], index_col=[0, 1])
-df_figaro_Y = aggregate_sectors(df_figaro_Y, GAS_FIGARO_MAPPING)
-df_figaro_Y = merge_countries(df_figaro_Y, countries_to_merge=["AR", "SA"], target="FIGW1")
-df_figaro_Y.index.names = ["Country", "Sector"]
-df_figaro_Y.columns.names = ["Country", "Sector"]
-
-print(df_figaro_Y.head())
-
-# === Add B_gas and B_nongas rows to FIGARO Y matrix ===
-figaro_Y_split = split_b_sector_rows_for_final_demand(df_figaro_Y, target_category="P3_S14")
-
-print(figaro_Y_split.head())
-
-# === Calculate shares for gas and non-gas sectors ===
-gas_nongas_shares = compute_origin_specific_b_gas_shares(df_exio_Y, target_category="Final consumption expenditure by households")
-gas_nongas_shares.to_csv(GAS_PRICE_SHOCK_DATA / "gas_nongas_shares.csv")
-
-# === Apply Shares to FIGARO Y matrix ===
-figaro_Y_gas = apply_b_gas_shares_to_Y(figaro_Y_split, gas_nongas_shares)
-figaro_Y_gas.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"Y_gas_{YEAR}.csv")
-
-
-# === Calculate CPI weights for EU28 region ===
-EU28_TAG = "eu28"
-eu28_region_map = {country: "EU28" for country in EU28_COUNTRIES}
-eu28_output_dir = GAS_PRICE_SHOCK_DATA / "cpi_weights" / EU28_TAG
-
-cpi_weights_eu28 = calculate_cpi_weights(
-    df=figaro_Y_gas,
-    consumption_code="P3_S14",
-    region_map=eu28_region_map,
-    output_path=eu28_output_dir,
-    filename=f"cpi_weights_{EU28_TAG}_{YEAR}.csv"
-)
-
-print(f"CPI weights for EU28 saved to {eu28_output_dir}")
-
-# === Apply EU28 CPI weights ===
+SHOCK_RESULT_PATHS = [
+    GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_extra_{YEAR}.csv",
+    GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_intra_extra_{YEAR}.csv",
+    GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_extra.csv",
+    GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_full.csv",
+    GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_intra.csv",
+]
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_extra.csv",
-    cpi_weights_path=GAS_PRICE_SHOCK_DATA / "cpi_weights" / "eu28" / "cpi_weights_eu28_2021.csv",
-    regions=["EU28", "ROW"],
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "extra_cpi_applied_total_impact_eu28.csv"
-)
+@lru_cache(maxsize=None)
+def exiobase_frames():
+    """
+    Load the preprocessed EXIOBASE Z and Y matrices once, and only if a stage needs them.
+    """
+    df_exio_z, df_exio_Y = load_processed_exiobase(YEAR, reader=EXIOBASE_READER, b_cross_only=EXIOBASE_B_CROSS_ONLY)
+    for df in (df_exio_z, df_exio_Y):
+        df.index.names = ["Country", "Sector"]
+        df.columns.names = ["Country", "Sector"]
+    return df_exio_z, df_exio_Y
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_full.csv",
-    cpi_weights_path=GAS_PRICE_SHOCK_DATA / "cpi_weights" / "eu28" / "cpi_weights_eu28_2021.csv",
-    regions=["EU28", "ROW"],
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "full_cpi_applied_total_impact_eu28.csv"
-)
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_intra.csv",
-    cpi_weights_path=GAS_PRICE_SHOCK_DATA / "cpi_weights" / "eu28" / "cpi_weights_eu28_2021.csv",
-    regions=["EU28", "ROW"],
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "intra_cpi_applied_total_impact_eu28.csv"
-)
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / "results_extra_2021.csv",
-    cpi_weights_path=GAS_PRICE_SHOCK_DATA / "cpi_weights" / "eu28" / "cpi_weights_eu28_2021.csv",
-    regions=["EU28","ROW"],
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "incl_dom_impact_eu28_extra.csv"
-)
+def build_gas_weighted_matrices() -> pd.DataFrame:
+    # === Load and aggregate FIGARO data ===
+    df_figaro_Z = pd.read_csv(figaro_Z_path, header=[0, 1], index_col=[0, 1])
+    df_figaro_Z = aggregate_sectors(df_figaro_Z, GAS_FIGARO_MAPPING, output_path=GAS_PRICE_SHOCK_DATA / "processed" / f"Z_aggregated_{YEAR}.csv")
+    df_figaro_Z = merge_countries(df_figaro_Z, countries_to_merge=["AR", "SA"], target="FIGW1")
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / "results_intra_extra_2021.csv",
-    cpi_weights_path=GAS_PRICE_SHOCK_DATA / "cpi_weights" / "eu28" / "cpi_weights_eu28_2021.csv",
-    regions=["EU28", "ROW"],
-    output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "incl_dom_impact_eu28_intra_extra.csv"
-)
+    df_figaro_X = pd.read_csv(
+        figaro_X_path,
+        index_col=["Country", "Sector"],  # index on those two columns
+        dtype={"gross_output": float}
+    )
 
+    # exclude unwanted final-demand sectors
+    exclude_sectors = {"P3_S13","P3_S14","P3_S15","P51G","P5M"}
+    df_figaro_X = df_figaro_X[
+        ~df_figaro_X.index.get_level_values("Sector").isin(exclude_sectors)
+    ]
 
-# === Compute country‐level CPI weights ===
-country_tag    = "per_country"
-country_outdir = GAS_PRICE_SHOCK_DATA / "cpi_weights" / country_tag
+    X_agg = aggregate_output_vector(
+        df_figaro_X,
+        sector_map=GAS_FIGARO_MAPPING,
+        country_merge_map={"AR": "FIGW1", "SA": "FIGW1"}
+    )
 
-# region_map=None ⇒ one CPI‐weight column per country
-cpi_weights_country = calculate_cpi_weights(
-    df=figaro_Y_gas,
-    consumption_code="P3_S14",
-    region_map=None,
-    output_path=country_outdir,
-    filename=f"cpi_weights_{country_tag}_{YEAR}.csv"
-)
+    # when writing a Series with a 2-level index, explicitly pass index_label
+    X_agg.to_csv(
+        GAS_PRICE_SHOCK_DATA / f"X_aggregated_{YEAR}.csv",
+        index_label=["Country", "Sector"]
+    )
 
-print(f"CPI weights per country saved to {country_outdir}")
+    # === Calculate technical coefficients matrix A from Z matrix ===
+    df_figaro_A = calculate_technical_coefficients(df_figaro_Z, X_agg)
+    df_figaro_A.index.names = ["Country", "Sector"]
+    df_figaro_A.columns.names = ["Country", "Sector"]
+    df_figaro_A.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"A_{YEAR}.csv")
+    # Split B_gas and B_nongas rows/columns in FIGARO A matrix
+    df_figaro_split_A = split_b_sector(df_figaro_A)
 
-# Path to the just‐written CPI weights file
-cpi_file = country_outdir / f"cpi_weights_{country_tag}_{YEAR}.csv"
+    print("Figaro A matrix loaded and processed. Shape:", df_figaro_split_A.shape)
 
-# === Discover which country columns we actually have ===
-import pandas as pd
+    # === Split B_gas and B_nongas rows/columns in FIGARO Z matrix ===
+    df_figaro_split_Z = split_b_sector(df_figaro_Z)
+    df_figaro_split_Z.index.names = ["Country", "Sector"]
+    df_figaro_split_Z.columns.names = ["Country", "Sector"]
+    df_figaro_split_Z.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"Z_split_{YEAR}.csv")
 
-# Read only the header row (single header)
-cpi_cols = pd.read_csv(cpi_file, nrows=0).columns
+    print("Figaro Z matrix split into B_gas and B_nongas. Shape:", df_figaro_split_Z.shape)
 
-# Get country codes, skipping index columns
-per_country_list = [col for col in cpi_cols if not col.startswith('Unnamed:')]
+    # === Load and preprocess EXIOBASE Z and Y matrix ===
+    df_exio_z, _ = exiobase_frames()
 
-# === Apply country‐level CPI weights to your shock results ===
+    # === Compute gas share matrix from EXIOBASE ===
+    gas_share_matrix = compute_b_gas_share_matrix(df_exio_z)
+    gas_share_matrix.to_csv(GAS_PRICE_SHOCK_DATA /"processed" / "gas_share_matrix.csv")
 
-YEAR = 2021  # Define the year for output filenames
+    print("Gas share matrix computed. Shape:", gas_share_matrix.shape)
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"/ f"results_extra.csv",
-    cpi_weights_path  = cpi_file,
-    regions           = per_country_list,
-    output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
-                        f"extra_cpi_country_impacts_{YEAR}.csv"
-)
+    # === Apply gas share weights to B_gas and B_nongas rows/columns ===
+    A_weighted = apply_b_gas_weights(df_figaro_split_A, gas_share_matrix)
+    A_weighted.to_csv(GAS_PRICE_SHOCK_DATA/ "processed" / f"A_gas_weighted_{YEAR}.csv")
+
+    print(A_weighted.head())
+
+    Z_weighted = apply_b_gas_weights(df_figaro_split_Z, gas_share_matrix)
+    Z_weighted.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"Z_gas_weighted_{YEAR}.csv")
+
+    print(Z_weighted.head())
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"/ f"results_full.csv",
-    cpi_weights_path  = cpi_file,
-    regions           = per_country_list,
-    output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
-                        f"full_cpi_country_impacts_{YEAR}.csv"
-)
+    return A_weighted
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"/ f"results_intra.csv",
-    cpi_weights_path  = cpi_file,
-    regions           = per_country_list,
-    output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
-                        f"intra_cpi_country_impacts_{YEAR}.csv"
-)
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_extra_{YEAR}.csv",
-    cpi_weights_path  = cpi_file,
-    regions           = per_country_list,
-    output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
-                        f"incl_dom_cpi_country_impacts_extra_{YEAR}.csv"
-)
+def build_cpi_weights() -> None:
+    # === Calculate CPI weights ===
+
+    # === Load EXIOBASE demand matrix for CPI calculation ===
+    _, df_exio_Y = exiobase_frames()
 
-apply_cpi_weights_to_gas_price_shock(
-    price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_intra_extra_{YEAR}.csv",
-    cpi_weights_path  = cpi_file,
-    regions           = per_country_list,
-    output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
-                        f"incl_dom_cpi_country_impacts_intra_extra_{YEAR}.csv"
-)
+    print(df_exio_Y)
+
+    # === Load and aggregate FIGARO data ===
+    df_figaro_Y = pd.read_csv(figaro_Y_path, header=[0, 1], index_col=[0, 1])
+    df_figaro_Y = aggregate_sectors(df_figaro_Y, GAS_FIGARO_MAPPING)
+    df_figaro_Y = merge_countries(df_figaro_Y, countries_to_merge=["AR", "SA"], target="FIGW1")
+    df_figaro_Y.index.names = ["Country", "Sector"]
+    df_figaro_Y.columns.names = ["Country", "Sector"]
+
+    print(df_figaro_Y.head())
+
+    # === Add B_gas and B_nongas rows to FIGARO Y matrix ===
+    figaro_Y_split = split_b_sector_rows_for_final_demand(df_figaro_Y, target_category="P3_S14")
+
+    print(figaro_Y_split.head())
+
+    # === Calculate shares for gas and non-gas sectors ===
+    gas_nongas_shares = compute_origin_specific_b_gas_shares(df_exio_Y, target_category="Final consumption expenditure by households")
+    gas_nongas_shares.to_csv(GAS_PRICE_SHOCK_DATA / "gas_nongas_shares.csv")
+
+    # === Apply Shares to FIGARO Y matrix ===
+    figaro_Y_gas = apply_b_gas_shares_to_Y(figaro_Y_split, gas_nongas_shares)
+    figaro_Y_gas.to_csv(GAS_PRICE_SHOCK_DATA / "processed" / f"Y_gas_{YEAR}.csv")
+
+
+    # === Calculate CPI weights for EU28 region ===
+    EU28_TAG = "eu28"
+    eu28_region_map = {country: "EU28" for country in EU28_COUNTRIES}
+    eu28_output_dir = GAS_PRICE_SHOCK_DATA / "cpi_weights" / EU28_TAG
+
+    calculate_cpi_weights(
+        df=figaro_Y_gas,
+        consumption_code="P3_S14",
+        region_map=eu28_region_map,
+        output_path=eu28_output_dir,
+        filename=f"cpi_weights_{EU28_TAG}_{YEAR}.csv"
+    )
+
+    print(f"CPI weights for EU28 saved to {eu28_output_dir}")
+
+    # === Compute country‐level CPI weights ===
+
+    # region_map=None ⇒ one CPI‐weight column per country
+    calculate_cpi_weights(
+        df=figaro_Y_gas,
+        consumption_code="P3_S14",
+        region_map=None,
+        output_path=country_outdir,
+        filename=f"cpi_weights_{country_tag}_{YEAR}.csv"
+    )
+
+    print(f"CPI weights per country saved to {country_outdir}")
+
+
+def run_gas_shocks() -> None:
+    # === Run gas price shock analysis ===
+
+    # Results with domestic gas sector shocked
+    run_imported_gas_shock(
+        A_matrix=gas_weighted_A(),
+        eu28_countries=EU28_COUNTRIES,
+        shock_factor=SHOCK_FACTOR,
+        intra_eu=False,
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_extra_{YEAR}.csv",
+        debug=True,
+        decompose=True
+    )
+
+    run_imported_gas_shock(
+        A_matrix=gas_weighted_A(),
+        eu28_countries=EU28_COUNTRIES,
+        shock_factor=SHOCK_FACTOR,
+        intra_eu=True,
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_intra_extra_{YEAR}.csv",
+        debug=True,
+        decompose=True
+    )
+
+    # Results with only imported gas sectors shocked
+    df_e, df_f, df_i = simulate_extra_vs_full_gas_shock(
+        A_matrix=gas_weighted_A(),
+        eu28_countries=EU28_COUNTRIES,
+        shock_factor=SHOCK_FACTOR,
+        output_dir=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic",
+        decompose=True
+    )
+
+    print("Gas price shock analysis completed.")
+
+
+def apply_gas_cpi_weights() -> None:
+    # === Apply EU28 CPI weights ===
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_extra.csv",
+        cpi_weights_path=eu28_cpi_file,
+        regions=["EU28", "ROW"],
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "extra_cpi_applied_total_impact_eu28.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_full.csv",
+        cpi_weights_path=eu28_cpi_file,
+        regions=["EU28", "ROW"],
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "full_cpi_applied_total_impact_eu28.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic" / "results_intra.csv",
+        cpi_weights_path=eu28_cpi_file,
+        regions=["EU28", "ROW"],
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "intra_cpi_applied_total_impact_eu28.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_extra_{YEAR}.csv",
+        cpi_weights_path=eu28_cpi_file,
+        regions=["EU28","ROW"],
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "incl_dom_impact_eu28_extra.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path=GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_intra_extra_{YEAR}.csv",
+        cpi_weights_path=eu28_cpi_file,
+        regions=["EU28", "ROW"],
+        output_path=GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / "incl_dom_impact_eu28_intra_extra.csv"
+    )
+
+    # === Discover which country columns we actually have ===
+
+    # Read only the header row (single header)
+    cpi_cols = pd.read_csv(cpi_file, nrows=0).columns
+
+    # Get country codes, skipping index columns
+    per_country_list = [col for col in cpi_cols if not col.startswith('Unnamed:')]
+
+    # === Apply country‐level CPI weights to your shock results ===
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"/ f"results_extra.csv",
+        cpi_weights_path  = cpi_file,
+        regions           = per_country_list,
+        output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
+                            f"extra_cpi_country_impacts_{YEAR}.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"/ f"results_full.csv",
+        cpi_weights_path  = cpi_file,
+        regions           = per_country_list,
+        output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
+                            f"full_cpi_country_impacts_{YEAR}.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "excluding_domestic"/ f"results_intra.csv",
+        cpi_weights_path  = cpi_file,
+        regions           = per_country_list,
+        output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
+                            f"intra_cpi_country_impacts_{YEAR}.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_extra_{YEAR}.csv",
+        cpi_weights_path  = cpi_file,
+        regions           = per_country_list,
+        output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
+                            f"incl_dom_cpi_country_impacts_extra_{YEAR}.csv"
+    )
+
+    apply_cpi_weights_to_gas_price_shock(
+        price_change_path = GAS_PRICE_SHOCK_OUTPUTS / "including_domestic" / f"results_intra_extra_{YEAR}.csv",
+        cpi_weights_path  = cpi_file,
+        regions           = per_country_list,
+        output_path       = GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" /
+                            f"incl_dom_cpi_country_impacts_intra_extra_{YEAR}.csv"
+    )
+
+
+WEIGHTED_IMPACT_PATHS = [
+    GAS_PRICE_SHOCK_OUTPUTS / "weighted_impacts" / name for name in (
+        "extra_cpi_applied_total_impact_eu28.csv",
+        "full_cpi_applied_total_impact_eu28.csv",
+        "intra_cpi_applied_total_impact_eu28.csv",
+        "incl_dom_impact_eu28_extra.csv",
+        "incl_dom_impact_eu28_intra_extra.csv",
+        f"extra_cpi_country_impacts_{YEAR}.csv",
+        f"full_cpi_country_impacts_{YEAR}.csv",
+        f"intra_cpi_country_impacts_{YEAR}.csv",
+        f"incl_dom_cpi_country_impacts_extra_{YEAR}.csv",
+        f"incl_dom_cpi_country_impacts_intra_extra_{YEAR}.csv",
+    )
+]
 
+# Weighted A from the first stage if it ran in this process (see gas_weighted_A)
+_A_weighted = None
+
+@lru_cache(maxsize=None)
+def gas_weighted_A() -> pd.DataFrame:
+    """
+    Weighted A matrix: from the first stage if it ran, otherwise read back from disk.
+    """
+    if _A_weighted is not None:
+        return _A_weighted
+    return pd.read_csv(A_weighted_path, header=[0, 1], index_col=[0, 1])
+
+def run_structural_paths(
+    region: Optional[str] = None,
+    max_depth: int = 6,
+    top_k: int = 20,
+    relative_threshold: float = 1e-6
+) -> Path:
+    """
+    Main supply chains through which the extra-EU gas price shock reaches EU28 prices
+    (same exogenous/endogenous split as run_imported_gas_shock with intra_eu=False).
+
+    With region (e.g. 'EU28') the paths explain the CPI impact of that region (eu28 weights).
+    """
+    from shared.structural_paths import structural_path_analysis
+
+    A = gas_weighted_A()
+    sources = [(c, s) for c, s in A.index if s == "B_gas" and c not in EU28_COUNTRIES]
+    endogenous = [(c, s) for c, s in A.index if c in EU28_COUNTRIES and s != "B_gas"]
+    shocks = pd.Series(SHOCK_FACTOR, index=pd.MultiIndex.from_tuples(sources))
+
+    weights = None
+    if region is not None:
+        weights = pd.read_csv(eu28_cpi_file, header=[0, 1], index_col=[0, 1])[(region, "cpi_weight")]
+
+    paths = structural_path_analysis(A, shocks, endogenous=endogenous, weights=weights, max_depth=max_depth,
+                                     top_k=top_k, relative_threshold=relative_threshold)
+    suffix = f"_{region}" if region is not None else ""
+    out_path = GAS_PRICE_SHOCK_OUTPUTS / "structural_paths" / f"paths_gas{suffix}_{YEAR}.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    paths.to_csv(out_path, index=False)
+    print(f"Top {len(paths)} paths cover {paths.attrs['coverage']:.1%} of the total impact. Saved: {out_path}")
+    return out_path
+
+def run_weighted_impacts_stage(force: bool = False) -> None:
+    """
+    Apply the EU28 and per-country CPI weights to the shock results (last stage).
+    """
+    run_stage(
+        f"gas_weighted_impacts_{YEAR}",
+        apply_gas_cpi_weights,
+        inputs=SHOCK_RESULT_PATHS + [eu28_cpi_file, cpi_file],
+        outputs=WEIGHTED_IMPACT_PATHS,
+        params=STAGE_PARAMS,
+        code=[apply_gas_cpi_weights] + STAGE_CODE,
+        force=force,
+    )
+
+@instrumented_run("gas")
+def main(force: bool = False):
+    global _A_weighted
+
+    # === Run the pipeline stages ===
+    _A_weighted = run_stage(
+        f"gas_weighted_matrices_{YEAR}",
+        build_gas_weighted_matrices,
+        inputs=[figaro_Z_path, figaro_X_path, exiobase_zip_path],
+        outputs=[
+            GAS_PRICE_SHOCK_DATA / "processed" / f"Z_aggregated_{YEAR}.csv",
+            GAS_PRICE_SHOCK_DATA / f"X_aggregated_{YEAR}.csv",
+            GAS_PRICE_SHOCK_DATA / "processed" / f"A_{YEAR}.csv",
+            GAS_PRICE_SHOCK_DATA / "processed" / f"Z_split_{YEAR}.csv",
+            GAS_PRICE_SHOCK_DATA / "processed" / "gas_share_matrix.csv",
+            A_weighted_path,
+            GAS_PRICE_SHOCK_DATA / "processed" / f"Z_gas_weighted_{YEAR}.csv",
+        ],
+        params=STAGE_PARAMS,
+        code=[build_gas_weighted_matrices] + STAGE_CODE,
+        force=force,
+    )
+    gas_weighted_A.cache_clear()
+
+    run_stage(
+        f"gas_shocks_{YEAR}",
+        run_gas_shocks,
+        inputs=[A_weighted_path],
+        outputs=SHOCK_RESULT_PATHS,
+        params=STAGE_PARAMS,
+        code=[run_gas_shocks] + STAGE_CODE,
+        force=force,
+    )
+
+    run_stage(
+        f"gas_cpi_weights_{YEAR}",
+        build_cpi_weights,
+        inputs=[figaro_Y_path, exiobase_zip_path],
+        outputs=[
+            GAS_PRICE_SHOCK_DATA / "gas_nongas_shares.csv",
+            GAS_PRICE_SHOCK_DATA / "processed" / f"Y_gas_{YEAR}.csv",
+            eu28_cpi_file,
+            cpi_file,
+        ],
+        params=STAGE_PARAMS,
+        code=[build_cpi_weights] + STAGE_CODE,
+        force=force,
+    )
+
+    run_weighted_impacts_stage(force=force)
+
+
+if __name__ == "__main__":
+    main()
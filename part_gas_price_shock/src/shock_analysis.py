@@ -3,6 +3,8 @@ import pandas as pd
 from pathlib import Path
 import os
 
+from shared.spillover_decomposition import DECOMPOSITION_COLUMNS, country_blocks, decompose_price_change
+
 def run_imported_gas_shock(
     A_matrix: pd.DataFrame,
     eu28_countries: list,
@@ -10,7 +12,8 @@ def run_imported_gas_shock(
     intra_eu: bool = False,
     output_path: Path = None,
     debug: bool = False,
-    debug_path: Path = None
+    debug_path: Path = None,
+    decompose: bool = False
 ) -> pd.DataFrame:
     """
     Runs the imported gas price shock simulation, and optionally writes out
@@ -24,6 +27,8 @@ def run_imported_gas_shock(
         output_path (Path): Optional path to save result CSV.
         debug (bool): If True, write out the raw P_X vector.
         debug_path (Path): Where to write P_X. If None, defaults to output_path.parent/"P_X_debug.csv".
+        decompose (bool): Add the columns 'Domestic', 'Foreign Input' and 'Feedback', which split the
+                          price change by the country block structure of A (see shared/spillover_decomposition.py).
 
     Returns:
         pd.DataFrame: Price change per (Country, Sector).
@@ -76,6 +81,14 @@ def run_imported_gas_shock(
         columns=["Price Change"]
     )
 
+    if decompose:
+        # Reuses delta_P_E; only the per-country blocks of A_EE' are factorized
+        components = decompose_price_change(
+            A_EE.T, A_XE.T @ P_X, delta_P_E, country_blocks(result_df.index)
+        )
+        for name in DECOMPOSITION_COLUMNS:
+            result_df[name] = components[name].ravel()
+
     if output_path:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         result_df.to_csv(output_path)
@@ -87,7 +100,8 @@ def simulate_extra_vs_full_gas_shock(
     A_matrix: pd.DataFrame,
     eu28_countries: list,
     shock_factor: float = 5.0,
-    output_dir: Path = None
+    output_dir: Path = None,
+    decompose: bool = False
 ):
     """
     Run two gas‐shock scenarios on A_matrix:
@@ -101,11 +115,13 @@ def simulate_extra_vs_full_gas_shock(
     shock_factor  : float, the P_X shock multiplier (e.g. 6.0)
     output_dir    : Path or None. If given, saves CSVs named:
                     'results_extra.csv', 'results_full.csv', 'results_intra.csv'
+    decompose     : bool, add the domestic / foreign input / feedback columns
+                    (see run_imported_gas_shock)
 
     Returns
     -------
     df_extra, df_full, df_intra  : DataFrames with index (Country, Sector) and
-                                   column 'Price Change'
+                                   column 'Price Change' (plus the decomposition columns)
     """
     # Prepare the two matrices
     A_extra = A_matrix.copy()
@@ -130,17 +146,18 @@ def simulate_extra_vs_full_gas_shock(
     df_extra = run_imported_gas_shock(
         A_extra, eu28_countries,
         shock_factor=shock_factor,
-        intra_eu=False
+        intra_eu=False,
+        decompose=decompose
     )
     df_full  = run_imported_gas_shock(
         A_full, eu28_countries,
         shock_factor=shock_factor,
-        intra_eu=True
+        intra_eu=True,
+        decompose=decompose
     )
 
     # Compute pure intra‐EU contribution
-    df_intra = df_full.copy()
-    df_intra["Price Change"] = df_full["Price Change"] - df_extra["Price Change"]
+    df_intra = df_full - df_extra
 
     # Optional: save to CSV
     if output_dir is not None:
@@ -1,5 +1,6 @@
 import sys
 from pathlib import Path
+from typing import Optional
 
 # Extend sys.path to access config and shared modules
 sys.path.append(str(Path(__file__).resolve().parents[2]))
@@ -12,13 +13,42 @@ from scipy.linalg import lu_factor, lu_solve
 from config import (
     SYSTEMIC_PRICES_OUTPUTS,
     SYSTEMIC_UNWEIGHTED_IMPACTS_DIR,
+    ensure_dir,
 )
-
-def compute_unweighted_shocks(A: pd.DataFrame, year: int):
-    
+from sea_processing import select_volatility_year
+from shared.spillover_decomposition import DECOMPOSITION_COLUMNS, decompose_single_sector_shocks
+
+def compute_unweighted_shocks(
+    A: pd.DataFrame,
+    year: int,
+    price_vol: Optional[pd.DataFrame] = None,
+    output_dir: Optional[Path] = None,
+    volatility_surface: Optional[pd.DataFrame] = None,
+    decompose: bool = False
+):
+    """
+    Propagate the price volatility of each sector through A (Leontief price model with
+    that sector exogenous) and save the matrix of impacts on all other sectors.
+
+    Parameters:
+        A (pd.DataFrame): Technical coefficients with (Country, Sector) on both axes.
+        year (int): Year, used in the output filename.
+        price_vol (pd.DataFrame | None): 'price_volatility' column indexed by (Country, Sector).
+                                         If None, the SEA volatility file is read.
+        output_dir (Path | None): Output directory (default: SYSTEMIC_UNWEIGHTED_IMPACTS_DIR).
+        volatility_surface (pd.DataFrame | None): Rolling volatilities with one column per end year
+                                                  (see process_sea_volatility_surface). If given
+                                                  instead of price_vol, the column matching year is used.
+        decompose (bool): Also save the long table unweighted_shock_decomposition_{year}.csv, with each
+                          price change split into domestic propagation, direct foreign input and
+                          multi-country feedback (see shared/spillover_decomposition.py).
+    """
     # Load price volatility
-    vol_path = SYSTEMIC_PRICES_OUTPUTS / "volatility" / "II_PI_volatility.csv"
-    price_vol = pd.read_csv(vol_path, index_col=[0, 1])
+    if price_vol is None and volatility_surface is not None:
+        price_vol = select_volatility_year(volatility_surface, year)
+    elif price_vol is None:
+        vol_path = SYSTEMIC_PRICES_OUTPUTS / "volatility" / "II_PI_volatility.csv"
+        price_vol = pd.read_csv(vol_path, index_col=[0, 1])
 
     impacts = []
 
@@ -35,8 +65,8 @@ def compute_unweighted_shocks(A: pd.DataFrame, year: int):
 
         shock = price_vol.loc[sector, "price_volatility"]
 
-        # Early skip: no volatility
-        if shock == 0:
+        # Early skip: no (or unknown) volatility
+        if pd.isna(shock) or shock == 0:
             continue
 
         # Create masks for dropping the exogenous sector
@@ -86,6 +116,58 @@ def compute_unweighted_shocks(A: pd.DataFrame, year: int):
         df_out = pd.DataFrame()
 
     # Save
-    out_path = SYSTEMIC_UNWEIGHTED_IMPACTS_DIR / f"unweighted_shock_impacts_{year}.csv"
+    out_path = ensure_dir(output_dir or SYSTEMIC_UNWEIGHTED_IMPACTS_DIR) / f"unweighted_shock_impacts_{year}.csv"
     df_out.to_csv(out_path)
     print(f"\n Saved unweighted shock impact matrix for {year} to {out_path}")
+
+    if decompose and not df_out.empty:
+        save_shock_decomposition(A, df_out, price_vol, year, output_dir)
+
+
+def save_shock_decomposition(
+    A: pd.DataFrame,
+    impacts: pd.DataFrame,
+    price_vol: pd.DataFrame,
+    year: int,
+    output_dir: Optional[Path] = None
+) -> Path:
+    """
+    Long table of the unweighted impacts with their domestic / foreign input / feedback split.
+
+    Parameters:
+        A (pd.DataFrame): Technical coefficients used for the impacts.
+        impacts (pd.DataFrame): Unweighted impact matrix (exogenous sectors x affected sectors).
+        price_vol (pd.DataFrame): 'price_volatility' column the impacts were computed with.
+        year (int): Year, used in the output filename.
+        output_dir (Path | None): Output directory (default: SYSTEMIC_UNWEIGHTED_IMPACTS_DIR).
+
+    Returns:
+        Path: The written CSV, one row per (exogenous sector, affected sector) with the columns
+              'Price Change', 'Domestic', 'Foreign Input' and 'Feedback'.
+    """
+    # Column k of dP holds the response to shocking sector k (0 for sectors that were not shocked)
+    exogenous = A.index.get_indexer(impacts.index)
+    dP = impacts.T.reindex(index=A.index, columns=A.index).fillna(0.0).to_numpy(dtype=np.float64)
+    shocks = np.zeros(len(A))
+    shocks[exogenous] = price_vol["price_volatility"].reindex(impacts.index).to_numpy(dtype=np.float64)
+    components = decompose_single_sector_shocks(A, shocks, dP)
+
+    affected = A.index.get_indexer(impacts.columns)
+    rows = np.repeat(exogenous, len(affected))
+    cols = np.tile(affected, len(exogenous))
+    keep = rows != cols
+
+    df_long = pd.DataFrame({
+        "Exogenous Country": A.index.get_level_values(0)[rows[keep]],
+        "Exogenous Sector": A.index.get_level_values(1)[rows[keep]],
+        "Country": A.index.get_level_values(0)[cols[keep]],
+        "Sector": A.index.get_level_values(1)[cols[keep]],
+        "Price Change": dP[cols[keep], rows[keep]],
+    })
+    for name in DECOMPOSITION_COLUMNS:
+        df_long[name] = components[name][cols[keep], rows[keep]]
+
+    out_path = ensure_dir(output_dir or SYSTEMIC_UNWEIGHTED_IMPACTS_DIR) / f"unweighted_shock_decomposition_{year}.csv"
+    df_long.to_csv(out_path, index=False)
+    print(f"Saved domestic / foreign input / feedback split for {year} to {out_path}")
+    return out_path
@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Extend sys.path to access config and shared modules
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import lu_factor, lu_solve
+
+from config import SYSTEMIC_WEIGHTED_IMPACTS_DIR, ensure_dir
+from shared.panel import leontief_inverse_diagonal
+
+
+def cpi_weighted_indirect_impacts(A: np.ndarray, shocks: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    CPI-weighted indirect impacts of every sector's price shock, without the per-sector solves.
+
+    compute_unweighted_shocks solves (I - A_EE') dP = a_k * s_k for each exogenous sector k,
+    where A_EE is A without row and column k and a_k is row k of A without entry k. With
+    G = (I - A')^-1, the block inverse of the principal submatrix gives the exact solution
+    dP = s_k * G[-k, k] / G[k, k], so the weighted indirect impact for CPI weights w is
+
+        w[-k]' dP = s_k * ((I - A)^-1 w)[k] / G[k, k] - s_k * w[k].
+
+    One LU factorization of I - A, one adjoint solve per weight column and the diagonal
+    of the inverse give all sectors at once.
+
+    Parameters:
+        A (np.ndarray): Technical coefficients (n x n).
+        shocks (np.ndarray): Price shock per sector (n).
+        weights (np.ndarray): CPI weights per sector, one column per region (n x r).
+
+    Returns:
+        np.ndarray: Indirect impact per exogenous sector and region (n x r).
+    """
+    n = A.shape[0]
+    lu_piv = lu_factor(np.eye(n) - A)
+    adjoint = lu_solve(lu_piv, weights)
+    diagonal = leontief_inverse_diagonal(lu_piv, n)
+    return shocks[:, None] * (adjoint / diagonal[:, None] - weights)
+
+
+def compute_cpi_weighted_impacts(
+    A: pd.DataFrame,
+    year: int,
+    price_vol: pd.DataFrame,
+    cpi_weights_root: Path,
+    output_dir: Optional[Path] = None,
+    output_prefix: str = "weighted_impacts"
+) -> None:
+    """
+    Fast path for the CPI-weighted impacts: writes the same tables as compute_unweighted_shocks
+    followed by new_apply_all_available_cpi_weights, without building the N x N matrix of
+    unweighted impacts.
+
+    As in the two-step path, sectors with missing (NaN) or zero volatility or missing from A
+    are not shocked, and the 'ROW' region is left out. A scheme whose weight file does not
+    cover every sector of A is skipped; the two-step path drops all of its rows (KeyError)
+    and writes an empty table instead.
+
+    Parameters:
+        A (pd.DataFrame): Technical coefficients with (Country, Sector) on both axes.
+        year (int): Year of data.
+        price_vol (pd.DataFrame): 'price_volatility' column indexed by (Country, Sector).
+        cpi_weights_root (Path): Directory containing subfolders per region tag (e.g. eu28, north_south).
+        output_dir (Path | None): Output directory (default: SYSTEMIC_WEIGHTED_IMPACTS_DIR).
+        output_prefix (str): Filename prefix for output CSVs.
+    """
+    if not A.index.equals(A.columns):
+        raise ValueError("A must have identical row and column labels.")
+
+    shocks = price_vol["price_volatility"].reindex(A.index).fillna(0.0).to_numpy(dtype=np.float64)
+    shocked = np.flatnonzero(shocks != 0)
+    # Same row order as the sorted unweighted impact matrix
+    shocked = shocked[A.index[shocked].argsort()]
+    if len(shocked) == 0:
+        print(f"No sector of {year} has a nonzero price volatility.")
+
+    # Weight columns of all schemes, so one factorization and one adjoint solve serve every region
+    schemes = {}
+    for region_tag_dir in sorted(Path(cpi_weights_root).glob("*")):
+        if not region_tag_dir.is_dir():
+            continue
+
+        region_tag = region_tag_dir.name
+        weight_file = region_tag_dir / f"cpi_weights_{region_tag}_{year}.csv"
+        if not weight_file.exists():
+            print(f"Skipping {region_tag} (missing CPI weight file).")
+            continue
+
+        cpi_weights = pd.read_csv(weight_file, header=[0, 1], index_col=[0, 1])
+        missing = A.index.difference(cpi_weights.index)
+        if len(missing) > 0:
+            print(f"Skipping {region_tag} (no CPI weights for {len(missing)} sectors of A, e.g. {missing[0]}).")
+            continue
+        regions = [r for r in cpi_weights.columns.get_level_values(0).unique() if r != "ROW"]
+        weights = cpi_weights.loc[A.index, [(r, "cpi_weight") for r in regions]]
+        schemes[region_tag] = (regions, weights.to_numpy(dtype=np.float64))
+
+    if not schemes:
+        return
+
+    print(f"Solving CPI-weighted impacts for {year} ({', '.join(schemes)})")
+    all_weights = np.hstack([weights for _, weights in schemes.values()])
+    all_indirect = cpi_weighted_indirect_impacts(A.to_numpy(dtype=np.float64), shocks, all_weights)
+
+    labels = A.index[shocked]
+    offset = 0
+    for region_tag, (regions, weights) in schemes.items():
+        indirect = all_indirect[shocked, offset:offset + len(regions)]
+        direct = weights[shocked] * shocks[shocked, None]
+        offset += len(regions)
+
+        # One row per (exogenous sector, region), sector-major as in the two-step path
+        df_out = pd.DataFrame({
+            "Country": np.repeat(labels.get_level_values(0), len(regions)),
+            "Sector": np.repeat(labels.get_level_values(1), len(regions)),
+            "Region": np.tile(regions, len(shocked)),
+            "Direct Impact": direct.ravel(),
+            "Indirect Impact": indirect.ravel(),
+            "Total Impact": (direct + indirect).ravel(),
+        })
+
+        out_file = ensure_dir(output_dir or SYSTEMIC_WEIGHTED_IMPACTS_DIR) / f"{output_prefix}_{region_tag}_{year}.csv"
+        df_out.to_csv(out_file, index=False)
+        print(f"Saved: {out_file}")
@@ -0,0 +1,292 @@
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Extend sys.path to access config and shared modules
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import lu_factor, lu_solve
+
+from config import SYSTEMIC_PRICES_OUTPUTS, ensure_dir
+from sea_processing import to_long_format, SEA_TO_FIGARO, EXCLUDED_COUNTRIES
+from shared.label_codec import split_labels
+from shared.panel import leontief_inverse_diagonal
+
+MONTE_CARLO_DIR = SYSTEMIC_PRICES_OUTPUTS / "monte_carlo"
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+# Quantiles are read from per-sector histograms of log(draw / point estimate) on this range
+HISTOGRAM_BINS = 1024
+LOG_RATIO_RANGE = (-4.0, 4.0)
+
+
+def sea_price_changes(df: pd.DataFrame, variable: str = "II_PI") -> pd.DataFrame:
+    """
+    Yearly percentage price changes of one SEA variable with FIGARO (Country, Sector) labels.
+
+    These are the observations behind the volatility in <variable>_volatility.csv: their
+    population standard deviation over all years is the point estimate.
+
+    Returns:
+        pd.DataFrame: One row per sector, one column per year (first year dropped).
+    """
+    long = to_long_format(df, [variable])
+    wide = long.set_index(["country", "code", "year"])["value"].unstack("year")
+    changes = wide.diff(axis=1).iloc[:, 1:] / wide.shift(axis=1).iloc[:, 1:] * 100
+
+    countries = changes.index.get_level_values("country")
+    changes = changes[~countries.isin(EXCLUDED_COUNTRIES)]
+    labels = changes.index.get_level_values("country").map(lambda c: SEA_TO_FIGARO.get(c, c))
+    changes.index = split_labels(labels + "_" + changes.index.get_level_values("code"))
+    return changes
+
+
+def bootstrap_volatility_draws(
+    changes: np.ndarray,
+    n_draws: int,
+    chunk_size: int,
+    rng: np.random.Generator
+) -> Iterator[np.ndarray]:
+    """
+    Volatility vectors from resampling the years of the price changes with replacement.
+
+    Every draw resamples the same years for all sectors, so the cross-sectional correlation
+    of price changes is kept. Missing changes are skipped as in the point estimate.
+
+    Yields:
+        np.ndarray: (draws in chunk x sectors) volatilities.
+    """
+    n_years = changes.shape[1]
+    for start in range(0, n_draws, chunk_size):
+        size = min(chunk_size, n_draws - start)
+        years = rng.integers(0, n_years, size=(size, n_years))
+        sampled = changes[:, years]
+        with np.errstate(invalid="ignore"):
+            counts = np.sum(~np.isnan(sampled), axis=2)
+            mean = np.nansum(sampled, axis=2) / np.maximum(counts, 1)
+            variance = np.nansum((sampled - mean[..., None]) ** 2, axis=2) / np.maximum(counts, 1)
+        yield np.sqrt(variance).T
+
+
+def lognormal_volatility_draws(
+    point: np.ndarray,
+    n_draws: int,
+    chunk_size: int,
+    rng: np.random.Generator,
+    sigma: float = 0.25
+) -> Iterator[np.ndarray]:
+    """
+    Volatility vectors from independent multiplicative lognormal noise around the point estimate
+    (median preserving).
+
+    Yields:
+        np.ndarray: (draws in chunk x sectors) volatilities.
+    """
+    for start in range(0, n_draws, chunk_size):
+        size = min(chunk_size, n_draws - start)
+        yield point * np.exp(rng.normal(0.0, sigma, size=(size, len(point))))
+
+
+def impact_coefficients(A: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Impact of a unit price shock of every sector, from one LU factorization of I - A.
+
+    Column 0 is the unweighted impact (sum of the price changes of all other sectors, i.e.
+    the row sum of the unweighted impact matrix); the remaining columns are the total
+    (direct + indirect) CPI-weighted impacts for the given weight columns. With
+    G = (I - A')^-1 (see cpi_adjoint_impacts), these are colsum(G)[k] / G[k, k] - 1 and
+    ((I - A)^-1 w)[k] / G[k, k]. Every impact is linear in the shock, so the impacts of a
+    volatility draw s are s[:, None] * coefficients.
+
+    Parameters:
+        A (np.ndarray): Technical coefficients (n x n).
+        weights (np.ndarray): CPI weights (n x regions).
+
+    Returns:
+        np.ndarray: (n x (1 + regions)) coefficients.
+    """
+    n = A.shape[0]
+    lu_piv = lu_factor(np.eye(n) - A)
+    adjoint = lu_solve(lu_piv, np.column_stack([np.ones(n), weights]))
+    coefficients = adjoint / leontief_inverse_diagonal(lu_piv, n)[:, None]
+    coefficients[:, 0] -= 1.0
+    return coefficients
+
+
+def _descending_ranks(values: np.ndarray) -> np.ndarray:
+    """
+    Rank 1 = largest value along axis 1 (draws x sectors x metrics).
+    """
+    order = np.argsort(-values, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[1] + 1)[None, :, None], axis=1)
+    return ranks
+
+
+def _merge_moments(count: int, mean: np.ndarray, m2: np.ndarray, chunk: np.ndarray) -> tuple:
+    """
+    Add a chunk of draws (along axis 0) to a running count, mean and sum of squared deviations
+    (Chan et al.), which avoids the cancellation of E[x^2] - E[x]^2.
+    """
+    size = len(chunk)
+    chunk_mean = chunk.mean(axis=0)
+    chunk_m2 = ((chunk - chunk_mean) ** 2).sum(axis=0)
+    merged = count + size
+    delta = chunk_mean - mean
+    return merged, mean + delta * (size / merged), m2 + chunk_m2 + delta ** 2 * (count * size / merged)
+
+
+def _histogram_quantiles(histogram: np.ndarray, zeros: np.ndarray, quantiles: tuple, edges: np.ndarray) -> np.ndarray:
+    """
+    Quantiles (sectors x quantiles) of log-ratio histograms, interpolated linearly within bins.
+    Zero draws are counted in zeros (per sector) below the histogram; quantiles falling among
+    them are -inf (a zero volatility).
+    """
+    cumulative = np.cumsum(histogram, axis=1)
+    total = cumulative[:, -1:] + zeros[:, None]
+    result = np.empty((histogram.shape[0], len(quantiles)))
+    for position, q in enumerate(quantiles):
+        target = q * total - zeros[:, None]
+        bins = np.minimum((cumulative < target).sum(axis=1), histogram.shape[1] - 1)
+        below = np.where(bins > 0, np.take_along_axis(cumulative, (bins - 1)[:, None], axis=1)[:, 0], 0)
+        in_bin = np.take_along_axis(histogram, bins[:, None], axis=1)[:, 0]
+        fraction = np.divide(target[:, 0] - below, in_bin, out=np.zeros(len(bins)), where=in_bin > 0)
+        result[:, position] = edges[bins] + fraction * (edges[bins + 1] - edges[bins])
+        result[target[:, 0] <= 0, position] = -np.inf
+    return result
+
+
+def run_monte_carlo(
+    A: pd.DataFrame,
+    price_vol: pd.DataFrame,
+    cpi_weights: pd.DataFrame,
+    n_draws: int = 1000,
+    chunk_size: int = 250,
+    method: str = "bootstrap",
+    price_changes: Optional[pd.DataFrame] = None,
+    sigma: float = 0.25,
+    quantiles: tuple = DEFAULT_QUANTILES,
+    top_k: int = 10,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Monte Carlo bands for the shock impacts of every sector under uncertain volatilities.
+
+    The impact coefficients are computed once (one factorization of I - A); each chunk of
+    draws is then a single array product. Means, standard deviations, ranks and top-k
+    frequencies are accumulated exactly while streaming, quantiles from per-sector
+    histograms of log(draw / point estimate) (about 1% resolution) plus a count of zero
+    (or missing) volatility draws; no draw is kept.
+
+    Parameters:
+        A (pd.DataFrame): Technical coefficients with (Country, Sector) on both axes.
+        price_vol (pd.DataFrame): 'price_volatility' point estimates indexed by (Country, Sector).
+        cpi_weights (pd.DataFrame): CPI weights of one scheme ((region, 'cpi_weight') columns).
+        n_draws (int): Number of volatility draws.
+        chunk_size (int): Draws evaluated at once.
+        method (str): 'bootstrap' (resample the years of price_changes) or 'lognormal'
+                      (multiplicative noise with the given sigma around the point estimate).
+        price_changes (pd.DataFrame | None): Output of sea_price_changes; required for 'bootstrap'.
+        sigma (float): Log standard deviation for 'lognormal'.
+        quantiles (tuple): Quantiles to report.
+        top_k (int): Rank threshold for the top-k frequency.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: One row per shocked sector and metric ('Unweighted' and every region
+                      except 'ROW') with the point estimate, mean, std, quantiles, point rank,
+                      mean rank, rank std and share of draws in the top k.
+    """
+    labels = A.index
+    point = price_vol["price_volatility"].reindex(labels).fillna(0.0).to_numpy(dtype=np.float64)
+    shocked = np.flatnonzero(point != 0)
+
+    regions = [r for r in cpi_weights.columns.get_level_values(0).unique() if r != "ROW"]
+    weights = cpi_weights.loc[:, [(r, "cpi_weight") for r in regions]].reindex(labels).fillna(0.0)
+    metrics = ["Unweighted"] + regions
+    coefficients = impact_coefficients(A.to_numpy(dtype=np.float64), weights.to_numpy(dtype=np.float64))[shocked]
+    point = point[shocked]
+
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        if price_changes is None:
+            raise ValueError("method='bootstrap' needs the SEA price changes (see sea_price_changes).")
+        changes = price_changes.reindex(labels[shocked]).to_numpy(dtype=np.float64)
+        draws = bootstrap_volatility_draws(changes, n_draws, chunk_size, rng)
+    elif method == "lognormal":
+        draws = lognormal_volatility_draws(point, n_draws, chunk_size, rng, sigma)
+    else:
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+
+    n_sectors, n_metrics = coefficients.shape
+    edges = np.linspace(*LOG_RATIO_RANGE, HISTOGRAM_BINS + 1)
+    histogram = np.zeros((n_sectors, HISTOGRAM_BINS), dtype=np.int64)
+    zero_count = np.zeros(n_sectors, dtype=np.int64)
+    mean = np.zeros((n_sectors, n_metrics))
+    m2 = np.zeros((n_sectors, n_metrics))
+    rank_mean = np.zeros((n_sectors, n_metrics))
+    rank_m2 = np.zeros((n_sectors, n_metrics))
+    top_count = np.zeros((n_sectors, n_metrics))
+
+    done = 0
+    for chunk in draws:
+        chunk = np.nan_to_num(chunk)
+        impacts = chunk[:, :, None] * coefficients[None]
+        ranks = _descending_ranks(impacts)
+        _, mean, m2 = _merge_moments(done, mean, m2, impacts)
+        done, rank_mean, rank_m2 = _merge_moments(done, rank_mean, rank_m2, ranks.astype(np.float64))
+        top_count += (ranks <= top_k).sum(axis=0)
+
+        # Zero (or missing, see nan_to_num) volatilities have no log ratio and are counted apart;
+        # point is nonzero for every shocked sector
+        positive = chunk > 0
+        zero_count += (~positive).sum(axis=0)
+        sectors = np.broadcast_to(np.arange(n_sectors), chunk.shape)[positive]
+        log_ratio = np.clip(np.log(chunk[positive] / point[sectors]), edges[0], edges[-1] - 1e-12)
+        bins = np.searchsorted(edges, log_ratio, side="right") - 1
+        np.add.at(histogram, (sectors, bins), 1)
+
+        print(f"Monte Carlo: {done}/{n_draws} draws")
+
+    std = np.sqrt(m2 / n_draws)
+    rank_std = np.sqrt(rank_m2 / n_draws)
+
+    # Impacts are shock x coefficient, so their quantiles are the volatility quantiles scaled
+    # ((I - A)^-1 is nonnegative for a productive A, so the coefficients are as well)
+    volatility_quantiles = point[:, None] * np.exp(_histogram_quantiles(histogram, zero_count, quantiles, edges))
+    point_impacts = point[:, None] * coefficients
+    point_ranks = _descending_ranks(point_impacts[None])[0]
+
+    shocked_labels = labels[shocked]
+    rows = []
+    for m, metric in enumerate(metrics):
+        frame = pd.DataFrame({
+            "Country": shocked_labels.get_level_values(0),
+            "Sector": shocked_labels.get_level_values(1),
+            "Metric": metric,
+            "Point": point_impacts[:, m],
+            "Mean": mean[:, m],
+            "Std": std[:, m],
+        })
+        for position, q in enumerate(quantiles):
+            frame[f"Q{q * 100:g}"] = volatility_quantiles[:, position] * coefficients[:, m]
+        frame["Point Rank"] = point_ranks[:, m]
+        frame["Mean Rank"] = rank_mean[:, m]
+        frame["Rank Std"] = rank_std[:, m]
+        frame[f"Top {top_k} Share"] = top_count[:, m] / n_draws
+        rows.append(frame)
+
+    return pd.concat(rows, ignore_index=True)
+
+
+def save_monte_carlo(result: pd.DataFrame, tag: str, year: int, output_dir: Optional[Path] = None) -> Path:
+    """
+    Save a Monte Carlo summary as monte_carlo_<tag>_<year>.csv (default directory: outputs/monte_carlo).
+    """
+    out_path = ensure_dir(output_dir or MONTE_CARLO_DIR) / f"monte_carlo_{tag}_{year}.csv"
+    result.to_csv(out_path, index=False)
+    print(f"Saved: {out_path}")
+    return out_path
@@ -1,32 +1,95 @@
 # sea_loader.py
 
+import hashlib
+import os
 import sys
 from pathlib import Path
 
 # Add root directory to path so config.py can be imported
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-import requests
-import pandas as pd
-from config import SEA_RAW_DIR
+from config import SEA_RAW_DIR, SEA_CACHE_DIR
 
 SEA_URL = "https://dataverse.nl/api/access/datafile/199095"
 SEA_FILENAME = "WIOD_SEA.xlsx"
 SEA_FILEPATH = SEA_RAW_DIR / SEA_FILENAME
 
+# Label columns of the SEA sheets; every other column is a year of values
+SEA_ID_COLUMNS = ["country", "variable", "description", "code"]
+
 def download_sea_file():
     if not SEA_FILEPATH.exists():
         print(f"Downloading WIOD SEA data from {SEA_URL} ...")
-        response = requests.get(SEA_URL)
-        if response.status_code != 200:
-            raise ValueError(f"Failed to download file: status {response.status_code}")
-        SEA_RAW_DIR.mkdir(parents=True, exist_ok=True)
-        with open(SEA_FILEPATH, "wb") as f:
-            f.write(response.content)
+        from shared.data_loader import download_file
+
+        download_file(SEA_URL, SEA_FILEPATH)
         print(f"File downloaded to: {SEA_FILEPATH}")
     else:
         print(f"File already exists: {SEA_FILEPATH}")
     return SEA_FILEPATH
 
-def load_sea_data(sheet_name: str = "DATA") -> pd.DataFrame:
-    return pd.read_excel(SEA_FILEPATH, sheet_name=sheet_name)
+def get_sea_cache_key(filepath: Path = SEA_FILEPATH, sheet_name: str = "DATA", block_size: int = 1 << 20) -> str:
+    """
+    Build the cache key for a parsed SEA sheet from the content hash of the workbook,
+    so a re-downloaded or edited workbook is parsed again.
+
+    Returns:
+        str: Cache key such as 'DATA_3f2a9c01b7de'.
+    """
+    sha = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return f"{sheet_name}_{sha.hexdigest()[:12]}"
+
+def _cast_sea_dtypes(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Explicit dtypes for a parsed SEA sheet: every year column as float64 (label columns stay strings).
+    """
+    year_cols = [col for col in df.columns if col not in SEA_ID_COLUMNS]
+    return df.astype({col: "float64" for col in year_cols})
+
+def load_sea_data(sheet_name: str = "DATA", use_cache: bool = True) -> "pd.DataFrame":
+    """
+    Load a sheet of the WIOD SEA workbook.
+
+    Parsing the Excel file is slow, so the sheet is converted once into a Parquet file in
+    SEA_CACHE_DIR, keyed by the workbook's content hash. Later calls read the Parquet file.
+    Without pyarrow the workbook is parsed on every call.
+
+    Parameters:
+        sheet_name (str): Sheet to load (default: 'DATA').
+        use_cache (bool): If False, always parse the workbook and refresh the cache.
+
+    Returns:
+        pd.DataFrame: The sheet with label columns and float64 year columns.
+    """
+    import pandas as pd
+
+    cache_key = get_sea_cache_key(SEA_FILEPATH, sheet_name)
+    cache_path = SEA_CACHE_DIR / f"{cache_key}.parquet"
+
+    if use_cache and cache_path.exists():
+        df = pd.read_parquet(cache_path)
+        # Parquet needs string column names; the year columns are ints in the workbook
+        df.columns = [int(col) if col.isdigit() else col for col in df.columns]
+        return df
+
+    print(f"Parsing {SEA_FILEPATH.name} (sheet '{sheet_name}') ...")
+    df = _cast_sea_dtypes(pd.read_excel(SEA_FILEPATH, sheet_name=sheet_name))
+
+    try:
+        SEA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        df.rename(columns=str).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except ImportError:
+        print("pyarrow is not installed; the SEA workbook will be parsed again on the next run.")
+        return df
+
+    # Caches of earlier versions of the workbook are stale
+    for stale in SEA_CACHE_DIR.glob(f"{sheet_name}_*.parquet"):
+        if stale != cache_path:
+            stale.unlink()
+    print(f"Cached parsed SEA sheet in {cache_path}")
+    return df
@@ -1,4 +1,5 @@
 import sys
+import warnings
 from pathlib import Path
 
 # Add the root project directory to the system path
@@ -6,9 +7,9 @@ sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 import numpy as np
 import pandas as pd
-from pathlib import Path
-from config import SEA_PROCESSED_DIR
+from config import SEA_PROCESSED_DIR, ensure_dir
 from sea_loader import load_sea_data
+from shared.label_codec import split_labels
 
 # SEA to FIGARO country code mapping
 SEA_TO_FIGARO = {
@@ -28,42 +29,128 @@ EXCLUDED_COUNTRIES = {"TWN"}
 ADDITIONAL_COUNTRIES = ["SA", "ZA", "AR", "FIGW1"]
 
 
-def calculate_percentage_price_changes(price_data, year_columns):
-    pct_price_changes = price_data[['country', 'variable', 'code']].copy()
-    for i in range(1, len(year_columns)):
-        cur, prev = year_columns[i], year_columns[i - 1]
-        pct_price_changes[f'{cur}_pct_change'] = (
-            (price_data[cur] - price_data[prev]) / price_data[prev]
-        ) * 100
-    return pct_price_changes
+# Price deflators whose volatility is computed (intermediate inputs, gross output, value added)
+PRICE_VARIABLES = ["II_PI", "GO_PI", "VA_PI"]
+
+ID_COLUMNS = ["country", "variable", "description", "code"]
+
+# Number of yearly price changes per rolling volatility window
+ROLLING_WINDOW = 5
+
+
+def to_long_format(df: pd.DataFrame, variables: list[str] = PRICE_VARIABLES) -> pd.DataFrame:
+    """
+    Reshape the wide SEA sheet (one column per year) into long format for the given variables.
+
+    Returns:
+        pd.DataFrame: Columns 'country', 'variable', 'code', 'year', 'value', sorted by series and year.
+    """
+    df = df[df["variable"].isin(variables)]
+    year_cols = [col for col in df.columns if col not in ID_COLUMNS]
+    long = df.melt(id_vars=["country", "variable", "code"], value_vars=year_cols, var_name="year", value_name="value")
+    long["year"] = long["year"].astype(int)
+    return long.sort_values(["variable", "country", "code", "year"], kind="stable").reset_index(drop=True)
+
+
+def calculate_price_volatilities(df: pd.DataFrame, variables: list[str] = PRICE_VARIABLES) -> pd.DataFrame:
+    """
+    Volatility of yearly percentage price changes for several SEA price variables at once.
+
+    The volatility of a series is the population standard deviation of its year-on-year
+    percentage changes (missing changes are skipped), computed for all variables,
+    countries and sectors in one groupby over the long-format sheet.
+
+    Parameters:
+        df (pd.DataFrame): SEA 'DATA' sheet (wide, one column per year).
+        variables (list[str]): SEA variable codes, e.g. ['II_PI', 'GO_PI', 'VA_PI'].
+
+    Returns:
+        pd.DataFrame: Columns 'variable', 'country', 'code', 'price_volatility'.
+    """
+    long = to_long_format(df, variables)
+    keys = ["variable", "country", "code"]
+
+    # Rows are sorted by year within each series, so the previous row is the previous year
+    same_series = (long[keys] == long[keys].shift()).all(axis=1)
+    previous = long["value"].shift().where(same_series)
+    long["pct_change"] = (long["value"] - previous) / previous * 100
+
+    volatility = long.groupby(keys, sort=False)["pct_change"].std(ddof=0)
+    return volatility.rename("price_volatility").reset_index()
 
 
 def calculate_price_volatility(df, variable):
-    df = df[df['variable'] == variable]
-    year_cols = df.columns[4:]
-    pct_changes = calculate_percentage_price_changes(df, year_cols)
-    change_cols = [col for col in pct_changes.columns if col.endswith('_pct_change')]
-    pct_changes['mean_pct_change'] = pct_changes[change_cols].mean(axis=1)
-    pct_changes['price_volatility'] = np.sqrt(
-        ((pct_changes[change_cols].sub(pct_changes['mean_pct_change'], axis=0)) ** 2).mean(axis=1)
-    )
-    return pct_changes[['country', 'code', 'price_volatility']]
+    volatility = calculate_price_volatilities(df, [variable])
+    return volatility[['country', 'code', 'price_volatility']]
+
+
+def calculate_rolling_price_volatilities(
+    df: pd.DataFrame,
+    variables: list[str] = PRICE_VARIABLES,
+    window: int = ROLLING_WINDOW
+) -> pd.DataFrame:
+    """
+    Rolling-window volatility of yearly percentage price changes for every series and end year.
+
+    The volatility for end year t is the population standard deviation of the price changes
+    of years t-window+1 .. t (missing changes are skipped), i.e. calculate_price_volatilities
+    restricted to that window. All series and windows are computed at once on a
+    (series x year) array.
+
+    Parameters:
+        df (pd.DataFrame): SEA 'DATA' sheet (wide, one column per year).
+        variables (list[str]): SEA variable codes, e.g. ['II_PI', 'GO_PI', 'VA_PI'].
+        window (int): Number of yearly changes per window (default: ROLLING_WINDOW).
+
+    Returns:
+        pd.DataFrame: Columns 'variable', 'country', 'code', 'year' (window end year), 'price_volatility'.
+    """
+    keys = ["variable", "country", "code"]
+    wide = to_long_format(df, variables).set_index(keys + ["year"])["value"].unstack("year")
+
+    values = wide.to_numpy(dtype=np.float64)
+    pct_change = (values[:, 1:] - values[:, :-1]) / values[:, :-1] * 100
+    if window < 1 or window > pct_change.shape[1]:
+        raise ValueError(f"window must be between 1 and {pct_change.shape[1]} yearly changes, got {window}.")
+
+    # (series, end year, window) view without copying; all-NaN windows give NaN
+    windows = np.lib.stride_tricks.sliding_window_view(pct_change, window, axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        volatility = np.nanstd(windows, axis=2)
+
+    surface = pd.DataFrame(volatility, index=wide.index, columns=wide.columns[window:])
+    return surface.reset_index().melt(id_vars=keys, var_name="year", value_name="price_volatility")
 
 
 def map_and_adjust_volatility(vol_df):
-    vol_df['country'] = vol_df['country'].replace(SEA_TO_FIGARO)
+    """
+    Map SEA to FIGARO country codes, drop excluded countries and add the FIGARO countries
+    missing from SEA (ADDITIONAL_COUNTRIES) with zero volatility for every sector.
+
+    Works on the output of calculate_price_volatility and, with 'variable' and/or 'year'
+    columns, on that of calculate_price_volatilities and calculate_rolling_price_volatilities
+    (the filler rows are then added per variable and year).
+
+    Returns:
+        pd.DataFrame: Columns 'sector' ('<country>_<code>'), ['variable', 'year',] 'price_volatility', sorted by sector.
+    """
+    vol_df = vol_df.assign(country=vol_df['country'].replace(SEA_TO_FIGARO))
     vol_df = vol_df[~vol_df['country'].isin(EXCLUDED_COUNTRIES)]
 
-    sectors = vol_df['code'].unique()
-    for country in ADDITIONAL_COUNTRIES:
-        for sector in sectors:
-            vol_df = pd.concat([
-                vol_df,
-                pd.DataFrame({'country': [country], 'code': [sector], 'price_volatility': [0]})
-            ], ignore_index=True)
+    # Filler rows: one cross join of countries x sectors (x variables x years)
+    fillers = pd.DataFrame({'country': ADDITIONAL_COUNTRIES}).merge(
+        pd.DataFrame({'code': vol_df['code'].unique()}), how='cross'
+    )
+    extra_cols = [col for col in ('variable', 'year') if col in vol_df.columns]
+    for col in extra_cols:
+        fillers = fillers.merge(pd.DataFrame({col: vol_df[col].unique()}), how='cross')
+    fillers['price_volatility'] = 0.0
 
+    vol_df = pd.concat([vol_df, fillers], ignore_index=True)
     vol_df['sector'] = vol_df['country'] + "_" + vol_df['code']
-    return vol_df[['sector', 'price_volatility']].sort_values(by='sector').reset_index(drop=True)
+    value_cols = extra_cols + ['price_volatility']
+    return vol_df[['sector'] + value_cols].sort_values(by='sector', kind='stable').reset_index(drop=True)
 
 def convert_to_multiindex(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -76,29 +163,91 @@ def convert_to_multiindex(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: MultiIndexed DataFrame with ('Country', 'Sector').
     """
-    countries = []
-    sectors = []
+    df.index = split_labels(df['sector'])
+    return df.drop(columns=["sector"])
 
-    for label in df['sector']:
-        if "_" not in label:
-            raise ValueError(f"Label '{label}' cannot be split at '_'.")
-        country, sector = label.split("_", 1)
-        countries.append(country)
-        sectors.append(sector)
 
-    df.index = pd.MultiIndex.from_arrays([countries, sectors], names=["Country", "Sector"])
-    return df.drop(columns=["sector"])
+def process_sea_volatility(variables: list[str] = PRICE_VARIABLES, output_dir: Path = None) -> dict[str, pd.DataFrame]:
+    """
+    Compute the volatility of every SEA price variable in one pass and save one
+    FIGARO-labelled file per variable ('<variable>_volatility.csv', column 'price_volatility').
+
+    Parameters:
+        variables (list[str]): SEA variable codes (default: PRICE_VARIABLES).
+        output_dir (Path): Output directory (default: SEA_PROCESSED_DIR).
+
+    Returns:
+        dict[str, pd.DataFrame]: Volatility per variable, indexed by (Country, Sector).
+    """
+    df = load_sea_data(sheet_name="DATA")
+    adjusted = map_and_adjust_volatility(calculate_price_volatilities(df, variables))
+    final = convert_to_multiindex(adjusted)
+
+    output_dir = ensure_dir(output_dir or SEA_PROCESSED_DIR)
+    results = {}
+    for variable in variables:
+        results[variable] = final.loc[final['variable'] == variable, ['price_volatility']]
+        output_path = output_dir / f"{variable}_volatility.csv"
+        results[variable].to_csv(output_path)
+        print(f"{variable} volatility saved to: {output_path}")
+    return results
 
 
 def process_sea_ii_volatility() -> pd.DataFrame:
+    return process_sea_volatility()["II_PI"]
+
+
+def process_sea_volatility_surface(
+    variables: list[str] = PRICE_VARIABLES,
+    window: int = ROLLING_WINDOW,
+    output_dir: Path = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Compute the rolling volatility surface of every SEA price variable and save one
+    FIGARO-labelled file per variable ('<variable>_volatility_rolling.csv').
+
+    Parameters:
+        variables (list[str]): SEA variable codes (default: PRICE_VARIABLES).
+        window (int): Number of yearly changes per window (default: ROLLING_WINDOW).
+        output_dir (Path): Output directory (default: SEA_PROCESSED_DIR).
+
+    Returns:
+        dict[str, pd.DataFrame]: Per variable, volatilities indexed by (Country, Sector)
+                                 with one column per window end year.
+    """
     df = load_sea_data(sheet_name="DATA")
-    volatility = calculate_price_volatility(df, "II_PI")
-    adjusted = map_and_adjust_volatility(volatility)
-    final = convert_to_multiindex(adjusted)  # ← new step here
+    adjusted = map_and_adjust_volatility(calculate_rolling_price_volatilities(df, variables, window))
+
+    output_dir = ensure_dir(output_dir or SEA_PROCESSED_DIR)
+    results = {}
+    for variable in variables:
+        subset = adjusted[adjusted['variable'] == variable]
+        surface = subset.pivot(index='sector', columns='year', values='price_volatility')
+        surface.index = split_labels(surface.index)
+        surface.columns.name = None
+        results[variable] = surface
+        output_path = output_dir / f"{variable}_volatility_rolling.csv"
+        surface.to_csv(output_path)
+        print(f"{variable} rolling volatility ({window}-year window) saved to: {output_path}")
+    return results
+
+
+def select_volatility_year(surface: pd.DataFrame, year: int) -> pd.DataFrame:
+    """
+    Take the volatility vector of one year from a rolling volatility surface.
 
-    SEA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-    output_path = SEA_PROCESSED_DIR / "II_PI_volatility.csv"
-    final.to_csv(output_path)
-    print(f"II_PI volatility saved to: {output_path}")
-    return final
+    Years outside the SEA range use the nearest available window (e.g. FIGARO 2020
+    uses the window ending in the last SEA year).
 
+    Parameters:
+        surface (pd.DataFrame): Output of process_sea_volatility_surface (one column per end year).
+        year (int): Year of the shock analysis.
+
+    Returns:
+        pd.DataFrame: 'price_volatility' column indexed by (Country, Sector).
+    """
+    end_years = np.array([int(col) for col in surface.columns])
+    position = int(np.abs(end_years - year).argmin())
+    if end_years[position] != year:
+        print(f"No volatility window ends in {year}; using the window ending in {end_years[position]}.")
+    return surface.iloc[:, [position]].set_axis(['price_volatility'], axis=1)
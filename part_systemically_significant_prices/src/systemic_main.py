@@ -1,7 +1,10 @@
 # part_systemically_significant_prices/src/systemic_main.py
 
 import sys
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+import numpy as np
 import pandas as pd
 
 # Extend sys.path to access config and shared modules
@@ -11,8 +14,9 @@ from config import (
     SYSTEMIC_PRICES_OUTPUTS, SYSTEMIC_PRICES_DATA,
     FIGARO_FULL_MATRIX_DIR, SYSTEMIC_FULL_MATRIX_DIR,
     SYSTEMIC_Z_MATRIX_DIR, SYSTEMIC_A_MATRIX_DIR, SYSTEMIC_X_VECTOR_DIR, SYSTEMIC_Y_MATRIX_DIR, SYSTEMIC_CPI_WEIGHTS_DIR,
-    SYSTEMIC_UNWEIGHTED_IMPACTS_DIR, SYSTEMIC_WEIGHTED_IMPACTS_DIR,
-    EU28_COUNTRIES, IPSEN_REGION_MAP, EU_NORTH_SOUTH_MAP, EU_WEST_EAST_MAP, CLUSTER_REGION_MAP_2019
+    SYSTEMIC_UNWEIGHTED_IMPACTS_DIR, SYSTEMIC_WEIGHTED_IMPACTS_DIR, SYSTEMIC_PANEL_DIR,
+    EU28_COUNTRIES, IPSEN_REGION_MAP, EU_NORTH_SOUTH_MAP, EU_WEST_EAST_MAP, CLUSTER_REGION_MAP_2019,
+    ensure_dir
 )
 
 from shared.data_loader import load_figaro_processed
@@ -21,11 +25,29 @@ from shared.technical_coefficients import (
 )
 from shared.aggregation import aggregate_sectors
 from shared.cpi_weights import calculate_cpi_weights, new_apply_all_available_cpi_weights
-from shared.extraction import extract_Z_matrix, extract_X_vector, extract_Y_matrix, extract_VA_matrix
-from shared.preprocessing import add_gross_output_row
-from sea_loader import download_sea_file
-from sea_processing import process_sea_ii_volatility
+from shared.extraction import partition_io_table
+from shared.preprocessing import add_gross_output_row, save_matrix_outputs
+from shared.binary_store import binary_path_for
+from shared.stage_cache import run_stage
+from shared.instrumentation import instrumented_run, stage
+from shared.panel import (
+    load_panel, stack_panel, panel_cpi_weights, panel_cpi_weighted_indirect_impacts, panel_changes, panel_to_long,
+)
+import shared.aggregation
+import shared.cpi_weights
+import shared.extraction
+import shared.technical_coefficients
+import shared.panel
+import shared.spillover_decomposition
+import sea_processing
+import analyze_unweighted_shocks
+import cpi_adjoint_impacts
+from sea_loader import download_sea_file, SEA_FILEPATH
+from sea_processing import (
+    process_sea_volatility, process_sea_volatility_surface, select_volatility_year, PRICE_VARIABLES, ROLLING_WINDOW,
+)
 from analyze_unweighted_shocks import compute_unweighted_shocks
+from cpi_adjoint_impacts import compute_cpi_weighted_impacts
 
 
 
@@ -40,14 +62,287 @@ FINAL_DEMAND_CODES = {
     "P3_S13", "P3_S14", "P3_S15", "P51G", "P5M",
 }
 
+# Volatility of every SEA price variable; II_PI drives the shock analysis
+VOLATILITY_PATHS = {variable: SYSTEMIC_PRICES_OUTPUTS / "volatility" / f"{variable}_volatility.csv" for variable in PRICE_VARIABLES}
+VOLATILITY_PATH = VOLATILITY_PATHS["II_PI"]
+
+# Rolling volatility per (country, sector, window end year); used with rolling_volatility=True
+VOLATILITY_SURFACE_PATHS = {
+    variable: SYSTEMIC_PRICES_OUTPUTS / "volatility" / f"{variable}_volatility_rolling.csv" for variable in PRICE_VARIABLES
+}
+VOLATILITY_SURFACE_PATH = VOLATILITY_SURFACE_PATHS["II_PI"]
+
+# CPI weighting schemes: tag -> region map (None = one column per country)
+CPI_REGION_MAPS = {
+    "individual": None,
+    "eu28": {c: "EU28" for c in EU28_COUNTRIES},
+    "ipsen": IPSEN_REGION_MAP,
+    "north_south": EU_NORTH_SOUTH_MAP,
+    "west_east": EU_WEST_EAST_MAP,
+    "cluster": CLUSTER_REGION_MAP_2019,
+}
+
+
+def cpi_weights_path(tag: str, year: int) -> Path:
+    return SYSTEMIC_CPI_WEIGHTS_DIR / tag / f"cpi_weights_{tag}_{year}.csv"
+
+
+def volatility_path(year: int, rolling_volatility: bool = False) -> Path:
+    """
+    Shock vector used for a year: the full-sample II_PI volatility, or with rolling_volatility
+    the year-matched column of the rolling surface (written by the year volatility stage).
+    """
+    if not rolling_volatility:
+        return VOLATILITY_PATH
+    return SYSTEMIC_PRICES_OUTPUTS / "volatility" / "rolling" / f"II_PI_volatility_{year}.csv"
+
+
+def aggregate_and_extract(df: pd.DataFrame, year: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Aggregate one FIGARO year, extract Z, X, Y and A and save them.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: (aggregated full table, A)
+    """
+    # Step 5: Sector aggregation (systemic-specific)
+    df = aggregate_sectors(df, AGGREGATION_MAPPING_FIGARO_SYSTEMIC)
+
+    # Fix missing MultiIndex level names (due to CSV reload or pandas transformations)
+    df.index.names = ["Country", "Sector"]
+    df.columns.names = ["Country", "Sector"]
+
+    # Make sure df.index is really a MultiIndex with correct names
+    if not isinstance(df.index, pd.MultiIndex):
+        print("Rebuilding index as MultiIndex manually.")
+        df.index = pd.MultiIndex.from_tuples(df.index, names=["Country", "Sector"])
+
+    df.index.names = ["Country", "Sector"]  # Reinforce
+    df.columns.names = ["Country", "Sector"]
+
+
+    # Ensure the DataFrame is sorted
+    df = df.sort_index()
+
+    # Step 6: Extract matrices (views on one block-ordered copy of the table; Y keeps the W2 rows)
+    blocks = partition_io_table(df, FINAL_DEMAND_CODES, value_added_codes=None, y_rows="all")
+    Z, X, Y = blocks["Z"], blocks["X"], blocks["Y"]
+    A = calculate_technical_coefficients(Z, X)
+
+    # Step 7: Finalize MultiIndex level names before saving
+    df.index.names = ["Country", "Sector"]
+    df.columns.names = ["Country", "Sector"]
+    Z.index.names = ["Country", "Sector"]
+    Z.columns.names = ["Country", "Sector"]
+    A.index.names = ["Country", "Sector"]
+    A.columns.names = ["Country", "Sector"]
+    X.index.names = ["Country", "Sector"]
+    Y.index.names = ["Country", "Sector"]
+    Y.columns.names = ["Country", "Sector"]
+
+    # Step 8: Save outputs (Z, A, X and Y also as binary copies for load_matrix_file / load_panel)
+    ensure_dir(SYSTEMIC_FULL_MATRIX_DIR)
+    df.to_csv(SYSTEMIC_FULL_MATRIX_DIR / f"figaro_aggregated_{year}.csv")
+    save_matrix_outputs(Z, SYSTEMIC_Z_MATRIX_DIR / f"Z_{year}.csv")
+    save_matrix_outputs(A, SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv")
+    save_matrix_outputs(X.to_frame(name="gross_output"), SYSTEMIC_X_VECTOR_DIR / f"X_{year}.csv")
+    save_matrix_outputs(Y, SYSTEMIC_Y_MATRIX_DIR / f"Y_{year}.csv")
+
+    return df, A
+
+
+def calculate_all_cpi_weights(df: pd.DataFrame, year: int) -> None:
+    """
+    Step 8b: CPI weights (aggregated sectors) for every weighting scheme in CPI_REGION_MAPS.
+    """
+    print(f"Calculating CPI weights for {year}...")
+    for tag, region_map in CPI_REGION_MAPS.items():
+        path = cpi_weights_path(tag, year)
+        calculate_cpi_weights(df, region_map=region_map, output_path=path.parent, filename=path.name)
+
+
+def run_weighted_impacts_stage(year: int, force: bool = False, rolling_volatility: bool = False) -> None:
+    """
+    Step 10: Apply the CPI weights of every scheme to the unweighted impacts of one year.
+    """
+    unweighted_path = SYSTEMIC_UNWEIGHTED_IMPACTS_DIR / f"unweighted_shock_impacts_{year}.csv"
+    vol_path = volatility_path(year, rolling_volatility)
+    run_stage(
+        f"systemic_weighted_impacts_{year}",
+        lambda: new_apply_all_available_cpi_weights(
+            year=year,
+            unweighted_impacts_path=unweighted_path,
+            price_volatility_path=vol_path,
+            cpi_weights_root=SYSTEMIC_CPI_WEIGHTS_DIR,
+            output_dir=SYSTEMIC_WEIGHTED_IMPACTS_DIR,
+            output_prefix="weighted_impacts"
+        ),
+        inputs=[unweighted_path, vol_path] + [cpi_weights_path(tag, year) for tag in CPI_REGION_MAPS],
+        outputs=[SYSTEMIC_WEIGHTED_IMPACTS_DIR / f"weighted_impacts_{tag}_{year}.csv" for tag in CPI_REGION_MAPS],
+        params={"year": year, "schemes": list(CPI_REGION_MAPS), "rolling_volatility": rolling_volatility},
+        code=[shared.cpi_weights],
+        force=force,
+    )
+
+
+def panel_output_paths(tag: str) -> tuple[Path, Path]:
+    return (
+        SYSTEMIC_PANEL_DIR / f"weighted_impacts_{tag}_panel.csv",
+        SYSTEMIC_PANEL_DIR / f"weighted_impacts_{tag}_panel_changes.csv",
+    )
+
+
+def compute_panel_cpi_impacts(years: list[int], rolling_volatility: bool = False) -> None:
+    """
+    Panel mode: CPI-weighted impacts of all years from one (years x N x N) stack of A.
+
+    CPI weights come from the stacked final demand and the weighted impacts from batched
+    adjoint solves (see shared/panel.py). For every weighting scheme, one long table
+    (Year, Country, Sector, Region, Direct/Indirect/Total Impact) and the year-over-year
+    changes of the total impact are written to SYSTEMIC_PANEL_DIR.
+    """
+    A_panel = load_panel({year: SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv" for year in years}, header=[0, 1], index_col=[0, 1])
+    Y_panel = load_panel({year: SYSTEMIC_Y_MATRIX_DIR / f"Y_{year}.csv" for year in years}, header=[0, 1], index_col=[0, 1])
+    labels = A_panel["index"]
+    shocks = stack_panel({
+        year: pd.read_csv(volatility_path(year, rolling_volatility), index_col=[0, 1])["price_volatility"]
+        for year in years
+    })
+    shock_values = pd.DataFrame(shocks["values"].T, index=shocks["index"]).reindex(labels).fillna(0.0).to_numpy().T
+
+    for tag, region_map in CPI_REGION_MAPS.items():
+        weights = panel_cpi_weights(Y_panel, "P3_S14", region_map)
+        regions = [r for r in weights["columns"] if r != "ROW"]
+        rows = weights["index"].get_indexer(labels)
+        weight_values = np.where(
+            (rows >= 0)[None, :, None],
+            weights["values"][:, rows][:, :, [weights["columns"].get_loc(r) for r in regions]],
+            0.0,
+        )
+
+        direct = shock_values[..., None] * weight_values
+        indirect = panel_cpi_weighted_indirect_impacts(A_panel["values"], shock_values, weight_values)
+        impacts = {"years": A_panel["years"], "index": labels, "columns": pd.Index(regions, name="Region")}
+
+        table = panel_to_long({**impacts, "values": direct}, "Direct Impact")
+        table["Indirect Impact"] = indirect.ravel()
+        table["Total Impact"] = table["Direct Impact"] + table["Indirect Impact"]
+        table = table[np.repeat(shock_values.ravel() != 0, len(regions))]
+
+        changes = panel_to_long(panel_changes({**impacts, "values": direct + indirect}), "Total Impact Change")
+
+        panel_path, changes_path = panel_output_paths(tag)
+        ensure_dir(panel_path.parent)
+        table.to_csv(panel_path, index=False)
+        changes.to_csv(changes_path, index=False)
+        print(f"Saved: {panel_path}")
+
+
+def run_structural_paths(
+    year: int,
+    sector: tuple[str, str],
+    tag: Optional[str] = None,
+    region: Optional[str] = None,
+    max_depth: int = 6,
+    top_k: int = 20,
+    relative_threshold: float = 1e-6
+) -> Path:
+    """
+    Main supply chains through which the volatility of one sector reaches other prices
+    (see shared/structural_paths.py), with that sector exogenous as in compute_unweighted_shocks.
+
+    Without tag the paths explain the unweighted sum of price changes; with a CPI weighting
+    scheme tag and one of its regions they explain that region's CPI impact.
+    """
+    from shared.structural_paths import structural_path_analysis
+
+    if (tag is None) != (region is None):
+        raise ValueError("tag and region must be given together (a CPI weighting scheme and one of its regions).")
+
+    A = pd.read_csv(SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv", header=[0, 1], index_col=[0, 1])
+    price_vol = pd.read_csv(VOLATILITY_PATH, index_col=[0, 1])
+    if sector not in price_vol.index or price_vol.loc[sector, "price_volatility"] == 0:
+        raise ValueError(f"{sector} has no price volatility to propagate.")
+    shocks = pd.Series([price_vol.loc[sector, "price_volatility"]], index=pd.MultiIndex.from_tuples([sector]))
+
+    weights = None
+    if tag is not None:
+        cpi_weights = pd.read_csv(cpi_weights_path(tag, year), header=[0, 1], index_col=[0, 1])
+        if (region, "cpi_weight") not in cpi_weights.columns:
+            regions = list(cpi_weights.columns.get_level_values(0).unique())
+            raise ValueError(f"Region '{region}' is not part of the '{tag}' weights (available: {regions}).")
+        weights = cpi_weights[(region, "cpi_weight")]
+
+    paths = structural_path_analysis(A, shocks, weights=weights, max_depth=max_depth, top_k=top_k,
+                                     relative_threshold=relative_threshold)
+    suffix = f"_{tag}_{region}" if tag is not None else ""
+    out_path = ensure_dir(SYSTEMIC_PRICES_OUTPUTS / "structural_paths") / f"paths_{sector[0]}_{sector[1]}{suffix}_{year}.csv"
+    paths.to_csv(out_path, index=False)
+    print(f"Top {len(paths)} paths cover {paths.attrs['coverage']:.1%} of the total impact. Saved: {out_path}")
+    return out_path
+
+
+@instrumented_run("systemic_monte_carlo")
+def run_monte_carlo_analysis(
+    year: int,
+    tag: str = "eu28",
+    n_draws: int = 1000,
+    chunk_size: int = 250,
+    method: str = "bootstrap",
+    sigma: float = 0.25,
+    seed: int = 0
+) -> Path:
+    """
+    Monte Carlo confidence bands for the shock impacts of one year (see monte_carlo.py).
+
+    Needs the outputs of a previous systemic run for that year (A, volatility, CPI weights).
+    The bootstrap resamples the years of the SEA II_PI price changes.
+    """
+    from sea_loader import load_sea_data
+    from monte_carlo import run_monte_carlo, sea_price_changes, save_monte_carlo
+
+    A = pd.read_csv(SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv", header=[0, 1], index_col=[0, 1])
+    price_vol = pd.read_csv(VOLATILITY_PATH, index_col=[0, 1])
+    cpi_weights = pd.read_csv(cpi_weights_path(tag, year), header=[0, 1], index_col=[0, 1])
+    price_changes = sea_price_changes(load_sea_data(sheet_name="DATA"), "II_PI") if method == "bootstrap" else None
+
+    with stage(f"systemic_monte_carlo_{year}"):
+        result = run_monte_carlo(
+            A, price_vol, cpi_weights, n_draws=n_draws, chunk_size=chunk_size, method=method,
+            price_changes=price_changes, sigma=sigma, seed=seed,
+        )
+    return save_monte_carlo(result, tag, year)
+
 
-def main():
+@instrumented_run("systemic")
+def main(
+    force: bool = False,
+    rolling_volatility: bool = False,
+    cpi_only: bool = False,
+    panel: bool = False,
+    decompose: bool = False
+):
     print("=== Systemically Significant Prices: Full Pipeline ===")
 
     # Step 1: Download and process WIOD SEA volatility data
-    download_sea_file()
-    sea_vol_df = process_sea_ii_volatility()
-    sea_vol_df.to_csv(SYSTEMIC_PRICES_OUTPUTS / "volatility" / "II_PI_volatility.csv")
+    with stage("systemic_sea_download"):
+        download_sea_file()
+
+    def run_sea_volatility():
+        for variable, sea_vol_df in process_sea_volatility(PRICE_VARIABLES).items():
+            ensure_dir(VOLATILITY_PATHS[variable].parent)
+            sea_vol_df.to_csv(VOLATILITY_PATHS[variable])
+        for variable, surface in process_sea_volatility_surface(PRICE_VARIABLES, ROLLING_WINDOW).items():
+            surface.to_csv(VOLATILITY_SURFACE_PATHS[variable])
+
+    run_stage(
+        "systemic_sea_volatility",
+        run_sea_volatility,
+        inputs=[SEA_FILEPATH],
+        outputs=list(VOLATILITY_PATHS.values()) + list(VOLATILITY_SURFACE_PATHS.values()),
+        params={"window": ROLLING_WINDOW},
+        code=[sea_processing],
+        force=force,
+    )
 
     # Step 2: Detect available preprocessed FIGARO matrices
     year_files = FIGARO_FULL_MATRIX_DIR.glob("figaro_matrix_*.csv")
@@ -58,99 +353,127 @@ def main():
     if not available_years:
         raise RuntimeError("No processed FIGARO files found.")
 
-    # Step 4: Load all full matrices
-    figaro_data = load_figaro_processed(available_years)
+    # Step 4: Full matrices are loaded lazily, only for years whose aggregation stage has to run
+    shared_code = [shared.aggregation, shared.extraction, shared.technical_coefficients]
 
     for year in available_years:
         print(f"\n--- Processing FIGARO year: {year} ---")
-        df = figaro_data[year]
-
-        # Step 5: Sector aggregation (systemic-specific)
-        df = aggregate_sectors(df, AGGREGATION_MAPPING_FIGARO_SYSTEMIC)
-
-        # Fix missing MultiIndex level names (due to CSV reload or pandas transformations)
-        df.index.names = ["Country", "Sector"]
-        df.columns.names = ["Country", "Sector"]
-
-        # Make sure df.index is really a MultiIndex with correct names
-        if not isinstance(df.index, pd.MultiIndex):
-            print("Rebuilding index as MultiIndex manually.")
-            df.index = pd.MultiIndex.from_tuples(df.index, names=["Country", "Sector"])
-
-        df.index.names = ["Country", "Sector"]  # Reinforce
-        df.columns.names = ["Country", "Sector"]
-
-
-        # Ensure the DataFrame is sorted
-        df = df.sort_index()
-
-        # Step 6: Extract matrices
-        Z = extract_Z_matrix(df)
-        X = extract_X_vector(df, FINAL_DEMAND_CODES)
-        Y = extract_Y_matrix(df)
-        VA = extract_VA_matrix(df)
-        A = calculate_technical_coefficients(Z, X)
-
-        # Step 7: Finalize MultiIndex level names before saving
-        df.index.names = ["Country", "Sector"]
-        df.columns.names = ["Country", "Sector"]
-        Z.index.names = ["Country", "Sector"]
-        Z.columns.names = ["Country", "Sector"]
-        A.index.names = ["Country", "Sector"]
-        A.columns.names = ["Country", "Sector"]
-        X.index.names = ["Country", "Sector"]
-        Y.index.names = ["Country", "Sector"]
-        Y.columns.names = ["Country", "Sector"]
-
-        # Step 8: Save outputs
-        df.to_csv(SYSTEMIC_FULL_MATRIX_DIR / f"figaro_aggregated_{year}.csv")
-        Z.to_csv(SYSTEMIC_Z_MATRIX_DIR / f"Z_{year}.csv")
-        A.to_csv(SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv")
-        X.to_frame(name="gross_output").to_csv(SYSTEMIC_X_VECTOR_DIR / f"X_{year}.csv")
-        Y.to_csv(SYSTEMIC_Y_MATRIX_DIR / f"Y_{year}.csv")
 
-        # Step 8b: CPI weights (aggregated sectors)
-        print(f"Calculating CPI weights for {year}...")
+        figaro_path = FIGARO_FULL_MATRIX_DIR / f"figaro_matrix_{year}.csv"
+        full_path = SYSTEMIC_FULL_MATRIX_DIR / f"figaro_aggregated_{year}.csv"
+        A_path = SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv"
+        matrix_paths = [
+            A_path,
+            SYSTEMIC_Z_MATRIX_DIR / f"Z_{year}.csv",
+            SYSTEMIC_X_VECTOR_DIR / f"X_{year}.csv",
+            SYSTEMIC_Y_MATRIX_DIR / f"Y_{year}.csv",
+        ]
+        unweighted_path = SYSTEMIC_UNWEIGHTED_IMPACTS_DIR / f"unweighted_shock_impacts_{year}.csv"
 
-        REGION_MAP_EU28 = {c: "EU28" for c in EU28_COUNTRIES}
+        # Steps 5-8: aggregation, extraction, A (the in-memory results are reused below if it ran)
+        aggregated = run_stage(
+            f"systemic_aggregate_{year}",
+            lambda: aggregate_and_extract(load_figaro_processed([year])[year], year),
+            inputs=[figaro_path, binary_path_for(figaro_path)],
+            outputs=[full_path] + matrix_paths + [binary_path_for(path) for path in matrix_paths],
+            params={"aggregation": AGGREGATION_MAPPING_FIGARO_SYSTEMIC, "final_demand": FINAL_DEMAND_CODES},
+            code=[aggregate_and_extract, save_matrix_outputs] + shared_code,
+            force=force,
+        )
 
-        calculate_cpi_weights(df, output_path=SYSTEMIC_CPI_WEIGHTS_DIR / "individual", filename=f"cpi_weights_individual_{year}.csv")
-        calculate_cpi_weights(df, region_map=REGION_MAP_EU28, output_path=SYSTEMIC_CPI_WEIGHTS_DIR / "eu28", filename=f"cpi_weights_eu28_{year}.csv")
-        calculate_cpi_weights(df, region_map=IPSEN_REGION_MAP, output_path=SYSTEMIC_CPI_WEIGHTS_DIR / "ipsen", filename=f"cpi_weights_ipsen_{year}.csv")
-        calculate_cpi_weights(df, region_map=EU_NORTH_SOUTH_MAP, output_path=SYSTEMIC_CPI_WEIGHTS_DIR / "north_south", filename=f"cpi_weights_north_south_{year}.csv")
-        calculate_cpi_weights(df, region_map=EU_WEST_EAST_MAP, output_path=SYSTEMIC_CPI_WEIGHTS_DIR / "west_east", filename=f"cpi_weights_west_east_{year}.csv")
-        calculate_cpi_weights(df, region_map=CLUSTER_REGION_MAP_2019, output_path=SYSTEMIC_CPI_WEIGHTS_DIR / "cluster", filename=f"cpi_weights_cluster_{year}.csv")
+        @lru_cache(maxsize=None)
+        def aggregated_table() -> pd.DataFrame:
+            if aggregated is not None:
+                return aggregated[0]
+            return pd.read_csv(full_path, header=[0, 1], index_col=[0, 1])
 
+        @lru_cache(maxsize=None)
+        def technical_coefficients() -> pd.DataFrame:
+            if aggregated is not None:
+                return aggregated[1]
+            return pd.read_csv(A_path, header=[0, 1], index_col=[0, 1])
 
-        # Step 9: Calculate unweighted shock impacts (only if not yet saved)
-        unweighted_path = SYSTEMIC_UNWEIGHTED_IMPACTS_DIR / f"unweighted_shock_impacts_{year}.csv"
+        # Step 8b: CPI weights (aggregated sectors)
+        weight_paths = [cpi_weights_path(tag, year) for tag in CPI_REGION_MAPS]
+        run_stage(
+            f"systemic_cpi_weights_{year}",
+            lambda: calculate_all_cpi_weights(aggregated_table(), year),
+            inputs=[full_path],
+            outputs=weight_paths,
+            params={"region_maps": CPI_REGION_MAPS, "consumption_code": "P3_S14"},
+            code=[calculate_all_cpi_weights, shared.cpi_weights],
+            force=force,
+        )
 
-        if unweighted_path.exists():
-            print(f"Skipping unweighted shocks for {year} (already exists).")
-        else:
-            print(f"Calculating unweighted shocks for {year} ...")
-            compute_unweighted_shocks(A, year)
+        # Step 8c: Year-matched shock vector from the rolling volatility surface
+        vol_path = volatility_path(year, rolling_volatility)
+        if rolling_volatility:
+            def write_year_volatility():
+                surface = pd.read_csv(VOLATILITY_SURFACE_PATH, index_col=[0, 1])
+                select_volatility_year(surface, year).to_csv(ensure_dir(vol_path.parent) / vol_path.name)
+
+            run_stage(
+                f"systemic_year_volatility_{year}",
+                write_year_volatility,
+                inputs=[VOLATILITY_SURFACE_PATH],
+                outputs=[vol_path],
+                code=[select_volatility_year],
+                force=force,
+            )
+
+        # Panel mode: impacts of all years are computed together after the loop
+        if panel:
+            continue
+
+        # Steps 9-10 in one: CPI-weighted impacts from adjoint solves, without the N x N unweighted impacts
+        if cpi_only:
+            run_stage(
+                f"systemic_cpi_adjoint_{year}",
+                lambda: compute_cpi_weighted_impacts(
+                    technical_coefficients(), year, pd.read_csv(vol_path, index_col=[0, 1]),
+                    cpi_weights_root=SYSTEMIC_CPI_WEIGHTS_DIR, output_dir=SYSTEMIC_WEIGHTED_IMPACTS_DIR,
+                ),
+                inputs=[A_path, vol_path] + weight_paths,
+                outputs=[SYSTEMIC_WEIGHTED_IMPACTS_DIR / f"weighted_impacts_{tag}_{year}.csv" for tag in CPI_REGION_MAPS],
+                params={"year": year, "schemes": list(CPI_REGION_MAPS), "rolling_volatility": rolling_volatility},
+                code=[cpi_adjoint_impacts, shared.panel],
+                force=force,
+            )
+            continue
+
+        # Step 9: Calculate unweighted shock impacts (recomputed only if A, the volatilities or the code changed)
+        # (with decompose, also the long domestic / foreign input / feedback table)
+        decomposition_path = SYSTEMIC_UNWEIGHTED_IMPACTS_DIR / f"unweighted_shock_decomposition_{year}.csv"
+        run_stage(
+            f"systemic_unweighted_shocks_{year}",
+            lambda: compute_unweighted_shocks(
+                technical_coefficients(), year, price_vol=pd.read_csv(vol_path, index_col=[0, 1]), decompose=decompose
+            ),
+            inputs=[A_path, vol_path],
+            outputs=[unweighted_path] + ([decomposition_path] if decompose else []),
+            params={"decompose": decompose},
+            code=[analyze_unweighted_shocks, shared.spillover_decomposition],
+            force=force,
+        )
 
         # Step 10: Apply CPI weights to compute weighted impacts
-        WEIGHT_SCENARIOS = {
-            "individual": SYSTEMIC_CPI_WEIGHTS_DIR / "individual" / f"cpi_weights_individual_{year}.csv",
-            "eu28": SYSTEMIC_CPI_WEIGHTS_DIR / "eu28" / f"cpi_weights_eu28_{year}.csv",
-            "ipsen": SYSTEMIC_CPI_WEIGHTS_DIR / "ipsen" / f"cpi_weights_ipsen_{year}.csv",
-            "north_south": SYSTEMIC_CPI_WEIGHTS_DIR / "north_south" / f"cpi_weights_north_south_{year}.csv",
-            "west_east": SYSTEMIC_CPI_WEIGHTS_DIR / "west_east" / f"cpi_weights_west_east_{year}.csv",
-            "cluster": SYSTEMIC_CPI_WEIGHTS_DIR / "cluster" / f"cpi_weights_cluster_{year}.csv"
-        }
-
-        new_apply_all_available_cpi_weights(
-            year=year,
-            unweighted_impacts_path=SYSTEMIC_UNWEIGHTED_IMPACTS_DIR / f"unweighted_shock_impacts_{year}.csv",
-            price_volatility_path=SYSTEMIC_PRICES_OUTPUTS / "volatility" / "II_PI_volatility.csv",
-            cpi_weights_root=SYSTEMIC_CPI_WEIGHTS_DIR,
-            output_dir=SYSTEMIC_WEIGHTED_IMPACTS_DIR,
-            output_prefix="weighted_impacts"
+        run_weighted_impacts_stage(year, force=force, rolling_volatility=rolling_volatility)
+
+    if panel:
+        run_stage(
+            "systemic_panel_cpi_impacts",
+            lambda: compute_panel_cpi_impacts(available_years, rolling_volatility),
+            inputs=(
+                [SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv" for year in available_years]
+                + [SYSTEMIC_Y_MATRIX_DIR / f"Y_{year}.csv" for year in available_years]
+                + [volatility_path(year, rolling_volatility) for year in available_years]
+            ),
+            outputs=[path for tag in CPI_REGION_MAPS for path in panel_output_paths(tag)],
+            params={"region_maps": CPI_REGION_MAPS, "consumption_code": "P3_S14"},
+            code=[compute_panel_cpi_impacts, shared.panel],
+            force=force,
         )
 
-
     print("\n=== All FIGARO years processed successfully ===")
 
 
@@ -0,0 +1,212 @@
+# shared/binary_store.py
+
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+def labels_path_for(values_path: Path) -> Path:
+    """
+    Return the path of the label archive that belongs to a binary matrix file.
+
+    Parameters:
+        values_path (Path): Path to the '.npy' file holding the matrix values.
+
+    Returns:
+        Path: Path to the '.labels.npz' file next to it (e.g. 'Z_2010.labels.npz').
+    """
+    values_path = Path(values_path)
+    return values_path.with_name(values_path.stem + ".labels.npz")
+
+
+def binary_path_for(csv_path: Path) -> Path:
+    """
+    Return the binary '.npy' counterpart of a CSV output path.
+
+    Parameters:
+        csv_path (Path): Path to a CSV file (e.g. 'Z_matrix/Z_2010.csv').
+
+    Returns:
+        Path: Same location with '.npy' suffix (e.g. 'Z_matrix/Z_2010.npy').
+    """
+    return Path(csv_path).with_suffix(".npy")
+
+
+def _encode_axis(prefix: str, axis: pd.Index) -> dict:
+    """
+    Encode an Index or MultiIndex as plain unicode arrays (one per level) for np.savez.
+    """
+    if isinstance(axis, pd.MultiIndex):
+        levels = [axis.get_level_values(i) for i in range(axis.nlevels)]
+    else:
+        levels = [axis]
+
+    arrays = {f"{prefix}_nlevels": np.array(len(levels))}
+    for i, level in enumerate(levels):
+        arrays[f"{prefix}_level_{i}"] = np.asarray(level.astype(str), dtype=str)
+    arrays[f"{prefix}_names"] = np.array(["" if n is None else str(n) for n in axis.names], dtype=str)
+    return arrays
+
+
+def _decode_axis(prefix: str, archive) -> pd.Index:
+    """
+    Rebuild an Index or MultiIndex from the arrays written by _encode_axis.
+    """
+    nlevels = int(archive[f"{prefix}_nlevels"])
+    levels = [archive[f"{prefix}_level_{i}"] for i in range(nlevels)]
+    names = [n if n != "" else None for n in archive[f"{prefix}_names"].tolist()]
+
+    if nlevels == 1:
+        return pd.Index(levels[0], name=names[0], dtype=object)
+    return pd.MultiIndex.from_arrays(levels, names=names)
+
+
+def write_axis_labels(values_path: Path, index: pd.Index, columns: pd.Index) -> Path:
+    """
+    Write the row and column labels of a binary matrix to its label archive.
+
+    Parameters:
+        values_path (Path): Path to the '.npy' file the labels belong to.
+        index (pd.Index): Row labels (Index or MultiIndex).
+        columns (pd.Index): Column labels (Index or MultiIndex).
+
+    Returns:
+        Path: Path to the written label archive.
+    """
+    labels_path = labels_path_for(values_path)
+    labels_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = labels_path.with_name(labels_path.name + ".tmp")
+
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **_encode_axis("index", index), **_encode_axis("columns", columns))
+    os.replace(tmp_path, labels_path)
+    return labels_path
+
+
+def read_axis_labels(values_path: Path) -> tuple[pd.Index, pd.Index]:
+    """
+    Read the row and column labels of a binary matrix.
+
+    Parameters:
+        values_path (Path): Path to the '.npy' file the labels belong to.
+
+    Returns:
+        tuple[pd.Index, pd.Index]: (index, columns)
+    """
+    with np.load(labels_path_for(values_path), allow_pickle=False) as archive:
+        return _decode_axis("index", archive), _decode_axis("columns", archive)
+
+
+def save_binary_frame(
+    df: Union[pd.DataFrame, pd.Series],
+    values_path: Path,
+    dtype: np.dtype = np.float64
+) -> Path:
+    """
+    Save a numeric DataFrame as a raw '.npy' array plus a compact label archive.
+
+    The values file is written to a temporary name first and renamed afterwards,
+    so readers never see a half-written matrix. The old label archive is removed
+    before the values are replaced and the new one is written last, so an existing
+    pair (see binary_frame_exists) always has labels that belong to its values.
+
+    Parameters:
+        df (pd.DataFrame | pd.Series): Numeric matrix (or vector) with Index or MultiIndex labels.
+        values_path (Path): Target '.npy' path.
+        dtype (np.dtype): Storage dtype for the values (default: float64).
+
+    Returns:
+        Path: Path to the written '.npy' file.
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+
+    values_path = Path(values_path)
+    values_path.parent.mkdir(parents=True, exist_ok=True)
+
+    values = np.ascontiguousarray(df.to_numpy(dtype=dtype))
+    tmp_path = values_path.with_name(values_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+
+    labels_path_for(values_path).unlink(missing_ok=True)
+    os.replace(tmp_path, values_path)
+    write_axis_labels(values_path, df.index, df.columns)
+
+    return values_path
+
+
+def load_binary_frame(values_path: Path, mmap_mode: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a matrix written by save_binary_frame.
+
+    Parameters:
+        values_path (Path): Path to the '.npy' file.
+        mmap_mode (str | None): Passed to np.load. Use 'r' to memory-map the values
+                                read-only instead of reading them into RAM.
+
+    Returns:
+        pd.DataFrame: Matrix with the original row and column labels.
+    """
+    index, columns = read_axis_labels(values_path)
+    values = np.load(values_path, mmap_mode=mmap_mode, allow_pickle=False)
+    if values.shape != (len(index), len(columns)):
+        raise ValueError(
+            f"{values_path} holds a {values.shape} array, but its labels describe "
+            f"({len(index)}, {len(columns)})."
+        )
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def binary_frame_exists(values_path: Path) -> bool:
+    """
+    Check whether both the values and the label archive of a binary matrix exist.
+    """
+    values_path = Path(values_path)
+    return values_path.exists() and labels_path_for(values_path).exists()
+
+
+def open_binary_frame_writer(
+    values_path: Path,
+    index: pd.Index,
+    columns: pd.Index,
+    dtype: np.dtype = np.float64
+) -> np.memmap:
+    """
+    Create a writable memory-mapped '.npy' array for a matrix that is filled piece by piece.
+
+    The values go to a temporary file until close_binary_frame_writer renames it into
+    place and writes the labels.
+
+    Parameters:
+        values_path (Path): Final '.npy' path.
+        index (pd.Index): Row labels of the full matrix.
+        columns (pd.Index): Column labels of the full matrix.
+        dtype (np.dtype): Storage dtype (default: float64).
+
+    Returns:
+        np.memmap: Zero-initialised array of shape (len(index), len(columns)).
+    """
+    values_path = Path(values_path)
+    values_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = values_path.with_name(values_path.name + ".tmp")
+    return np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(len(index), len(columns)))
+
+
+def close_binary_frame_writer(values_path: Path, values: np.memmap, index: pd.Index, columns: pd.Index) -> Path:
+    """
+    Flush a memory-mapped array from open_binary_frame_writer, move it to its final path
+    and write its labels (last, as in save_binary_frame).
+    """
+    values_path = Path(values_path)
+    values.flush()
+    tmp_path = Path(values.filename)
+    del values
+    labels_path_for(values_path).unlink(missing_ok=True)
+    os.replace(tmp_path, values_path)
+    write_axis_labels(values_path, index, columns)
+    return values_path
@@ -181,7 +181,8 @@ def apply_all_available_cpi_weights(
 
         # Export results to CSV
         out_df = pd.DataFrame(results)
-        out_path = output_dir / f"{output_prefix}_{region_tag}_{year}.csv"
+        out_path = Path(output_dir) / f"{output_prefix}_{region_tag}_{year}.csv"
+        out_path.parent.mkdir(parents=True, exist_ok=True)
         out_df.to_csv(out_path, index=False)
         print(f"Saved weighted impact results to: {out_path}")
 
@@ -261,6 +262,7 @@ def new_apply_all_available_cpi_weights(
 
         # Save result
         df_out = pd.DataFrame(results)
-        out_file = output_dir / f"{output_prefix}_{region_tag}_{year}.csv"
+        out_file = Path(output_dir) / f"{output_prefix}_{region_tag}_{year}.csv"
+        out_file.parent.mkdir(parents=True, exist_ok=True)
         df_out.to_csv(out_file, index=False)
         print(f"Saved: {out_file}")
\ No newline at end of file
@@ -1,7 +1,8 @@
 # shared/data_loader.py
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import requests
 import sys
 import pandas as pd
 
@@ -9,33 +10,111 @@ import pandas as pd
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from config import FIGARO_RAW_DIR  # centralized FIGARO raw data path
+from shared.binary_store import load_binary_frame, binary_frame_exists, binary_path_for
 
 FIGARO_BASE_URL = (
     "https://ec.europa.eu/eurostat/documents/51957/19580762/" 
     "matrix_eu-ic-io_ind-by-ind_24ed_{year}.csv"
 )
 
-def download_figaro_file(year: int) -> Path:
+_SESSION = None
+
+def get_http_session(pool_size: int = 8, retries: int = 3) -> "requests.Session":
+    """
+    Return a shared requests.Session with a pooled, retrying HTTP adapter.
+
+    Reusing one session keeps TCP/TLS connections to the same host alive across
+    downloads instead of reconnecting for every year.
+
+    Parameters:
+        pool_size (int): Maximum number of pooled connections per host.
+        retries (int): Retries on connection errors and 5xx responses.
+
+    Returns:
+        requests.Session: Module-wide session.
+    """
+    global _SESSION
+    if _SESSION is None:
+        # requests is only imported once something is actually downloaded
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(total=retries, backoff_factor=1.0, status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        _SESSION = requests.Session()
+        _SESSION.mount("http://", adapter)
+        _SESSION.mount("https://", adapter)
+    return _SESSION
+
+def download_file(url: str, filepath: Path, session: "requests.Session" = None, chunk_size: int = 1 << 20) -> Path:
+    """
+    Stream a URL to disk without holding the response body in memory.
+
+    Data is written to '<file>.part' and renamed into place once complete, so an
+    interrupted download never leaves a truncated file under the final name. If a
+    '.part' file is left over from an earlier attempt, the download resumes with an
+    HTTP Range request; servers that ignore the range simply send the full file again.
+    A 416 reply whose Content-Range total equals the size of the '.part' file means the
+    earlier attempt already received everything, so the file is just renamed into place.
+
+    Parameters:
+        url (str): Source URL.
+        filepath (Path): Final target path.
+        session (requests.Session): Session to use (default: get_http_session()).
+        chunk_size (int): Bytes per write.
+
+    Returns:
+        Path: Path to the completed file.
+    """
+    session = session or get_http_session()
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    part_path = filepath.with_name(filepath.name + ".part")
+
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=(10, 300)) as response:
+        if response.status_code == 416:
+            # Range not satisfiable: either the '.part' file is already complete
+            # ('Content-Range: bytes */<total>') or it does not match the remote file
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit() and int(total) == offset:
+                os.replace(part_path, filepath)
+                return filepath
+            part_path.unlink()
+            return download_file(url, filepath, session, chunk_size)
+        if response.status_code not in (200, 206):
+            raise ValueError(f"Failed to download {url} (HTTP {response.status_code})")
+
+        mode = "ab" if response.status_code == 206 else "wb"
+        with open(part_path, mode) as f:
+            for block in response.iter_content(chunk_size=chunk_size):
+                f.write(block)
+
+    os.replace(part_path, filepath)
+    return filepath
+
+def download_figaro_file(year: int, base_url: str = FIGARO_BASE_URL, raw_dir: Path = FIGARO_RAW_DIR) -> Path:
     """
     Download a FIGARO CSV file for the specified year if it does not already exist.
 
     Parameters:
         year (int): Year of the FIGARO dataset.
+        base_url (str): URL template with a '{year}' placeholder (default: Eurostat).
+        raw_dir (Path): Directory for the raw files (default: FIGARO_RAW_DIR).
 
     Returns:
         Path: Path to the downloaded or existing file.
     """
     filename = f"figaro_matrix_{year}.csv"
-    filepath = FIGARO_RAW_DIR / filename
+    filepath = Path(raw_dir) / filename
 
     if not filepath.exists():
-        url = FIGARO_BASE_URL.format(year=year)
+        url = base_url.format(year=year)
         print(f"Downloading FIGARO data for {year} from {url} ...")
-        response = requests.get(url)
-        if response.status_code != 200:
-            raise ValueError(f"Failed to download FIGARO data for {year}: {url}")
-        with open(filepath, "wb") as f:
-            f.write(response.content)
+        download_file(url, filepath)
         print(f"Downloaded and saved FIGARO data for {year} at {filepath}")
     else:
         print(f"FIGARO data for {year} already exists at {filepath}")
@@ -43,30 +122,39 @@ def download_figaro_file(year: int) -> Path:
     return filepath
 
 
-def get_figaro_file_paths(start_year=2010, end_year=2022) -> dict:
+def get_figaro_file_paths(start_year=2010, end_year=2022, max_workers: int = 4,
+                          base_url: str = FIGARO_BASE_URL, raw_dir: Path = FIGARO_RAW_DIR) -> dict:
     """
     Download and return file paths for FIGARO datasets between two years.
+    Missing years are downloaded concurrently over the shared session.
 
     Parameters:
         start_year (int): First year to include (default: 2010).
         end_year (int): Last year to include (default: 2022).
+        max_workers (int): Number of concurrent downloads (default: 4).
+        base_url (str): URL template with a '{year}' placeholder (default: Eurostat).
+        raw_dir (Path): Directory for the raw files (default: FIGARO_RAW_DIR).
 
     Returns:
         dict: A dictionary mapping years to file paths.
     """
-    file_paths = {}
-    for year in range(start_year, end_year + 1):
-        path = download_figaro_file(year)
-        file_paths[year] = path
+    years = list(range(start_year, end_year + 1))
+    get_http_session(pool_size=max(max_workers, 1))
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = {year: executor.submit(download_figaro_file, year, base_url, raw_dir) for year in years}
+        file_paths = {year: futures[year].result() for year in years}
     return file_paths
 
-def load_figaro_processed(years: list[int]) -> dict[int, pd.DataFrame]:
+def load_figaro_processed(years: list[int], prefer_binary: bool = True) -> dict[int, pd.DataFrame]:
     """
     Load preprocessed FIGARO matrices with MultiIndex for given years.
     Ensures that MultiIndex levels are named ['Country', 'Sector'].
 
     Parameters:
         years (list[int]): List of years to load.
+        prefer_binary (bool): Read the binary copy written by preprocess_figaro_data if it
+                              exists, otherwise fall back to the CSV (default: True).
 
     Returns:
         dict[int, pd.DataFrame]: Dictionary of {year: MultiIndexed DataFrame}
@@ -76,10 +164,14 @@ def load_figaro_processed(years: list[int]) -> dict[int, pd.DataFrame]:
     data = {}
     for year in years:
         path = FIGARO_FULL_MATRIX_DIR / f"figaro_matrix_{year}.csv"
-        if not path.exists():
-            raise FileNotFoundError(f"FIGARO processed file for {year} not found: {path}")
+        binary_path = binary_path_for(path)
 
-        df = pd.read_csv(path, index_col=[0, 1], header=[0, 1])
+        if prefer_binary and binary_frame_exists(binary_path):
+            df = load_binary_frame(binary_path)
+        elif path.exists():
+            df = pd.read_csv(path, index_col=[0, 1], header=[0, 1])
+        else:
+            raise FileNotFoundError(f"FIGARO processed file for {year} not found: {path}")
 
         # Ensure consistent MultiIndex naming
         df.index.names = ["Country", "Sector"]
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from typing import Optional
 
 # This list must match the codes used in your final demand columns
 FINAL_DEMAND_CODES = {"P3_S13", "P3_S14", "P3_S15", "P51G", "P5M"}
@@ -56,4 +58,131 @@ def extract_VA_matrix(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Value added matrix filtered by Country == "W2".
     """
-    return df[df.index.get_level_values("Country") == "W2"]
\ No newline at end of file
+    return df[df.index.get_level_values("Country") == "W2"]
+
+def classify_io_labels(
+    index: pd.MultiIndex,
+    columns: pd.MultiIndex,
+    final_demand_codes: set = FINAL_DEMAND_CODES,
+    value_added_codes: Optional[set] = VALUE_ADDED_CODES
+) -> dict[str, np.ndarray]:
+    """
+    Classify the rows and columns of an IO table in one pass over each label axis.
+
+    Rows are industries (any country except 'W2'/'GO'), value added (country 'W2' with a
+    code in value_added_codes, or every 'W2' row if value_added_codes is None), other
+    'W2' rows and the gross output row ('GO', 'GO'). Columns are industries (neither a
+    final demand code nor country 'W2' nor a 'cpi_weight' column) and final demand.
+
+    Returns:
+        dict[str, np.ndarray]: Boolean masks 'industry_rows', 'va_rows', 'go_rows',
+                               'industry_cols' and 'fd_cols'.
+    """
+    row_country = index.get_level_values(0)
+    row_sector = index.get_level_values(1)
+    col_country = columns.get_level_values(0)
+    col_sector = columns.get_level_values(1).astype(str)
+
+    w2_rows = np.asarray(row_country == "W2")
+    va_rows = w2_rows if value_added_codes is None else w2_rows & np.asarray(row_sector.isin(value_added_codes))
+    go_rows = np.asarray(row_country == "GO")
+    fd_cols = np.asarray(col_sector.isin(final_demand_codes))
+
+    return {
+        "industry_rows": ~(w2_rows | go_rows),
+        "va_rows": va_rows,
+        "go_rows": go_rows,
+        "industry_cols": ~fd_cols & ~np.asarray(col_country == "W2") & ~np.asarray(col_sector.str.contains("cpi_weight")),
+        "fd_cols": fd_cols,
+    }
+
+
+def _block_order(*masks: np.ndarray) -> np.ndarray:
+    """
+    Positions of the True entries of each mask in turn, followed by all remaining positions
+    (a stable partition: the original order is kept within each block).
+    """
+    selected = np.concatenate([np.flatnonzero(mask) for mask in masks])
+    rest = np.ones(len(masks[0]), dtype=bool)
+    rest[selected] = False
+    return np.concatenate([selected, np.flatnonzero(rest)])
+
+
+def partition_io_table(
+    df: pd.DataFrame,
+    final_demand_codes: set = FINAL_DEMAND_CODES,
+    value_added_codes: Optional[set] = VALUE_ADDED_CODES,
+    y_rows: str = "industry"
+) -> dict:
+    """
+    Split a full IO table (with ('GO', 'GO') row) into Z, Y, VA and X as views on one array.
+
+    Rows are arranged as [industries, value added, other W2 rows, GO] and columns as
+    [industries, final demand, other], keeping the original order within each block.
+    Every submatrix is then a plain slice of that single array, so no block is copied.
+    If the table already has this layout (e.g. a processed FIGARO table) the array is
+    the table's own buffer; otherwise it is built with one reordering copy.
+
+    Parameters:
+        df (pd.DataFrame): Full table with (Country, Sector) MultiIndex on both axes.
+        final_demand_codes (set): Sector codes of final demand columns.
+        value_added_codes (set | None): Sector codes of value added rows (None: every 'W2' row).
+        y_rows (str): 'industry' for Y = industry rows x final demand, or 'all' to also keep
+                      the value added and other W2 rows (everything except GO). With 'all',
+                      Y keeps the rows in the order of df.index; if that differs from the
+                      block order, Y is a copy rather than a view.
+
+    Returns:
+        dict: 'full' (reordered table), 'Z', 'Y', 'VA' (DataFrames), 'X' (gross output of the
+              industry columns) and 'GO' (gross output row over all columns), all sharing memory.
+    """
+    if y_rows not in ("industry", "all"):
+        raise ValueError("y_rows must be 'industry' or 'all'.")
+
+    masks = classify_io_labels(df.index, df.columns, final_demand_codes, value_added_codes)
+    if masks["go_rows"].sum() != 1:
+        raise ValueError("The table needs exactly one ('GO', 'GO') row (see add_gross_output_row).")
+
+    n_ind, n_va = int(masks["industry_rows"].sum()), int(masks["va_rows"].sum())
+    n_ind_cols, n_fd = int(masks["industry_cols"].sum()), int(masks["fd_cols"].sum())
+
+    other_rows = ~(masks["industry_rows"] | masks["va_rows"] | masks["go_rows"])
+    row_order = _block_order(masks["industry_rows"], masks["va_rows"], other_rows, masks["go_rows"])
+    col_order = _block_order(masks["industry_cols"], masks["fd_cols"])
+    rows_sorted = np.array_equal(row_order, np.arange(len(row_order)))
+    cols_sorted = np.array_equal(col_order, np.arange(len(col_order)))
+
+    values = df.to_numpy(copy=False)
+    if not rows_sorted and not cols_sorted:
+        values = values[np.ix_(row_order, col_order)]
+    elif not rows_sorted:
+        values = values[row_order]
+    elif not cols_sorted:
+        values = values[:, col_order]
+
+    index = df.index if rows_sorted else df.index[row_order]
+    columns = df.columns if cols_sorted else df.columns[col_order]
+    ind, fd, va = slice(0, n_ind), slice(n_ind_cols, n_ind_cols + n_fd), slice(n_ind, n_ind + n_va)
+
+    def view(rows, cols: slice) -> pd.DataFrame:
+        return pd.DataFrame(values[rows, cols], index=index[rows], columns=columns[cols], copy=False)
+
+    if y_rows == "industry":
+        y_row_sel = ind
+    elif rows_sorted:
+        y_row_sel = slice(0, len(index) - 1)
+    else:
+        # Positions in the block-ordered array of all non-GO rows, in the input table's order
+        block_position = np.empty_like(row_order)
+        block_position[row_order] = np.arange(len(row_order))
+        y_row_sel = block_position[~masks["go_rows"]]
+
+    go_row = pd.Series(values[-1], index=columns, name=("GO", "GO"), copy=False)
+    return {
+        "full": view(slice(None), slice(None)),
+        "Z": view(ind, slice(0, n_ind_cols)),
+        "Y": view(y_row_sel, fd),
+        "VA": view(va, slice(None)),
+        "X": go_row.iloc[:n_ind_cols],
+        "GO": go_row,
+    }
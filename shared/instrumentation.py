@@ -0,0 +1,292 @@
+# shared/instrumentation.py
+
+import contextlib
+import csv
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from config import ensure_dir
+
+# psutil gives per-stage peak RSS and I/O byte counts; without it only times are recorded
+# (plus the process-wide RSS high-water mark where the resource module exists)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Set MASTERTHESIS_INSTRUMENT=1 to record every stage, MASTERTHESIS_PROFILE=1 to also dump cProfile stats
+INSTRUMENT_ENV = "MASTERTHESIS_INSTRUMENT"
+PROFILE_ENV = "MASTERTHESIS_PROFILE"
+
+# Seconds between RSS samples while a stage runs
+RSS_SAMPLE_INTERVAL = 0.05
+
+REPORT_FIELDS = [
+    "stage", "parent", "status", "cached", "wall_s", "cpu_s",
+    "rss_start_mb", "rss_end_mb", "peak_rss_mb", "read_mb", "written_mb", "profile",
+]
+
+_RECORDS: list[dict] = []
+_STACK: list[str] = []
+_RUN = {"label": None, "started": None, "report_dir": None}
+_PROFILERS: list = []
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "0").lower() in ("1", "true", "on", "yes")
+
+
+def instrumentation_enabled() -> bool:
+    """
+    Return True if stages are recorded (MASTERTHESIS_INSTRUMENT=1, or profiling switched on).
+    """
+    return _env_flag(INSTRUMENT_ENV) or _env_flag(PROFILE_ENV)
+
+
+def profiling_enabled() -> bool:
+    return _env_flag(PROFILE_ENV)
+
+
+def _io_bytes(process) -> tuple[Optional[int], Optional[int]]:
+    """
+    Bytes read and written by the process so far (including page cache hits where the OS reports them).
+    """
+    if process is None:
+        return None, None
+    try:
+        counters = process.io_counters()
+    except (AttributeError, OSError, psutil.Error):
+        return None, None
+    read = getattr(counters, "read_chars", counters.read_bytes)
+    written = getattr(counters, "write_chars", counters.write_bytes)
+    return read, written
+
+
+def _max_rss_bytes() -> Optional[int]:
+    """
+    Process-wide RSS high-water mark from getrusage (kilobytes on Linux, bytes on macOS).
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class _RssSampler(threading.Thread):
+    """
+    Background thread that polls the RSS of the process and keeps the maximum.
+    """
+
+    def __init__(self, process, interval: float = RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.process = process
+        self.interval = interval
+        self.peak = process.memory_info().rss
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.peak = max(self.peak, self.process.memory_info().rss)
+            except psutil.Error:
+                return
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+        return self.peak
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / 2**20, 3)
+
+
+def _profile_path(name: str) -> Path:
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    run_dir = f"{_RUN['label'] or 'run'}_{_RUN['started'] or datetime.now():%Y%m%d_%H%M%S}"
+    return ensure_dir(_report_dir() / "profiles" / run_dir) / f"{safe_name}.prof"
+
+
+def _report_dir() -> Path:
+    if _RUN["report_dir"] is not None:
+        return Path(_RUN["report_dir"])
+    from config import RUN_REPORTS_DIR
+    return RUN_REPORTS_DIR
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Record wall time, CPU time, peak RSS and bytes read/written for a block of work.
+
+    Stages may be nested; each record keeps the name of the enclosing stage. The yielded
+    dict is the record and may be annotated by the caller (e.g. record['cached'] = True).
+    With instrumentation switched off, nothing is measured and an empty dict is yielded.
+
+    Example:
+        with stage("systemic_aggregate_2019"):
+            ...
+    """
+    if not instrumentation_enabled():
+        yield {}
+        return
+
+    process = psutil.Process() if psutil is not None else None
+    record = {"stage": name, "parent": _STACK[-1] if _STACK else None, "status": "ok", "cached": False}
+    _STACK.append(name)
+
+    sampler = _RssSampler(process) if process is not None else None
+    if sampler is not None:
+        record["rss_start_mb"] = _mb(sampler.peak)
+        sampler.start()
+    read_start, written_start = _io_bytes(process)
+
+    # Only one cProfile profiler can be active, so the enclosing stage's profiler is paused
+    # while this one runs: each dump covers the stage's own work, excluding nested stages
+    profiler = None
+    if profiling_enabled():
+        if _PROFILERS:
+            _PROFILERS[-1].disable()
+        profiler = cProfile.Profile()
+        _PROFILERS.append(profiler)
+        profiler.enable()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "failed"
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall_start, 6)
+        record["cpu_s"] = round(time.process_time() - cpu_start, 6)
+
+        if profiler is not None:
+            profiler.disable()
+            _PROFILERS.pop()
+            path = _profile_path(name)
+            profiler.dump_stats(path)
+            record["profile"] = str(path)
+            if _PROFILERS:
+                _PROFILERS[-1].enable()
+
+        if sampler is not None:
+            record["peak_rss_mb"] = _mb(sampler.stop())
+            record["rss_end_mb"] = _mb(process.memory_info().rss)
+        else:
+            record["peak_rss_mb"] = _mb(_max_rss_bytes())
+
+        read_end, written_end = _io_bytes(process)
+        if read_start is not None and read_end is not None:
+            record["read_mb"] = _mb(read_end - read_start)
+            record["written_mb"] = _mb(written_end - written_start)
+
+        _STACK.pop()
+        _RECORDS.append(record)
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    """
+    Decorator form of stage(); the stage name defaults to the function name.
+    """
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation_enabled():
+                return func(*args, **kwargs)
+            with stage(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def get_records() -> list[dict]:
+    """
+    Return the stage records collected so far (in completion order, i.e. inner stages first).
+    """
+    return list(_RECORDS)
+
+
+def write_report(label: str = "run", report_dir: Optional[Path] = None) -> Optional[tuple[Path, Path]]:
+    """
+    Write the collected stage records as JSON and CSV.
+
+    Parameters:
+        label (str): Run label, used in the filenames (e.g. 'systemic').
+        report_dir (Path | None): Output directory (default: RUN_REPORTS_DIR).
+
+    Returns:
+        tuple[Path, Path] | None: (JSON path, CSV path), or None if nothing was recorded.
+    """
+    if not _RECORDS:
+        return None
+
+    started = _RUN["started"] or datetime.now()
+    report_dir = ensure_dir(Path(report_dir) if report_dir is not None else _report_dir())
+    stem = f"{label}_{started:%Y%m%d_%H%M%S}"
+    json_path, csv_path = report_dir / f"{stem}.json", report_dir / f"{stem}.csv"
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "label": label,
+            "started": started.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "psutil": psutil is not None,
+            "stages": _RECORDS,
+        }, f, indent=2)
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(_RECORDS)
+
+    print(f"Saved run report to {json_path}")
+    return json_path, csv_path
+
+
+@contextlib.contextmanager
+def instrumented_run(label: str, report_dir: Optional[Path] = None):
+    """
+    Record a whole pipeline run as one top-level stage and write the report when it ends.
+
+    Only work done in this process is measured; worker processes (e.g. the parallel
+    FIGARO preprocessing) show up as wall time of the stage that waits for them.
+    Inside another run (e.g. a pipeline main called from cli.py) this is a plain stage.
+    Also usable as a decorator: @instrumented_run("systemic").
+    """
+    if not instrumentation_enabled():
+        yield
+        return
+
+    if _RUN["label"] is not None:
+        with stage(label):
+            yield
+        return
+
+    _RECORDS.clear()
+    _RUN.update(label=label, started=datetime.now(), report_dir=report_dir)
+    try:
+        with stage(label):
+            yield
+    finally:
+        write_report(label, report_dir)
+        _RUN.update(label=None, started=None, report_dir=None)
@@ -0,0 +1,85 @@
+# shared/label_codec.py
+
+from typing import Iterable, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+def split_labels(
+    labels: Iterable,
+    sep: str = "_",
+    names: Sequence[str] = ("Country", "Sector")
+) -> pd.MultiIndex:
+    """
+    Split combined labels such as 'AT_C10T12' at the first separator into a two-level MultiIndex.
+
+    Labels are factorized first, so each distinct label is stripped and split only once
+    (FIGARO tables repeat the same ~3,000 labels on both axes). The MultiIndex is then
+    assembled directly from integer codes instead of from Python tuples.
+
+    Parameters:
+        labels (Iterable): Combined labels (e.g. a DataFrame index or a 'sector' column).
+        sep (str): Separator between country and sector (default: '_').
+        names (Sequence[str]): Level names (default: ('Country', 'Sector')).
+
+    Returns:
+        pd.MultiIndex: MultiIndex with the given level names.
+    """
+    codes, uniques = pd.factorize(np.asarray(labels, dtype=object))
+    uniques = pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+    missing_sep = ~uniques.str.contains(sep, regex=False)
+    if missing_sep.any():
+        label = uniques[missing_sep].iloc[0]
+        raise ValueError(f"Label '{label}' cannot be split at '{sep}'.")
+
+    parts = uniques.str.split(sep, n=1, expand=True)
+    country_codes, country_levels = pd.factorize(parts[0], sort=True)
+    sector_codes, sector_levels = pd.factorize(parts[1], sort=True)
+
+    return pd.MultiIndex(
+        levels=[country_levels, sector_levels],
+        codes=[country_codes[codes], sector_codes[codes]],
+        names=list(names),
+        verify_integrity=False,
+    )
+
+
+def rename_level_values(
+    index: pd.MultiIndex,
+    level: Union[int, str],
+    mapping: dict
+) -> pd.MultiIndex:
+    """
+    Rename the values of one MultiIndex level by touching only its level categories.
+
+    If the mapping merges several old values into one new value (e.g. sector aggregation),
+    the level is re-factorized and the integer codes are remapped; the rows themselves are
+    never converted to tuples.
+
+    Parameters:
+        index (pd.MultiIndex): Index to relabel.
+        level (int | str): Level number or name (e.g. 'Sector').
+        mapping (dict): Old value -> new value. Unmapped values are kept.
+
+    Returns:
+        pd.MultiIndex: Relabelled index (same length and order as the input).
+    """
+    level_num = index.names.index(level) if isinstance(level, str) else level
+    old_levels = index.levels[level_num]
+    new_values = pd.Index([mapping.get(v, v) for v in old_levels], dtype=old_levels.dtype)
+
+    if new_values.is_unique:
+        return index.set_levels(new_values, level=level_num, verify_integrity=False)
+
+    remap, new_levels = pd.factorize(new_values, sort=True)
+    old_codes = np.asarray(index.codes[level_num])
+    new_codes = np.where(old_codes >= 0, remap[old_codes], -1)
+
+    levels = list(index.levels)
+    codes = [np.asarray(c) for c in index.codes]
+    levels[level_num] = pd.Index(new_levels, dtype=old_levels.dtype)
+    codes[level_num] = new_codes
+
+    return pd.MultiIndex(levels=levels, codes=codes, names=index.names, verify_integrity=False)
@@ -10,73 +10,98 @@ from config import (
     FIGARO_Z_MATRIX_DIR,
     FIGARO_VA_MATRIX_DIR,
 )
+from shared.binary_store import load_binary_frame, binary_frame_exists, binary_path_for
 
-def load_A_matrix(year: int) -> pd.DataFrame:
+
+def load_matrix_file(path: Path, prefer_binary: bool = True, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Load a processed matrix, reading its binary copy if available and the CSV otherwise.
+
+    Parameters:
+        path (Path): Path to the CSV file. The binary copy is expected next to it with '.npy' suffix.
+        prefer_binary (bool): If False, always read the CSV.
+        **read_csv_kwargs: Passed to pd.read_csv for the CSV fallback.
+
+    Returns:
+        pd.DataFrame: Loaded matrix.
+    """
+    binary_path = binary_path_for(path)
+    if prefer_binary and binary_frame_exists(binary_path):
+        return load_binary_frame(binary_path)
+    return pd.read_csv(path, **read_csv_kwargs)
+
+
+def load_A_matrix(year: int, prefer_binary: bool = True) -> pd.DataFrame:
     """
     Load the technical coefficient matrix A for a given year.
 
     Parameters:
         year (int): Year of the matrix.
+        prefer_binary (bool): Read the binary copy if available (default: True).
 
     Returns:
         pd.DataFrame: A matrix with MultiIndex (Country, Sector) for both rows and columns.
     """
     path = FIGARO_A_MATRIX_DIR / f"A_{year}.csv"
-    return pd.read_csv(path, index_col=[0, 1], header=[0, 1])
+    return load_matrix_file(path, prefer_binary, index_col=[0, 1], header=[0, 1])
 
 
-def load_X_vector(year: int) -> pd.Series:
+def load_X_vector(year: int, prefer_binary: bool = True) -> pd.Series:
     """
     Load the gross output vector X for a given year.
 
     Parameters:
         year (int): Year of the vector.
+        prefer_binary (bool): Read the binary copy if available (default: True).
 
     Returns:
         pd.Series: X vector indexed by (Country, Sector).
     """
     path = FIGARO_X_VECTOR_DIR / f"X_{year}.csv"
-    df = pd.read_csv(path, index_col=[0, 1])
+    df = load_matrix_file(path, prefer_binary, index_col=[0, 1])
     return df["gross_output"]
 
 
-def load_Y_matrix(year: int) -> pd.DataFrame:
+def load_Y_matrix(year: int, prefer_binary: bool = True) -> pd.DataFrame:
     """
     Load the final demand matrix Y for a given year.
 
     Parameters:
         year (int): Year of the matrix.
+        prefer_binary (bool): Read the binary copy if available (default: True).
 
     Returns:
         pd.DataFrame: Y matrix with MultiIndex (Country, Sector).
     """
     path = FIGARO_Y_MATRIX_DIR / f"Y_{year}.csv"
-    return pd.read_csv(path, index_col=[0, 1], header=[0, 1])
+    return load_matrix_file(path, prefer_binary, index_col=[0, 1], header=[0, 1])
 
 
-def load_Z_matrix(year: int) -> pd.DataFrame:
+def load_Z_matrix(year: int, prefer_binary: bool = True) -> pd.DataFrame:
     """
     Load the interindustry flow matrix Z for a given year.
 
     Parameters:
         year (int): Year of the matrix.
+        prefer_binary (bool): Read the binary copy if available (default: True).
 
     Returns:
         pd.DataFrame: Z matrix with MultiIndex (Country, Sector).
     """
     path = FIGARO_Z_MATRIX_DIR / f"Z_{year}.csv"
-    return pd.read_csv(path, index_col=[0, 1], header=[0, 1])
+    return load_matrix_file(path, prefer_binary, index_col=[0, 1], header=[0, 1])
 
 
-def load_VA_matrix(year: int) -> pd.DataFrame:
+def load_VA_matrix(year: int, prefer_binary: bool = True) -> pd.DataFrame:
     """
     Load the value added matrix VA for a given year.
 
     Parameters:
         year (int): Year of the matrix.
+        prefer_binary (bool): Read the binary copy if available (default: True).
 
     Returns:
         pd.DataFrame: VA matrix with MultiIndex (Country, Sector).
     """
     path = FIGARO_VA_MATRIX_DIR / f"VA_{year}.csv"
-    return pd.read_csv(path, index_col=[0, 1])
+    return load_matrix_file(path, prefer_binary, index_col=[0, 1], header=[0, 1])
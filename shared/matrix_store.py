@@ -0,0 +1,178 @@
+# shared/matrix_store.py
+
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+
+from config import FIGARO_MATRIX_STORE_DIR
+from shared.binary_store import save_binary_frame, read_axis_labels, binary_frame_exists
+from shared.matrix_loader import load_A_matrix, load_X_vector, load_Y_matrix, load_Z_matrix
+from shared.technical_coefficients import calculate_technical_coefficients
+
+STORE_MATRICES = ("A", "Z", "Y")
+
+
+def store_path(name: str, year: int, store_dir: Path = FIGARO_MATRIX_STORE_DIR) -> Path:
+    """
+    Return the path of a matrix in the store (e.g. 'matrix_store/A_2019.npy').
+    """
+    return store_dir / f"{name}_{year}.npy"
+
+
+def _load_for_store(name: str, year: int) -> pd.DataFrame:
+    """
+    Load a matrix through shared.matrix_loader. A is computed from Z and X
+    if no A file has been written for the year.
+    """
+    if name == "Z":
+        return load_Z_matrix(year)
+    if name == "Y":
+        return load_Y_matrix(year)
+    if name == "A":
+        try:
+            return load_A_matrix(year)
+        except FileNotFoundError:
+            Z = load_Z_matrix(year)
+            X = load_X_vector(year).reindex(Z.columns)
+            return calculate_technical_coefficients(Z, X, inplace=True)
+    raise ValueError(f"Unknown matrix name: {name}")
+
+
+def build_matrix_store(
+    years: Iterable[int],
+    names: Iterable[str] = STORE_MATRICES,
+    store_dir: Path = FIGARO_MATRIX_STORE_DIR,
+    overwrite: bool = False
+) -> dict:
+    """
+    Persist A, Z and Y as memory-mappable float arrays with (Country, Sector) label arrays.
+
+    Rows and columns are sorted by (Country, Sector), so every country occupies one
+    contiguous block on both axes and can be sliced without copying.
+
+    Parameters:
+        years (Iterable[int]): Years to store.
+        names (Iterable[str]): Matrices to store (subset of 'A', 'Z', 'Y').
+        store_dir (Path): Target directory (default: FIGARO_MATRIX_STORE_DIR).
+        overwrite (bool): Rebuild entries that already exist.
+
+    Returns:
+        dict: {(name, year): Path} of the stored '.npy' files.
+    """
+    paths = {}
+    for year in years:
+        for name in names:
+            path = store_path(name, year, store_dir)
+            if overwrite or not binary_frame_exists(path):
+                print(f"Storing {name} for {year} in {store_dir}")
+                df = _load_for_store(name, year).sort_index(axis=0).sort_index(axis=1)
+                save_binary_frame(df, path)
+            paths[(name, year)] = path
+    open_store_arrays.cache_clear()
+    return paths
+
+
+@lru_cache(maxsize=None)
+def open_store_arrays(name: str, year: int, store_dir: Path = FIGARO_MATRIX_STORE_DIR):
+    """
+    Memory-map a stored matrix read-only.
+
+    The values are not read into RAM; pages are loaded on access and shared through
+    the OS page cache between all processes that open the same file.
+
+    Returns:
+        tuple[np.memmap, pd.Index, pd.Index]: (values, row labels, column labels)
+    """
+    path = store_path(name, year, store_dir)
+    if not binary_frame_exists(path):
+        raise FileNotFoundError(f"{name} for {year} is not in the matrix store: {path}")
+
+    values = np.load(path, mmap_mode="r", allow_pickle=False)
+    index, columns = read_axis_labels(path)
+    return values, index, columns
+
+
+def open_store_matrix(name: str, year: int, store_dir: Path = FIGARO_MATRIX_STORE_DIR) -> pd.DataFrame:
+    """
+    Return a stored matrix as a read-only DataFrame backed by the memory map.
+    """
+    values, index, columns = open_store_arrays(name, year, store_dir)
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def _axis_selector(
+    labels: pd.Index,
+    countries: Optional[Union[str, Iterable[str]]],
+    sectors: Optional[Union[str, Iterable[str]]]
+) -> Union[slice, np.ndarray]:
+    """
+    Translate a country/sector selection into positions on one axis.
+
+    Returns a slice when the selected positions are contiguous (view on the memory map),
+    otherwise an integer array (numpy then has to copy).
+    """
+    if countries is None and sectors is None:
+        return slice(None)
+
+    mask = np.ones(len(labels), dtype=bool)
+    if countries is not None:
+        countries = [countries] if isinstance(countries, str) else list(countries)
+        mask &= labels.get_level_values("Country").isin(countries)
+    if sectors is not None:
+        sectors = [sectors] if isinstance(sectors, str) else list(sectors)
+        mask &= labels.get_level_values("Sector").isin(sectors)
+
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return positions
+    if positions[-1] - positions[0] + 1 == len(positions):
+        return slice(int(positions[0]), int(positions[-1]) + 1)
+    return positions
+
+
+def get_matrix_block(
+    name: str,
+    year: int,
+    row_countries: Optional[Union[str, Iterable[str]]] = None,
+    col_countries: Optional[Union[str, Iterable[str]]] = None,
+    row_sectors: Optional[Union[str, Iterable[str]]] = None,
+    col_sectors: Optional[Union[str, Iterable[str]]] = None,
+    store_dir: Path = FIGARO_MATRIX_STORE_DIR
+) -> pd.DataFrame:
+    """
+    Slice a country/sector block out of a stored matrix.
+
+    Because the store is sorted by (Country, Sector), selecting one country (or a run of
+    neighbouring countries), optionally narrowed to a contiguous range of its sectors,
+    returns a zero-copy view on the memory map. Scattered selections are still correct
+    but are copied by numpy.
+
+    Parameters:
+        name (str): 'A', 'Z' or 'Y'.
+        year (int): Year of the matrix.
+        row_countries / col_countries (str | Iterable[str] | None): Countries on each axis (all if None).
+        row_sectors / col_sectors (str | Iterable[str] | None): Sectors on each axis (all if None).
+        store_dir (Path): Store directory.
+
+    Returns:
+        pd.DataFrame: Read-only block with (Country, Sector) labels.
+    """
+    values, index, columns = open_store_arrays(name, year, store_dir)
+
+    row_sel = _axis_selector(index, row_countries, row_sectors)
+    col_sel = _axis_selector(columns, col_countries, col_sectors)
+
+    if isinstance(row_sel, slice) and isinstance(col_sel, slice):
+        block = values[row_sel, col_sel]
+    else:
+        rows = np.arange(len(index))[row_sel]
+        cols = np.arange(len(columns))[col_sel]
+        block = values[np.ix_(rows, cols)]
+
+    return pd.DataFrame(block, index=index[row_sel], columns=columns[col_sel], copy=False)
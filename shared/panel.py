@@ -0,0 +1,290 @@
+# shared/panel.py
+
+import sys
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import lu_factor, lu_solve
+
+from shared.matrix_loader import load_matrix_file
+
+# Years solved at once by the batched Leontief routines; bounds the (years x N x N) temporaries
+PANEL_BATCH_YEARS = 4
+
+# Columns of the identity solved at once when extracting the diagonal of a Leontief inverse
+DIAGONAL_BLOCK_SIZE = 512
+
+
+def stack_panel(frames: dict[int, Union[pd.DataFrame, pd.Series]], fill_value: float = 0.0) -> dict:
+    """
+    Stack yearly matrices (or vectors) with the same (Country, Sector) layout into one array.
+
+    If the labels differ between years, all years are reindexed to the union of labels
+    (in first-seen order) and missing entries are set to fill_value.
+
+    Parameters:
+        frames (dict[int, pd.DataFrame | pd.Series]): Year -> matrix or vector.
+        fill_value (float): Value for labels missing in a year (default: 0.0).
+
+    Returns:
+        dict: {'years': list[int], 'index': pd.Index, 'columns': pd.Index | None,
+               'values': np.ndarray of shape (years, rows[, columns])}
+    """
+    if not frames:
+        raise ValueError("No yearly frames to stack.")
+
+    years = sorted(frames)
+    first = frames[years[0]]
+    index = first.index
+    columns = first.columns if isinstance(first, pd.DataFrame) else None
+
+    for year in years[1:]:
+        frame = frames[year]
+        if not frame.index.equals(index):
+            index = index.append(frame.index.difference(index, sort=False))
+        if columns is not None and not frame.columns.equals(columns):
+            columns = columns.append(frame.columns.difference(columns, sort=False))
+
+    values = np.empty((len(years), len(index)) + (() if columns is None else (len(columns),)))
+    for position, year in enumerate(years):
+        frame = frames[year]
+        if columns is None:
+            aligned = frame if frame.index.equals(index) else frame.reindex(index, fill_value=fill_value)
+        elif frame.index.equals(index) and frame.columns.equals(columns):
+            aligned = frame
+        else:
+            aligned = frame.reindex(index=index, columns=columns, fill_value=fill_value)
+        values[position] = aligned.to_numpy(dtype=np.float64)
+
+    return {"years": years, "index": index, "columns": columns, "values": values}
+
+
+def load_panel(paths: dict[int, Path], prefer_binary: bool = True, **read_csv_kwargs) -> dict:
+    """
+    Load yearly matrix files (binary copy if available, CSV otherwise) and stack them.
+
+    Parameters:
+        paths (dict[int, Path]): Year -> CSV path (e.g. SYSTEMIC_A_MATRIX_DIR / 'A_2019.csv').
+        prefer_binary (bool): Read the '.npy' copy next to the CSV if available (default: True).
+        **read_csv_kwargs: Passed to pd.read_csv for the CSV fallback.
+
+    Returns:
+        dict: See stack_panel.
+    """
+    frames = {year: load_matrix_file(path, prefer_binary, **read_csv_kwargs) for year, path in paths.items()}
+    return stack_panel(frames)
+
+
+def panel_frame(panel: dict, year: int) -> Union[pd.DataFrame, pd.Series]:
+    """
+    Return the slice of one year as a DataFrame (or Series for vector panels) sharing the panel's memory.
+    """
+    values = panel["values"][panel["years"].index(year)]
+    if panel["columns"] is None:
+        return pd.Series(values, index=panel["index"], copy=False)
+    return pd.DataFrame(values, index=panel["index"], columns=panel["columns"], copy=False)
+
+
+def _year_batches(n_years: int, batch_years: int) -> Iterable[slice]:
+    for start in range(0, n_years, batch_years):
+        yield slice(start, min(start + batch_years, n_years))
+
+
+def panel_technical_coefficients(Z: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """
+    Technical coefficients A = Z / X for every year at once.
+
+    Same conventions as calculate_technical_coefficients: columns with zero (np.isclose)
+    gross output and NaN entries are set to 0.
+
+    Parameters:
+        Z (np.ndarray): Interindustry flows (years x N x N).
+        X (np.ndarray): Gross output (years x N).
+
+    Returns:
+        np.ndarray: A (years x N x N).
+    """
+    zero_output = np.isclose(X, 0.0)
+    safe_x = np.where(zero_output, 1.0, X)
+    A = Z / safe_x[:, None, :]
+    A[np.broadcast_to(zero_output[:, None, :], A.shape)] = 0.0
+    np.copyto(A, 0.0, where=np.isnan(A))
+    return A
+
+
+def panel_leontief_solve(
+    A: np.ndarray,
+    B: np.ndarray,
+    transpose: bool = False,
+    batch_years: int = PANEL_BATCH_YEARS
+) -> np.ndarray:
+    """
+    Solve (I - A) x = b, or with transpose=True the price model (I - A') x = b, for every year.
+
+    Parameters:
+        A (np.ndarray): Technical coefficients (years x N x N).
+        B (np.ndarray): Right-hand sides (years x N) or (years x N x k).
+        transpose (bool): Solve the price model (default: False, quantity model).
+        batch_years (int): Years solved per batched LAPACK call (default: PANEL_BATCH_YEARS).
+
+    Returns:
+        np.ndarray: Solutions with the shape of B.
+    """
+    vector = B.ndim == 2
+    rhs = B[..., None] if vector else B
+    identity = np.eye(A.shape[1])
+    out = np.empty(rhs.shape)
+    for batch in _year_batches(A.shape[0], batch_years):
+        system = A[batch].transpose(0, 2, 1) if transpose else A[batch]
+        out[batch] = np.linalg.solve(identity - system, rhs[batch])
+    return out[..., 0] if vector else out
+
+
+def leontief_inverse_diagonal(lu_piv: tuple, n: int, block_size: int = DIAGONAL_BLOCK_SIZE) -> np.ndarray:
+    """
+    Diagonal of (I - A)^-1 from its LU factorization, solving block_size unit columns at a time
+    so that only an (n x block_size) slice of the inverse is held in memory.
+
+    Parameters:
+        lu_piv (tuple): Output of scipy.linalg.lu_factor(I - A).
+        n (int): Matrix dimension.
+        block_size (int): Columns per solve.
+
+    Returns:
+        np.ndarray: The n diagonal entries.
+    """
+    diagonal = np.empty(n)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        unit_columns = np.zeros((n, stop - start))
+        unit_columns[np.arange(start, stop), np.arange(stop - start)] = 1.0
+        inverse_columns = lu_solve(lu_piv, unit_columns)
+        diagonal[start:stop] = inverse_columns[np.arange(start, stop), np.arange(stop - start)]
+    return diagonal
+
+
+def panel_leontief_inverse_diagonal(A: np.ndarray, block_size: int = DIAGONAL_BLOCK_SIZE) -> np.ndarray:
+    """
+    Diagonal of (I - A)^-1 for every year (years x N), from one LU factorization per year
+    (see leontief_inverse_diagonal) instead of the full inverse.
+    """
+    identity = np.eye(A.shape[1])
+    diagonal = np.empty(A.shape[:2])
+    for year in range(A.shape[0]):
+        diagonal[year] = leontief_inverse_diagonal(lu_factor(identity - A[year]), A.shape[1], block_size)
+    return diagonal
+
+
+def panel_cpi_weights(
+    final_demand: dict,
+    consumption_code: str = "P3_S14",
+    region_map: Optional[dict[str, str]] = None
+) -> dict:
+    """
+    CPI weights (household consumption shares per region) for every year at once.
+
+    Same definition as calculate_cpi_weights: for each region, the consumption of every
+    sector by the region's households divided by the region's total consumption (0 if the
+    total is not positive). Countries not in region_map belong to 'ROW'.
+
+    Parameters:
+        final_demand (dict): Panel of final demand (or full table) columns with (Country, Sector)
+                             labels; rows of the 'GO' and 'W2' countries are dropped.
+        consumption_code (str): Column-sector code for household consumption (default: "P3_S14").
+        region_map (dict[str, str] | None): Country -> region. If None, one region per country.
+
+    Returns:
+        dict: Panel with rows = sectors and columns = regions, values (years x sectors x regions).
+    """
+    index, columns = final_demand["index"], final_demand["columns"]
+    valid_rows = ~index.get_level_values("Country").isin(["GO", "W2"])
+    consumption_cols = np.flatnonzero(columns.get_level_values("Sector") == consumption_code)
+    countries = columns.get_level_values("Country")[consumption_cols]
+
+    regions = [region_map.get(c, "ROW") if region_map else c for c in countries]
+    region_names = list(dict.fromkeys(regions))
+    membership = np.zeros((len(consumption_cols), len(region_names)))
+    membership[np.arange(len(consumption_cols)), [region_names.index(r) for r in regions]] = 1.0
+
+    consumption = np.nan_to_num(final_demand["values"][:, valid_rows][:, :, consumption_cols])
+    by_region = consumption @ membership
+    totals = by_region.sum(axis=1, keepdims=True)
+    weights = np.divide(by_region, totals, out=np.zeros_like(by_region), where=totals > 0)
+
+    return {"years": final_demand["years"], "index": index[valid_rows], "columns": pd.Index(region_names), "values": weights}
+
+
+def panel_cpi_weighted_indirect_impacts(
+    A: np.ndarray,
+    shocks: np.ndarray,
+    weights: np.ndarray,
+    block_size: int = DIAGONAL_BLOCK_SIZE
+) -> np.ndarray:
+    """
+    CPI-weighted indirect impact of each sector's price shock for every year
+    (the panel counterpart of cpi_adjoint_impacts.cpi_weighted_indirect_impacts):
+
+        s_k * ((I - A)^-1 w)[k] / (I - A)^-1[k, k] - s_k * w[k]
+
+    I - A is factorized once per year; the adjoint solve and the diagonal of the inverse
+    (solved block_size unit columns at a time) reuse that factorization.
+
+    Parameters:
+        A (np.ndarray): Technical coefficients (years x N x N).
+        shocks (np.ndarray): Price shock per sector, (N) for all years or (years x N).
+        weights (np.ndarray): CPI weights (years x N x regions).
+        block_size (int): Unit columns per solve for the diagonal (default: DIAGONAL_BLOCK_SIZE).
+
+    Returns:
+        np.ndarray: Indirect impacts (years x N x regions).
+    """
+    shocks = np.broadcast_to(shocks, A.shape[:2])
+    identity = np.eye(A.shape[1])
+    adjoint = np.empty(weights.shape)
+    diagonal = np.empty(A.shape[:2])
+    for year in range(A.shape[0]):
+        lu_piv = lu_factor(identity - A[year])
+        adjoint[year] = lu_solve(lu_piv, weights[year])
+        diagonal[year] = leontief_inverse_diagonal(lu_piv, A.shape[1], block_size)
+    return shocks[..., None] * (adjoint / diagonal[..., None] - weights)
+
+
+def panel_changes(panel: dict, relative: bool = False) -> dict:
+    """
+    Year-over-year changes of a panel (absolute, or relative to the previous year with 0/0 = 0).
+
+    Returns:
+        dict: Panel for years[1:] with the change since the previous available year.
+    """
+    values = panel["values"]
+    change = np.diff(values, axis=0)
+    if relative:
+        previous = values[:-1]
+        change = np.divide(change, previous, out=np.zeros_like(change), where=previous != 0)
+    return {**panel, "years": panel["years"][1:], "values": change}
+
+
+def panel_to_long(panel: dict, value_name: str = "value") -> pd.DataFrame:
+    """
+    Flatten a panel into a long table with one row per year and label (and column).
+    """
+    years = np.asarray(panel["years"])
+    index = panel["index"]
+    if panel["columns"] is None:
+        long = pd.DataFrame({"Year": np.repeat(years, len(index))})
+        for level, name in enumerate(index.names):
+            long[name] = np.tile(index.get_level_values(level), len(years))
+        long[value_name] = panel["values"].ravel()
+        return long
+
+    n_years, n_rows, n_cols = panel["values"].shape
+    long = pd.DataFrame({"Year": np.repeat(years, n_rows * n_cols)})
+    for level, name in enumerate(index.names):
+        long[name] = np.tile(np.repeat(index.get_level_values(level), n_cols), n_years)
+    long[panel["columns"].name or "Column"] = np.tile(np.asarray(panel["columns"], dtype=object), n_years * n_rows)
+    long[value_name] = panel["values"].ravel()
+    return long
@@ -1,10 +1,21 @@
 # Revised version of shared/preprocessing.py with full scientific comments for clarity
 
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from config import (
-    FIGARO_FULL_MATRIX_DIR,FIGARO_VA_MATRIX_DIR, FIGARO_X_VECTOR_DIR,FIGARO_Y_MATRIX_DIR, FIGARO_Z_MATRIX_DIR
+    FIGARO_FULL_MATRIX_DIR,FIGARO_VA_MATRIX_DIR, FIGARO_X_VECTOR_DIR,FIGARO_Y_MATRIX_DIR, FIGARO_Z_MATRIX_DIR,
+    ensure_dir
 )
+from shared.binary_store import (
+    save_binary_frame, binary_path_for, labels_path_for, load_binary_frame,
+    open_binary_frame_writer, close_binary_frame_writer
+)
+from shared.label_codec import split_labels, rename_level_values
+from shared.extraction import FINAL_DEMAND_CODES, VALUE_ADDED_CODES, classify_io_labels, partition_io_table
+from shared.stage_cache import run_stage
 
 # Define constants
 SECTOR_RENAMES = {
@@ -22,34 +33,21 @@ SECTOR_RENAMES = {
     "L": "L68"
 }
 
-FINAL_DEMAND_CODES = {"P3_S13", "P3_S14", "P3_S15", "P51G", "P5M"}
-VALUE_ADDED_CODES = {"D21X31", "OP_RES", "OP_NRES", "D1", "D29X39", "B2A3G"}
+# Final demand and value added codes are shared with shared.extraction
 
 def split_index_to_multiindex(df: pd.DataFrame) -> pd.DataFrame:
     """
     Converts the DataFrame's index and columns into a MultiIndex with levels: ['Country', 'Sector'].
-    Splits each label at the first underscore.
-    """
-
-    def make_multiindex(labels):
-        countries = []
-        sectors = []
-        for label in labels:
-            label = str(label).strip()
-            if "_" not in label:
-                raise ValueError(f"Label '{label}' cannot be split at '_'.")
-            country, sector = label.split("_", 1)
-            countries.append(country)
-            sectors.append(sector)
-        return pd.MultiIndex.from_arrays([countries, sectors], names=["Country", "Sector"])
-
-    df.index = make_multiindex(df.index)
-    df.columns = make_multiindex(df.columns)
+    Splits each label at the first underscore (see shared.label_codec.split_labels).
+    """
+    df.index = split_labels(df.index)
+    df.columns = split_labels(df.columns)
     return df
 
 def rename_sector_codes_in_index(df: pd.DataFrame, rename_dict: dict) -> pd.DataFrame:
     """
     Safely renames the sector codes in the 'Sector' level of a MultiIndex for both index and columns.
+    Only the level categories are renamed; the integer codes are reused.
 
     Parameters:
         df (pd.DataFrame): MultiIndexed DataFrame with levels ['Country', 'Sector']
@@ -58,18 +56,8 @@ def rename_sector_codes_in_index(df: pd.DataFrame, rename_dict: dict) -> pd.Data
     Returns:
         pd.DataFrame: DataFrame with updated sector codes in MultiIndex.
     """
-    # Rename row index
-    df.index = df.index.set_levels(
-        df.index.levels[1].to_series().replace(rename_dict),
-        level="Sector"
-    )
-
-    # Rename column index
-    df.columns = df.columns.set_levels(
-        df.columns.levels[1].to_series().replace(rename_dict),
-        level="Sector"
-    )
-
+    df.index = rename_level_values(df.index, "Sector", rename_dict)
+    df.columns = rename_level_values(df.columns, "Sector", rename_dict)
     return df
 
 def add_gross_output_row(df: pd.DataFrame) -> pd.DataFrame:
@@ -86,52 +74,22 @@ def add_gross_output_row(df: pd.DataFrame) -> pd.DataFrame:
     gross_output.name = ("GO", "GO")
     return pd.concat([df, pd.DataFrame(gross_output).T])
 
-def extract_Z_matrix(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Extracts the interindustry flow matrix (Z), excluding final demand columns,
-    value added rows, and the gross output row.
-
-    Returns:
-        pd.DataFrame: Interindustry flow matrix.
-    """
-    row_filter = (~df.index.get_level_values("Country").isin(["W2", "GO"]))
-    col_filter = (~df.columns.get_level_values("Sector").isin(FINAL_DEMAND_CODES)) & \
-                 (~df.columns.get_level_values("Country").isin(["W2"]))
-    return df.loc[row_filter, col_filter]
-
-def extract_Y_matrix(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Extracts the final demand matrix (Y) using defined final demand codes.
-
-    Returns:
-        pd.DataFrame: Final demand matrix.
+def save_matrix_outputs(df: pd.DataFrame, csv_path: Path, save_binary: bool = True) -> None:
     """
-    col_filter = df.columns.get_level_values("Sector").isin(FINAL_DEMAND_CODES)
-    row_filter = (~df.index.get_level_values("Country").isin(["GO"])) & \
-                 (~df.index.get_level_values("Country").isin(["W2"]))
-    return df.loc[row_filter, col_filter]
-
-def extract_X_vector(df: pd.DataFrame) -> pd.Series:
+    Write a processed matrix as CSV and, optionally, as a binary '.npy' + label archive
+    next to it (see shared.binary_store), which the loaders read in preference to the CSV.
+    Without the binary copy, an older one is removed so the loaders cannot pick up stale values.
     """
-    Extracts the gross output vector (X) from the ('GO', 'GO') row.
-
-    Returns:
-        pd.Series: Gross output vector.
-    """
-    return df.loc[("GO", "GO")]
-
-def extract_VA_matrix(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Extracts the value added matrix (VA) from the W2 country rows.
-
-    Returns:
-        pd.DataFrame: Value added matrix.
-    """
-    mask = (df.index.get_level_values("Country") == "W2") & \
-           (df.index.get_level_values("Sector").isin(VALUE_ADDED_CODES))
-    return df.loc[mask]
-
-def preprocess_figaro_data(filepath: Path, save_processed=True, processed_dir: Path = None) -> pd.DataFrame:
+    ensure_dir(Path(csv_path).parent)
+    df.to_csv(csv_path)
+    binary_path = binary_path_for(csv_path)
+    if save_binary:
+        save_binary_frame(df, binary_path)
+    else:
+        binary_path.unlink(missing_ok=True)
+        labels_path_for(binary_path).unlink(missing_ok=True)
+
+def preprocess_figaro_data(filepath: Path, save_processed=True, processed_dir: Path = None, save_binary: bool = True) -> pd.DataFrame:
     """
     Load, convert, rename, and process a FIGARO dataset. Also extract and save submatrices
     (Z, Y, X, VA) for downstream modular access.
@@ -140,6 +98,7 @@ def preprocess_figaro_data(filepath: Path, save_processed=True, processed_dir: P
         filepath (Path): Raw FIGARO CSV file.
         save_processed (bool): If True, save processed table and extracted matrices.
         processed_dir (Path): Optional override for the processed output directory.
+        save_binary (bool): If True, also write binary copies next to the CSVs for fast loading.
 
     Returns:
         pd.DataFrame: Fully processed MultiIndexed FIGARO table.
@@ -158,27 +117,233 @@ def preprocess_figaro_data(filepath: Path, save_processed=True, processed_dir: P
         processed_dir = processed_dir or FIGARO_FULL_MATRIX_DIR
         processed_dir.mkdir(parents=True, exist_ok=True)
 
-        df.to_csv(processed_dir / filepath.name)
-        extract_Z_matrix(df).to_csv(FIGARO_Z_MATRIX_DIR / f"Z_{year}.csv")
-        extract_Y_matrix(df).to_csv(FIGARO_Y_MATRIX_DIR / f"Y_{year}.csv")
-        extract_X_vector(df).to_frame(name="gross_output").to_csv(FIGARO_X_VECTOR_DIR / f"X_{year}.csv")
-        extract_VA_matrix(df).to_csv(FIGARO_VA_MATRIX_DIR / f"VA_{year}.csv")
+        # Z, Y, VA and X are views on the table's own buffer (the raw layout is already block-ordered)
+        blocks = partition_io_table(df)
+        save_matrix_outputs(df, processed_dir / filepath.name, save_binary)
+        save_matrix_outputs(blocks["Z"], FIGARO_Z_MATRIX_DIR / f"Z_{year}.csv", save_binary)
+        save_matrix_outputs(blocks["Y"], FIGARO_Y_MATRIX_DIR / f"Y_{year}.csv", save_binary)
+        save_matrix_outputs(blocks["GO"].to_frame(name="gross_output"), FIGARO_X_VECTOR_DIR / f"X_{year}.csv", save_binary)
+        save_matrix_outputs(blocks["VA"], FIGARO_VA_MATRIX_DIR / f"VA_{year}.csv", save_binary)
 
     return df
 
-def get_preprocessed_figaro_matrices(filepaths: dict, processed_dir: Path = None):
+def _read_figaro_labels(filepath: Path, **read_csv_kwargs) -> pd.MultiIndex:
+    """
+    Read only the label column (or only the header) of a raw FIGARO CSV and convert it
+    to a renamed (Country, Sector) MultiIndex.
+    """
+    labels = pd.read_csv(filepath, sep=",", encoding="utf-8-sig", **read_csv_kwargs)
+    labels = labels.columns[1:] if read_csv_kwargs.get("nrows") == 0 else labels.iloc[:, 0]
+    return rename_level_values(split_labels(labels), "Sector", SECTOR_RENAMES)
+
+def _write_csv_header(f, index_names: list, columns: pd.Index) -> None:
+    """
+    Write the header lines pandas would produce for a MultiIndexed frame with these columns.
+    """
+    empty_index = pd.MultiIndex.from_arrays([[], []], names=index_names)
+    pd.DataFrame(columns=columns, index=empty_index).to_csv(f)
+
+def preprocess_figaro_data_streaming(filepath: Path, processed_dir: Path = None, chunksize: int = 500) -> pd.DataFrame:
+    """
+    Single-pass, bounded-memory variant of preprocess_figaro_data.
+
+    The raw CSV is read in row chunks. Each chunk is relabelled, written straight to the
+    full-table, Z, Y and VA outputs (CSV appends plus pre-allocated memory-mapped '.npy'
+    files), and its column sums are added to the running gross output. Peak memory is a
+    few chunks plus the label arrays instead of several copies of the full table.
+
+    A cheap first pass reads only the label column so the binary outputs can be
+    pre-allocated with their final shapes. Output files and row order are the same as
+    with preprocess_figaro_data; the values are always stored as float64.
+
+    Parameters:
+        filepath (Path): Raw FIGARO CSV file.
+        processed_dir (Path): Optional override for the processed output directory.
+        chunksize (int): Number of raw rows per chunk.
+
+    Returns:
+        pd.DataFrame: Processed MultiIndexed FIGARO table, memory-mapped read-only from the binary copy.
+    """
+    year = int(filepath.stem.split("_")[-1])
+    processed_dir = processed_dir or FIGARO_FULL_MATRIX_DIR
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    names = ["Country", "Sector"]
+
+    columns = _read_figaro_labels(filepath, nrows=0)
+    rows = _read_figaro_labels(filepath, usecols=[0])
+    columns.names = names
+    rows.names = names
+
+    # Row and column routing, evaluated once on the label arrays (same rules as partition_io_table)
+    masks = classify_io_labels(rows, columns, FINAL_DEMAND_CODES, VALUE_ADDED_CODES)
+    z_rows, va_rows = masks["industry_rows"], masks["va_rows"]
+    z_cols, y_cols = masks["industry_cols"], masks["fd_cols"]
+
+    go_label = pd.MultiIndex.from_tuples([("GO", "GO")], names=names)
+    full_index = rows.append(go_label)
+    full_index.names = names
+
+    outputs = {
+        "full": (processed_dir / filepath.name, slice(None), None, full_index),
+        "Z": (FIGARO_Z_MATRIX_DIR / f"Z_{year}.csv", z_cols, z_rows, rows[z_rows]),
+        "Y": (FIGARO_Y_MATRIX_DIR / f"Y_{year}.csv", y_cols, z_rows, rows[z_rows]),
+        "VA": (FIGARO_VA_MATRIX_DIR / f"VA_{year}.csv", slice(None), va_rows, rows[va_rows]),
+    }
+
+    # CSVs and binaries are written under temporary names and only moved into place once complete
+    files, arrays, cursors = {}, {}, {}
+    tmp_csv = {key: csv_path.with_name(csv_path.name + ".tmp") for key, (csv_path, *_) in outputs.items()}
+    gross_output = np.zeros(len(columns))
+    dtypes = {0: str, **{i: np.float64 for i in range(1, len(columns) + 1)}}
+
+    try:
+        for key, (csv_path, col_sel, _, index) in outputs.items():
+            csv_path.parent.mkdir(parents=True, exist_ok=True)
+            files[key] = open(tmp_csv[key], "w", newline="")
+            _write_csv_header(files[key], names, columns[col_sel])
+            arrays[key] = open_binary_frame_writer(binary_path_for(csv_path), index, columns[col_sel])
+            cursors[key] = 0
+
+        reader = pd.read_csv(
+            filepath, sep=",", encoding="utf-8-sig", header=None, skiprows=1,
+            dtype=dtypes, chunksize=chunksize
+        )
+        offset = 0
+        for chunk in reader:
+            values = chunk.iloc[:, 1:].to_numpy(dtype=np.float64)
+            chunk_rows = slice(offset, offset + len(values))
+            offset += len(values)
+            gross_output += np.nansum(values, axis=0)
+
+            for key, (_, col_sel, row_mask, _) in outputs.items():
+                mask = np.ones(len(values), dtype=bool) if row_mask is None else row_mask[chunk_rows]
+                block = values[mask][:, col_sel]
+                if len(block) == 0:
+                    continue
+                arrays[key][cursors[key]:cursors[key] + len(block)] = block
+                cursors[key] += len(block)
+                pd.DataFrame(block, index=rows[chunk_rows][mask], columns=columns[col_sel]).to_csv(files[key], header=False)
+
+        go_frame = pd.DataFrame(gross_output[None, :], index=go_label, columns=columns)
+        arrays["full"][-1] = gross_output
+        go_frame.to_csv(files["full"], header=False)
+
+        for key, (csv_path, col_sel, _, index) in outputs.items():
+            files.pop(key).close()
+            os.replace(tmp_csv[key], csv_path)
+            close_binary_frame_writer(binary_path_for(csv_path), arrays.pop(key), index, columns[col_sel])
+    finally:
+        # After a failure, drop the partial temporary files (nothing is left over on success)
+        for f in files.values():
+            f.close()
+        for key in list(arrays):
+            Path(arrays.pop(key).filename).unlink(missing_ok=True)
+        for path in tmp_csv.values():
+            path.unlink(missing_ok=True)
+
+    x_vector = pd.Series(gross_output, index=columns, name="gross_output").to_frame()
+    save_matrix_outputs(x_vector, FIGARO_X_VECTOR_DIR / f"X_{year}.csv")
+
+    return load_binary_frame(binary_path_for(outputs["full"][0]), mmap_mode="r")
+
+def figaro_output_paths(filepath: Path, processed_dir: Path = None) -> list[Path]:
+    """
+    Return all files written when preprocessing one raw FIGARO file (CSVs and binary copies).
+    """
+    year = int(filepath.stem.split("_")[-1])
+    csv_paths = [
+        (processed_dir or FIGARO_FULL_MATRIX_DIR) / filepath.name,
+        FIGARO_Z_MATRIX_DIR / f"Z_{year}.csv",
+        FIGARO_Y_MATRIX_DIR / f"Y_{year}.csv",
+        FIGARO_X_VECTOR_DIR / f"X_{year}.csv",
+        FIGARO_VA_MATRIX_DIR / f"VA_{year}.csv",
+    ]
+    return csv_paths + [binary_path_for(p) for p in csv_paths]
+
+def preprocess_figaro_stage(path: Path, processed_dir: Path = None, streaming: bool = False, chunksize: int = 500,
+                            force: bool = False):
+    """
+    Preprocess one raw FIGARO file as a cached stage (see shared.stage_cache.run_stage).
+
+    The stage is skipped if the raw file, the sector/code constants and the preprocessing
+    code are unchanged and all outputs are intact; the processed table is then read back
+    from its binary copy. force=True always reruns it.
+    """
+    processed_dir = processed_dir or FIGARO_FULL_MATRIX_DIR
+    binary_path = binary_path_for(processed_dir / path.name)
+
+    if streaming:
+        func = lambda: preprocess_figaro_data_streaming(path, processed_dir=processed_dir, chunksize=chunksize)
+    else:
+        func = lambda: preprocess_figaro_data(path, save_processed=True, processed_dir=processed_dir, save_binary=True)
+
+    return run_stage(
+        f"figaro_preprocess_{path.stem}",
+        func,
+        inputs=[path],
+        outputs=figaro_output_paths(path, processed_dir),
+        params={
+            "sector_renames": SECTOR_RENAMES,
+            "final_demand_codes": FINAL_DEMAND_CODES,
+            "value_added_codes": VALUE_ADDED_CODES,
+        },
+        code=[
+            preprocess_figaro_data, preprocess_figaro_data_streaming,
+            split_labels, rename_level_values, add_gross_output_row,
+            classify_io_labels, partition_io_table,
+        ],
+        load=lambda: load_binary_frame(binary_path, mmap_mode="r" if streaming else None),
+        force=force,
+    )
+
+def _preprocess_year(path: Path, processed_dir: Path, streaming: bool, chunksize: int, force: bool = False) -> Path:
+    """
+    Process-pool worker: preprocess one raw file and return the path of the binary full table.
+    Only the path travels back to the parent, not the DataFrame.
+    """
+    processed_dir = processed_dir or FIGARO_FULL_MATRIX_DIR
+    preprocess_figaro_stage(path, processed_dir, streaming, chunksize, force)
+    return binary_path_for(processed_dir / path.name)
+
+def get_preprocessed_figaro_matrices(filepaths: dict, processed_dir: Path = None, streaming: bool = False,
+                                     chunksize: int = 500, max_workers: int = 1, force: bool = False):
     """
     Processes multiple FIGARO datasets into MultiIndex DataFrames with renamed sectors.
 
     Parameters:
         filepaths (dict): {year: Path} dictionary of raw data file paths.
         processed_dir (Path): Directory to save processed data.
+        streaming (bool): If True, use preprocess_figaro_data_streaming (bounded memory;
+                          the returned tables are memory-mapped from the binary copies).
+                          Years whose raw file and preprocessing code are unchanged are
+                          not reprocessed (see preprocess_figaro_stage).
+        chunksize (int): Rows per chunk in streaming mode.
+        max_workers (int): If > 1, years are preprocessed in parallel worker processes and
+                           the results are read back from their binary copies.
+        force (bool): Reprocess every year even if its outputs are up to date.
 
     Returns:
         dict: {year: DataFrame} dictionary of processed data.
     """
     processed_data = {}
+
+    if max_workers > 1 and len(filepaths) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(filepaths))) as executor:
+            futures = {
+                executor.submit(_preprocess_year, path, processed_dir, streaming, chunksize, force): year
+                for year, path in filepaths.items()
+            }
+            binary_paths = {}
+            for future in as_completed(futures):
+                year = futures[future]
+                binary_paths[year] = future.result()
+                print(f"Dataset for year {year} preprocessed successfully.")
+
+        for year in filepaths:
+            processed_data[year] = load_binary_frame(binary_paths[year], mmap_mode="r" if streaming else None)
+        return processed_data
+
     for year, path in filepaths.items():
-        processed_data[year] = preprocess_figaro_data(path, save_processed=True, processed_dir=processed_dir)
+        processed_data[year] = preprocess_figaro_stage(path, processed_dir, streaming, chunksize, force)
         print(f"Dataset for year {year} preprocessed successfully.")
-    return processed_data
\ No newline at end of file
+    return processed_data
@@ -0,0 +1,362 @@
+# shared/query_service.py
+#
+# Resident shock query service: loads the year-specific factorizations, CPI weights and label
+# registries once and answers price shock queries over a small local HTTP interface (standard
+# library asyncio only, no outside services). Queries for the same model that arrive within a
+# short window are coalesced into one batched solve.
+#
+#   GET  /health                               loaded models
+#   GET  /labels?model=systemic&year=2019      sector labels accepted in 'shocks'
+#   POST /shock                                JSON query, e.g.
+#        {"model": "systemic", "year": 2019, "shocks": {"IT_C19": 0.1}, "scheme": "eu28"}
+#        {"model": "gas", "year": 2021, "shocks": {"NO": 0.8}}
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import lu_factor, lu_solve
+
+from config import (
+    EU28_COUNTRIES,
+    GAS_PRICE_SHOCK_DATA,
+    SYSTEMIC_A_MATRIX_DIR,
+    SYSTEMIC_CPI_WEIGHTS_DIR,
+)
+from shared.matrix_loader import load_matrix_file
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Queries for the same model arriving within this window share one solve
+COALESCE_WINDOW_MS = 2.0
+MAX_BATCH_QUERIES = 256
+
+# Number of largest price changes returned per query (unless 'top' is given)
+DEFAULT_TOP = 10
+
+MODELS = ("systemic", "gas")
+GAS_SECTOR = "B_gas"
+
+
+def _label(key) -> str:
+    return "_".join(map(str, key))
+
+
+def _load_cpi_weights(root: Path, year: int, labels: pd.Index) -> dict:
+    # {scheme: (regions, weights aligned with labels)} for every scheme directory with a file for the year
+    schemes = {}
+    for tag_dir in sorted(Path(root).glob("*")):
+        weight_file = tag_dir / f"cpi_weights_{tag_dir.name}_{year}.csv"
+        if not weight_file.exists():
+            continue
+        cpi_weights = pd.read_csv(weight_file, header=[0, 1], index_col=[0, 1])
+        regions = [r for r in cpi_weights.columns.get_level_values(0).unique() if r != "ROW"]
+        weights = cpi_weights.loc[:, [(r, "cpi_weight") for r in regions]].reindex(labels).fillna(0.0)
+        schemes[tag_dir.name] = (regions, weights.to_numpy(dtype=np.float64))
+    return schemes
+
+
+def load_shock_model(model: str, year: int) -> dict:
+    """
+    Load everything a shock query needs for one model and year, factorized once.
+
+    'systemic' is the model of compute_unweighted_shocks (any set of shocked sectors is exogenous,
+    all others are endogenous): A of the systemic part and the LU factorization of I - A.
+    'gas' is the model of run_imported_gas_shock: the B_gas sectors are exogenous and the EU28
+    non-gas sectors endogenous, using the gas-weighted A and the LU factorization of I - A_EE'.
+
+    Parameters:
+        model (str): 'systemic' or 'gas'.
+        year (int): Year of the matrices.
+
+    Returns:
+        dict: Model state with 'labels', the 'registry' (label string -> position), the factorization
+              and the CPI weights per scheme.
+    """
+    if model == "systemic":
+        A_path = SYSTEMIC_A_MATRIX_DIR / f"A_{year}.csv"
+        weights_root = SYSTEMIC_CPI_WEIGHTS_DIR
+    elif model == "gas":
+        A_path = GAS_PRICE_SHOCK_DATA / "processed" / f"A_gas_weighted_{year}.csv"
+        weights_root = GAS_PRICE_SHOCK_DATA / "cpi_weights"
+    else:
+        raise ValueError(f"Unknown model '{model}' (expected one of {', '.join(MODELS)}).")
+
+    if not A_path.exists():
+        raise FileNotFoundError(f"No {model} A matrix for {year}: {A_path}")
+
+    start = time.perf_counter()
+    A = load_matrix_file(A_path, header=[0, 1], index_col=[0, 1])
+    values = A.to_numpy(dtype=np.float64)
+
+    if model == "systemic":
+        labels = A.index
+        state = {"lu_piv": lu_factor(np.eye(len(values)) - values), "shocked": labels}
+    else:
+        sectors = A.index.get_level_values(1)
+        countries = A.index.get_level_values(0)
+        exogenous = np.flatnonzero(sectors == GAS_SECTOR)
+        endogenous = np.flatnonzero(countries.isin(EU28_COUNTRIES) & (sectors != GAS_SECTOR))
+        labels = A.index[endogenous]
+        state = {
+            "lu_piv": lu_factor(np.eye(len(endogenous)) - values[np.ix_(endogenous, endogenous)].T),
+            "cost_push": values[np.ix_(exogenous, endogenous)].T,
+            "shocked": A.index[exogenous],
+        }
+
+    state.update({
+        "model": model,
+        "year": year,
+        "labels": labels,
+        "label_strings": [_label(key) for key in labels],
+        "registry": {_label(key): position for position, key in enumerate(state["shocked"])},
+        "weights": _load_cpi_weights(weights_root, year, labels),
+    })
+    print(f"Loaded {model} model {year}: {len(labels)} sectors, "
+          f"{len(state['weights'])} CPI schemes ({time.perf_counter() - start:.2f}s)")
+    return state
+
+
+def parse_shock_query(state: dict, query: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Positions (in the model's shockable sectors) and sizes of the shocks of a query.
+
+    Keys are '<country>_<sector>' labels; for the gas model a bare country code means its B_gas sector.
+    """
+    shocks = query.get("shocks")
+    if not isinstance(shocks, dict) or not shocks:
+        raise ValueError("'shocks' must be a nonempty object of label -> relative price change.")
+
+    positions, sizes = [], []
+    for key, size in shocks.items():
+        label = f"{key}_{GAS_SECTOR}" if state["model"] == "gas" and "_" not in key else key
+        if label not in state["registry"]:
+            raise ValueError(f"Unknown sector '{key}' for the {state['model']} model {state['year']}.")
+        positions.append(state["registry"][label])
+        sizes.append(float(size))
+    return np.asarray(positions), np.asarray(sizes)
+
+
+def solve_shock_batch(state: dict, shocks: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    Price changes of all labels of the model for a batch of parsed queries, with one solve.
+
+    Systemic: with G = (I - A')^-1 and the shocked set X of a query, the price change is
+    p = G[:, X] G[X, X]^-1 dP_X (exact for the model with X exogenous; p[X] = dP_X). The
+    columns G[:, X] of all queries come from one solve against the union of their sectors.
+    Gas: dP_E = (I - A_EE')^-1 A_XE' dP_X, with the shock vectors of all queries as columns.
+
+    Returns:
+        np.ndarray: One column per query (labels x queries).
+    """
+    if state["model"] == "gas":
+        P_X = np.zeros((len(state["shocked"]), len(shocks)))
+        for column, (positions, sizes) in enumerate(shocks):
+            P_X[positions, column] = sizes
+        return lu_solve(state["lu_piv"], state["cost_push"] @ P_X)
+
+    union = np.unique(np.concatenate([positions for positions, _ in shocks]))
+    n = len(state["labels"])
+    unit_columns = np.zeros((n, len(union)))
+    unit_columns[union, np.arange(len(union))] = 1.0
+    G_columns = lu_solve(state["lu_piv"], unit_columns, trans=1)
+
+    prices = np.empty((n, len(shocks)))
+    for column, (positions, sizes) in enumerate(shocks):
+        G_X = G_columns[:, np.searchsorted(union, positions)]
+        prices[:, column] = G_X @ np.linalg.solve(G_X[positions], sizes)
+        prices[positions, column] = sizes
+    return prices
+
+
+def summarize_shock(state: dict, query: dict, positions: np.ndarray, prices: np.ndarray) -> dict:
+    """
+    JSON answer for one query: CPI impacts per scheme and region and the largest price changes.
+
+    For the systemic model the CPI impact is split as in the weighted impact tables: direct
+    (shocked sectors) and indirect (all other sectors). The gas model only has indirect impacts.
+    """
+    schemes = state["weights"]
+    if query.get("scheme") is not None:
+        if query["scheme"] not in schemes:
+            raise ValueError(f"Unknown CPI scheme '{query['scheme']}' (available: {', '.join(schemes)}).")
+        schemes = {query["scheme"]: schemes[query["scheme"]]}
+
+    direct_prices = np.zeros_like(prices)
+    if state["model"] == "systemic":
+        direct_prices[positions] = prices[positions]
+    indirect_prices = prices - direct_prices
+
+    impacts = {}
+    for scheme, (regions, weights) in schemes.items():
+        direct, indirect = weights.T @ direct_prices, weights.T @ indirect_prices
+        impacts[scheme] = {
+            region: {"direct": float(d), "indirect": float(i), "total": float(d + i)}
+            for region, d, i in zip(regions, direct, indirect)
+        }
+
+    top = int(query.get("top", DEFAULT_TOP))
+    order = np.argsort(-np.abs(indirect_prices), kind="stable")[:top]
+    return {
+        "model": state["model"],
+        "year": state["year"],
+        "shocks": query["shocks"],
+        "impacts": impacts,
+        "top": [{"label": state["label_strings"][i], "price_change": float(prices[i])} for i in order],
+    }
+
+
+class _ShockQueryService:
+    """
+    Resident models plus per-model coalescing of concurrent queries.
+    """
+
+    def __init__(self, window_ms: float = COALESCE_WINDOW_MS, max_batch: int = MAX_BATCH_QUERIES):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.models = {}
+        self.loading = {}
+        self.pending = {}
+
+    async def model(self, model: str, year: int) -> dict:
+        key = (model, year)
+        if key not in self.models:
+            if key not in self.loading:
+                loop = asyncio.get_running_loop()
+                self.loading[key] = loop.run_in_executor(None, load_shock_model, model, year)
+            try:
+                self.models[key] = await self.loading[key]
+            finally:
+                self.loading.pop(key, None)
+        return self.models[key]
+
+    async def query(self, query: dict) -> dict:
+        state = await self.model(query.get("model", "systemic"), int(query["year"]))
+        positions, sizes = parse_shock_query(state, query)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (state["model"], state["year"])
+        batch = self.pending.setdefault(key, [])
+        batch.append((positions, sizes, future))
+        if len(batch) == 1:
+            loop.call_later(self.window, self.flush, key)
+        elif len(batch) >= self.max_batch:
+            self.flush(key)
+
+        prices, batch_size = await future
+        answer = summarize_shock(state, query, positions, prices)
+        answer["batch_size"] = batch_size
+        return answer
+
+    def flush(self, key: tuple) -> None:
+        batch = self.pending.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self._solve(self.models[key], batch))
+
+    async def _solve(self, state: dict, batch: list) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            prices = await loop.run_in_executor(
+                None, solve_shock_batch, state, [(positions, sizes) for positions, sizes, _ in batch]
+            )
+        except Exception as error:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        # A future is already done if its request was cancelled (e.g. the client disconnected)
+        for column, (_, _, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((prices[:, column], len(batch)))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        start = time.perf_counter()
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if len(request_line) < 2:
+                raise ValueError("Malformed request.")
+            method, target = request_line[0], urlsplit(request_line[1])
+            params = {name: values[-1] for name, values in parse_qs(target.query).items()}
+
+            if method == "GET" and target.path == "/health":
+                status, payload = 200, {"status": "ok", "models": [f"{m}_{y}" for m, y in self.models]}
+            elif method == "GET" and target.path == "/labels":
+                state = await self.model(params.get("model", "systemic"), int(params["year"]))
+                status, payload = 200, {"shockable": list(state["registry"]), "labels": state["label_strings"]}
+            elif method == "POST" and target.path == "/shock":
+                query = json.loads(body or b"{}")
+                if not isinstance(query, dict):
+                    raise ValueError("The query must be a JSON object.")
+                status, payload = 200, await self.query(query)
+            else:
+                status, payload = 404, {"error": f"No route for {method} {target.path}"}
+        except (ValueError, KeyError, FileNotFoundError, asyncio.IncompleteReadError) as error:
+            status, payload = 400, {"error": str(error)}
+        except Exception as error:
+            status, payload = 500, {"error": f"{type(error).__name__}: {error}"}
+
+        payload["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        data = json.dumps(payload).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}.get(status, "Internal Server Error")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int, preload: list[tuple[str, int]], window_ms: float) -> None:
+    service = _ShockQueryService(window_ms)
+    for model, year in preload:
+        await service.model(model, year)
+
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Shock query service listening on http://{host}:{port} (coalescing window {window_ms} ms)")
+    async with server:
+        await server.serve_forever()
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    years: Optional[list[int]] = None,
+    models: tuple = ("systemic",),
+    window_ms: float = COALESCE_WINDOW_MS
+) -> None:
+    """
+    Run the shock query service until interrupted.
+
+    Parameters:
+        host (str): Interface to bind (default: localhost only).
+        port (int): TCP port.
+        years (list[int] | None): Years loaded at startup; other years are loaded on their first query.
+        models (tuple): Models loaded at startup for each of the years.
+        window_ms (float): Coalescing window in milliseconds.
+    """
+    preload = [(model, year) for year in (years or []) for model in models]
+    try:
+        asyncio.run(_serve(host, port, preload, window_ms))
+    except KeyboardInterrupt:
+        print("Shock query service stopped.")
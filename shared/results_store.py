@@ -0,0 +1,314 @@
+# shared/results_store.py
+#
+# One Parquet dataset for the result tables of both analyses, partitioned as
+#
+#   RESULTS_STORE_DIR/analysis=<analysis>/year=<year>/scheme=<scheme>/part-0.parquet
+#
+# Each analysis has its own long schema; Country, Sector, Region (and the exogenous labels)
+# are stored dictionary-encoded and read back as pandas categoricals. pyarrow is imported
+# inside the functions, so importing this module stays cheap.
+
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    GAS_PRICE_SHOCK_OUTPUTS,
+    RESULTS_STORE_DIR,
+    SYSTEMIC_UNWEIGHTED_IMPACTS_DIR,
+    SYSTEMIC_WEIGHTED_IMPACTS_DIR,
+    ensure_dir,
+)
+
+# Analyses in the store and the tables they hold
+ANALYSES = {
+    "systemic_weighted": "CPI-weighted impacts per exogenous sector and region (weighted_impacts_<scheme>_<year>.csv)",
+    "systemic_unweighted": "Price change per (exogenous sector, affected sector), with the decomposition if available",
+    "gas_weighted": "CPI-weighted gas shock impacts per sector, scenario and region",
+    "gas_unweighted": "Gas shock price change per sector and scenario",
+}
+
+# Scheme partition of tables without CPI weighting
+UNWEIGHTED_SCHEME = "none"
+
+CATEGORICAL_COLUMNS = ["Exogenous Country", "Exogenous Sector", "Country", "Sector", "Region", "Scenario"]
+
+# Gas result files (as written by gas_main) -> (scenario, scheme); '{year}' is the gas year
+GAS_WEIGHTED_FILES = {
+    "extra_cpi_applied_total_impact_eu28.csv": ("extra", "eu28"),
+    "full_cpi_applied_total_impact_eu28.csv": ("full", "eu28"),
+    "intra_cpi_applied_total_impact_eu28.csv": ("intra", "eu28"),
+    "incl_dom_impact_eu28_extra.csv": ("incl_dom_extra", "eu28"),
+    "incl_dom_impact_eu28_intra_extra.csv": ("incl_dom_intra_extra", "eu28"),
+    "extra_cpi_country_impacts_{year}.csv": ("extra", "per_country"),
+    "full_cpi_country_impacts_{year}.csv": ("full", "per_country"),
+    "intra_cpi_country_impacts_{year}.csv": ("intra", "per_country"),
+    "incl_dom_cpi_country_impacts_extra_{year}.csv": ("incl_dom_extra", "per_country"),
+    "incl_dom_cpi_country_impacts_intra_extra_{year}.csv": ("incl_dom_intra_extra", "per_country"),
+}
+GAS_SHOCK_FILES = {
+    "excluding_domestic/results_extra.csv": "extra",
+    "excluding_domestic/results_full.csv": "full",
+    "excluding_domestic/results_intra.csv": "intra",
+    "including_domestic/results_extra_{year}.csv": "incl_dom_extra",
+    "including_domestic/results_intra_extra_{year}.csv": "incl_dom_intra_extra",
+}
+
+
+def partition_path(analysis: str, year: int, scheme: str, store_dir: Optional[Path] = None) -> Path:
+    """
+    Directory of one (analysis, year, scheme) partition.
+    """
+    return Path(store_dir or RESULTS_STORE_DIR) / f"analysis={analysis}" / f"year={year}" / f"scheme={scheme}"
+
+
+def write_results_partition(
+    df: pd.DataFrame,
+    analysis: str,
+    year: int,
+    scheme: str,
+    store_dir: Optional[Path] = None
+) -> Path:
+    """
+    Write (or replace) one partition of the results store.
+
+    Label columns are converted to categoricals, so Parquet stores them dictionary-encoded.
+    The new partition is written to a hidden staging directory next to it. An existing
+    partition is first renamed aside, the staging directory is renamed into its place and
+    only then is the old copy deleted, so readers never see a partially written or
+    partially deleted partition.
+
+    Parameters:
+        df (pd.DataFrame): Long table without the partition columns.
+        analysis (str): One of ANALYSES.
+        year (int): Year of the results.
+        scheme (str): CPI weighting scheme (UNWEIGHTED_SCHEME for unweighted tables).
+        store_dir (Path | None): Store root (default: RESULTS_STORE_DIR).
+
+    Returns:
+        Path: The written Parquet file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if analysis not in ANALYSES:
+        raise ValueError(f"Unknown analysis '{analysis}' (expected one of {', '.join(ANALYSES)}).")
+
+    df = df.reset_index(drop=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(str).astype("category")
+
+    partition = partition_path(analysis, year, scheme, store_dir)
+    staging = ensure_dir(partition.parent) / f".{partition.name}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), staging / "part-0.parquet")
+
+    previous = partition.with_name(f".{partition.name}.old")
+    shutil.rmtree(previous, ignore_errors=True)
+    if partition.exists():
+        os.replace(partition, previous)
+    os.replace(staging, partition)
+    shutil.rmtree(previous, ignore_errors=True)
+    return partition / "part-0.parquet"
+
+
+def _systemic_weighted_tables(years: Optional[Iterable[int]]) -> Iterable[tuple]:
+    pattern = re.compile(r"weighted_impacts_(.+)_(\d{4})$")
+    for path in sorted(Path(SYSTEMIC_WEIGHTED_IMPACTS_DIR).glob("weighted_impacts_*.csv")):
+        match = pattern.match(path.stem)
+        if match and (years is None or int(match.group(2)) in years):
+            yield int(match.group(2)), match.group(1), lambda path=path: pd.read_csv(path)
+
+
+def _systemic_unweighted_tables(years: Optional[Iterable[int]]) -> Iterable[tuple]:
+    for path in sorted(Path(SYSTEMIC_UNWEIGHTED_IMPACTS_DIR).glob("unweighted_shock_impacts_*.csv")):
+        year = int(path.stem.rsplit("_", 1)[-1])
+        if years is not None and year not in years:
+            continue
+
+        decomposition_path = path.with_name(f"unweighted_shock_decomposition_{year}.csv")
+        if decomposition_path.exists():
+            yield year, UNWEIGHTED_SCHEME, lambda path=decomposition_path: pd.read_csv(path)
+            continue
+
+        def melt_matrix(path=path) -> pd.DataFrame:
+            # Exogenous sectors x affected sectors -> one row per pair with a price change
+            matrix = pd.read_csv(path, header=[0, 1], index_col=[0, 1])
+            values = matrix.to_numpy(dtype=np.float64)
+            rows, cols = np.nonzero(~np.isnan(values))
+            return pd.DataFrame({
+                "Exogenous Country": matrix.index.get_level_values(0)[rows],
+                "Exogenous Sector": matrix.index.get_level_values(1)[rows],
+                "Country": matrix.columns.get_level_values(0)[cols],
+                "Sector": matrix.columns.get_level_values(1)[cols],
+                "Price Change": values[rows, cols],
+            })
+
+        yield year, UNWEIGHTED_SCHEME, melt_matrix
+
+
+def _gas_tables(gas_year: int) -> tuple[dict, list]:
+    # {scheme: [(scenario, path)]} for the weighted files and [(scenario, path)] for the shock results
+    weighted_dir = Path(GAS_PRICE_SHOCK_OUTPUTS) / "weighted_impacts"
+    weighted = {}
+    for template, (scenario, scheme) in GAS_WEIGHTED_FILES.items():
+        path = weighted_dir / template.format(year=gas_year)
+        if path.exists():
+            weighted.setdefault(scheme, []).append((scenario, path))
+
+    shocks = [(scenario, Path(GAS_PRICE_SHOCK_OUTPUTS) / template.format(year=gas_year))
+              for template, scenario in GAS_SHOCK_FILES.items()]
+    return weighted, [(scenario, path) for scenario, path in shocks if path.exists()]
+
+
+def _read_gas_weighted(files: list[tuple[str, Path]]) -> pd.DataFrame:
+    frames = []
+    for scenario, path in files:
+        wide = pd.read_csv(path, index_col=[0, 1]).rename_axis(["Country", "Sector"]).reset_index()
+        long = wide.melt(id_vars=["Country", "Sector"], var_name="Region", value_name="Impact")
+        long.insert(0, "Scenario", scenario)
+        frames.append(long)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _read_gas_shocks(files: list[tuple[str, Path]]) -> pd.DataFrame:
+    frames = []
+    for scenario, path in files:
+        df = pd.read_csv(path, index_col=[0, 1]).rename_axis(["Country", "Sector"]).reset_index()
+        df.insert(0, "Scenario", scenario)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_results_store(
+    years: Optional[Iterable[int]] = None,
+    gas_year: Optional[int] = 2021,
+    store_dir: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Collect the weighted and unweighted result CSVs of both analyses into the results store.
+
+    Each (analysis, year, scheme) partition is rewritten as a whole, so rebuilding after a
+    rerun of a pipeline replaces the old results.
+
+    Parameters:
+        years (Iterable[int] | None): Systemic years to collect (default: all available).
+        gas_year (int | None): Year of the gas results (the gas pipeline runs one year); None skips them.
+        store_dir (Path | None): Store root (default: RESULTS_STORE_DIR).
+
+    Returns:
+        pd.DataFrame: One row per written partition with 'analysis', 'year', 'scheme', 'rows' and 'path'.
+    """
+    years = set(years) if years is not None else None
+    tables = [("systemic_weighted",) + table for table in _systemic_weighted_tables(years)]
+    tables += [("systemic_unweighted",) + table for table in _systemic_unweighted_tables(years)]
+
+    if gas_year is not None:
+        weighted, shocks = _gas_tables(gas_year)
+        tables += [("gas_weighted", gas_year, scheme, lambda files=files: _read_gas_weighted(files))
+                   for scheme, files in weighted.items()]
+        if shocks:
+            tables.append(("gas_unweighted", gas_year, UNWEIGHTED_SCHEME, lambda: _read_gas_shocks(shocks)))
+
+    written = []
+    for analysis, year, scheme, read in tables:
+        df = read()
+        path = write_results_partition(df, analysis, year, scheme, store_dir)
+        written.append({"analysis": analysis, "year": year, "scheme": scheme, "rows": len(df), "path": path})
+        print(f"Stored {analysis} {year} {scheme}: {len(df)} rows")
+
+    if not written:
+        print("No result files found for the results store.")
+    return pd.DataFrame(written, columns=["analysis", "year", "scheme", "rows", "path"])
+
+
+def list_partitions(store_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Partitions in the store ('analysis', 'year', 'scheme'), read from the directory names only.
+    """
+    rows = []
+    for path in sorted(Path(store_dir or RESULTS_STORE_DIR).glob("analysis=*/year=*/scheme=*")):
+        if path.is_dir():
+            rows.append({
+                "analysis": path.parent.parent.name.split("=", 1)[1],
+                "year": int(path.parent.name.split("=", 1)[1]),
+                "scheme": path.name.split("=", 1)[1],
+            })
+    return pd.DataFrame(rows, columns=["analysis", "year", "scheme"])
+
+
+def query_results(
+    analysis: str,
+    years: Optional[Iterable[int]] = None,
+    schemes: Optional[Iterable[str]] = None,
+    filters: Optional[dict[str, Union[object, Iterable]]] = None,
+    columns: Optional[list[str]] = None,
+    store_dir: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Read results of one analysis, pushing the filters down to the Parquet dataset.
+
+    Year and scheme filters prune whole partitions (only the matching directories are opened);
+    column filters (e.g. {'Region': 'EU28', 'Sector': ['C19', 'C20']}) are applied while scanning
+    using the row group statistics.
+
+    Parameters:
+        analysis (str): One of ANALYSES.
+        years (Iterable[int] | None): Years to read (default: all).
+        schemes (Iterable[str] | None): Schemes to read (default: all).
+        filters (dict | None): Column -> value or list of values.
+        columns (list[str] | None): Columns to read besides 'year' and 'scheme' (default: all).
+        store_dir (Path | None): Store root (default: RESULTS_STORE_DIR).
+
+    Returns:
+        pd.DataFrame: Matching rows with 'year' and 'scheme' columns; label columns are categoricals.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    root = Path(store_dir or RESULTS_STORE_DIR) / f"analysis={analysis}"
+    if not root.exists():
+        raise FileNotFoundError(f"No '{analysis}' results in the store ({root}); run build_results_store first.")
+
+    partition_schema = pa.schema([("year", pa.int32()), ("scheme", pa.string())])
+    partitioning = ds.partitioning(partition_schema, flavor="hive")
+
+    def condition_for(column: str, value) -> "ds.Expression":
+        # NumPy scalars (e.g. a year taken from a frame) are single values as well
+        if pd.api.types.is_scalar(value):
+            return ds.field(column) == value
+        return ds.field(column).isin(list(value))
+
+    def combine(conditions: dict) -> Optional["ds.Expression"]:
+        expression = None
+        for column, value in conditions.items():
+            if value is not None:
+                condition = condition_for(column, value)
+                expression = condition if expression is None else expression & condition
+        return expression
+
+    partition_filter = combine({"year": years, "scheme": schemes})
+    row_filter = combine(filters or {})
+
+    # Partitions of one analysis may differ in their columns (e.g. unweighted impacts with and
+    # without the decomposition); only the footers of the selected partitions are read to unify them
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning)
+    fragments = list(dataset.get_fragments(filter=partition_filter))
+    if not fragments:
+        return pd.DataFrame(columns=columns)
+    schema = pa.unify_schemas([fragment.physical_schema for fragment in fragments] + [partition_schema])
+    dataset = ds.FileSystemDataset(fragments, schema, dataset.format, dataset.filesystem)
+
+    if columns is not None:
+        columns = ["year", "scheme"] + [c for c in columns if c not in ("year", "scheme")]
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
@@ -1,5 +1,6 @@
 # shared_main.py
 
+import os
 from pathlib import Path
 import sys
 
@@ -9,15 +10,22 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 from config import FIGARO_RAW_DIR, FIGARO_FULL_MATRIX_DIR
 from data_loader import get_figaro_file_paths
 from preprocessing import get_preprocessed_figaro_matrices
+from shared.instrumentation import instrumented_run, stage
+
+@instrumented_run("figaro_preprocessing")
+def main(streaming: bool = True, max_workers: int = None):
+    # Years are independent, so downloads and preprocessing are fanned out per year
+    max_workers = max_workers or os.cpu_count() or 1
 
-def main():
     # Step 1: Download raw FIGARO data (only if not already downloaded)
     print("=== Downloading FIGARO data ===")
-    file_paths = get_figaro_file_paths(start_year=2010, end_year=2022)
+    with stage("figaro_download"):
+        file_paths = get_figaro_file_paths(start_year=2010, end_year=2022, max_workers=min(max_workers, 4))
 
     # Step 2: Preprocess FIGARO data into MultiIndex format with consistent sector naming
+    # (streamed in row chunks, so peak memory stays bounded across all years)
     print("\n=== Preprocessing FIGARO data ===")
-    figaro_data = get_preprocessed_figaro_matrices(file_paths, processed_dir=FIGARO_FULL_MATRIX_DIR)
+    figaro_data = get_preprocessed_figaro_matrices(file_paths, processed_dir=FIGARO_FULL_MATRIX_DIR, streaming=streaming, max_workers=max_workers)
 
     print("\n=== FIGARO data pipeline completed ===")
     return figaro_data
@@ -0,0 +1,136 @@
+# shared/spillover_decomposition.py
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import lu_factor, lu_solve
+
+# Names of the three components, as used for the added output columns
+DECOMPOSITION_COLUMNS = ["Domestic", "Foreign Input", "Feedback"]
+
+
+def country_blocks(labels: pd.Index) -> list[np.ndarray]:
+    """
+    Positions of the sectors of each country (first level of labels), in first-seen order.
+    """
+    countries = labels.get_level_values(0)
+    return [np.flatnonzero(countries == country) for country in pd.unique(countries)]
+
+
+def factor_country_blocks(M: np.ndarray, blocks: list[np.ndarray]) -> list[tuple]:
+    """
+    LU factorizations of the diagonal country blocks I - M[c, c].
+    """
+    return [lu_factor(np.eye(len(block)) - M[np.ix_(block, block)]) for block in blocks]
+
+
+def block_diagonal_solve(factors: list[tuple], blocks: list[np.ndarray], b: np.ndarray) -> np.ndarray:
+    """
+    Solve (I - D) x = b, where D is the block-diagonal (domestic) part of M, one country at a time.
+    """
+    x = np.empty_like(b, dtype=np.float64)
+    for lu_piv, block in zip(factors, blocks):
+        x[block] = lu_solve(lu_piv, b[block])
+    return x
+
+
+def _apply_trade_part(M: np.ndarray, blocks: list[np.ndarray], x: np.ndarray) -> np.ndarray:
+    # F x = M x - D x, with F the off-diagonal (trade) part of M
+    y = M @ x
+    for block in blocks:
+        y[block] -= M[np.ix_(block, block)] @ x[block]
+    return y
+
+
+def decompose_price_change(
+    M: np.ndarray,
+    b: np.ndarray,
+    dP: np.ndarray,
+    blocks: list[np.ndarray],
+    factors: list[tuple] = None
+) -> dict:
+    """
+    Split the solution dP of (I - M) dP = b into domestic propagation, direct foreign input
+    and multi-country feedback.
+
+    M = D + F, with D the block-diagonal part (input links within a country) and F the trade part.
+    With L_D = (I - D)^-1, dP = L_D b + L_D F dP, so
+
+        Domestic      = L_D b                   the direct cost push, passed on through domestic chains only
+        Foreign Input = L_D F L_D b             price rises of imported inputs (domestic chains abroad, one border crossing)
+        Feedback      = L_D F (dP - L_D b)      two or more border crossings, including feedback into the origin country
+
+    The three components add up to dP. Only the small country blocks are factorized; the full
+    solution dP is taken from the caller.
+
+    Parameters:
+        M (np.ndarray): Price model matrix (n x n), e.g. A_EE' of the endogenous sectors.
+        b (np.ndarray): Direct cost push (n) or (n x k), e.g. A_XE' dP_X.
+        dP (np.ndarray): Solution of (I - M) dP = b, same shape as b.
+        blocks (list[np.ndarray]): Positions of each country's sectors (see country_blocks).
+        factors (list[tuple] | None): Block factorizations (see factor_country_blocks); computed if None.
+
+    Returns:
+        dict: {'Domestic', 'Foreign Input', 'Feedback'} -> arrays with the shape of dP.
+    """
+    if factors is None:
+        factors = factor_country_blocks(M, blocks)
+
+    domestic = block_diagonal_solve(factors, blocks, b)
+    feedback = block_diagonal_solve(factors, blocks, _apply_trade_part(M, blocks, dP - domestic))
+    return {"Domestic": domestic, "Foreign Input": dP - domestic - feedback, "Feedback": feedback}
+
+
+def decompose_single_sector_shocks(A: pd.DataFrame, shocks: np.ndarray, dP: np.ndarray) -> dict:
+    """
+    Decomposition (see decompose_price_change) of the single-sector shocks of compute_unweighted_shocks,
+    for all exogenous sectors at once.
+
+    Scenario k makes sector k exogenous, so M_k = A' without row and column k and b_k = s_k * A[k, -k].
+    Instead of factorizing the country blocks once per scenario, the blocks of the full A' are factorized
+    once: with H = (I - D)^-1 and y = H z (z[k] = 0), the solution of the block system without sector k
+    is y - H[:, k] * y[k] / H[k, k] (the same bordering identity as in cpi_adjoint_impacts).
+
+    Parameters:
+        A (pd.DataFrame): Technical coefficients with (Country, Sector) on both axes.
+        shocks (np.ndarray): Price shock per sector (n); scenarios are the sectors with a nonzero shock.
+        dP (np.ndarray): Price changes (n x n): column k holds the response to shocking sector k,
+                         with dP[k, k] = 0.
+
+    Returns:
+        dict: {'Domestic', 'Foreign Input', 'Feedback'} -> (n x n) arrays laid out like dP.
+    """
+    if not A.index.equals(A.columns):
+        raise ValueError("A must have identical row and column labels.")
+
+    values = A.to_numpy(dtype=np.float64)
+    M = values.T
+    n = len(values)
+    blocks = country_blocks(A.index)
+    factors = factor_country_blocks(M, blocks)
+
+    # Block-diagonal inverse, kept only for its diagonal and its columns
+    H = block_diagonal_solve(factors, blocks, np.eye(n))
+    H_diagonal = np.diag(H).copy()
+    scenarios = np.arange(n)
+
+    def solve_without_exogenous(z: np.ndarray) -> np.ndarray:
+        z[scenarios, scenarios] = 0.0
+        y = block_diagonal_solve(factors, blocks, z)
+        y -= H * (np.diag(y) / H_diagonal)
+        y[scenarios, scenarios] = 0.0
+        return y
+
+    b = values * shocks[:, None]
+    domestic = solve_without_exogenous(b.T.copy())
+    feedback = solve_without_exogenous(_apply_trade_part(M, blocks, dP - domestic))
+
+    unshocked = shocks == 0
+    components = {"Domestic": domestic, "Foreign Input": dP - domestic - feedback, "Feedback": feedback}
+    for component in components.values():
+        component[:, unshocked] = 0.0
+    return components
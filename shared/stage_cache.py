@@ -0,0 +1,242 @@
+# shared/stage_cache.py
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+from config import STAGE_CACHE_DIR, ensure_dir
+from shared.instrumentation import stage
+
+# Bump to invalidate every stage at once (e.g. after changing the manifest format)
+STAGE_CACHE_VERSION = 1
+
+# Set MASTERTHESIS_STAGE_CACHE=0 to rerun every stage regardless of its manifest
+STAGE_CACHE_ENV = "MASTERTHESIS_STAGE_CACHE"
+
+
+def stage_cache_enabled() -> bool:
+    """
+    Return False if the stage cache is switched off via the MASTERTHESIS_STAGE_CACHE environment variable.
+    """
+    return os.environ.get(STAGE_CACHE_ENV, "1").lower() not in ("0", "false", "off", "no")
+
+
+def _file_record(path: Path, known: Optional[dict] = None, block_size: int = 1 << 20) -> dict:
+    """
+    Return {'size', 'mtime_ns', 'digest'} for a file.
+
+    If a record from an earlier manifest has the same size and modification time, its
+    digest is reused instead of re-reading the file (as git does for its index).
+    """
+    stat = path.stat()
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return dict(known)
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": sha.hexdigest()}
+
+
+def artifact_records(paths: Iterable[Path], known: Optional[dict] = None) -> dict:
+    """
+    Fingerprint input or output artifacts.
+
+    Directories are expanded to all files below them. Missing paths are recorded as
+    'missing', so a stage whose input appears later is recomputed.
+
+    Parameters:
+        paths (Iterable[Path]): Files or directories.
+        known (dict | None): Records from a previous manifest, used to skip re-hashing unchanged files.
+
+    Returns:
+        dict: {path string: record}
+    """
+    known = known or {}
+    records = {}
+    for path in paths:
+        path = Path(path)
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            key = str(file)
+            if file.exists():
+                records[key] = _file_record(file, known.get(key))
+            else:
+                records[key] = {"digest": "missing"}
+    return records
+
+
+def _canonical(obj: Any) -> Any:
+    """
+    Convert parameters (dicts, sets, paths, numpy scalars, ...) into a stable JSON-serialisable form.
+    """
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (set, frozenset)):
+        return sorted((_canonical(v) for v in obj), key=repr)
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float):
+        return repr(obj)
+    if obj is None or isinstance(obj, (str, int, bool)):
+        return obj
+    return repr(obj)
+
+
+def hash_params(params: Optional[dict]) -> str:
+    """
+    Hash stage parameters (mapping dicts from config, shock factors, ...) independently of dict/set ordering.
+    """
+    payload = json.dumps(_canonical(params or {}), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def code_version(*objects: Any) -> str:
+    """
+    Hash the source code of the functions or modules a stage depends on.
+
+    Strings are taken as explicit version tags. Objects without retrievable source
+    fall back to their qualified name.
+    """
+    sha = hashlib.sha256(str(STAGE_CACHE_VERSION).encode("utf-8"))
+    for obj in objects:
+        if isinstance(obj, str):
+            source = obj
+        else:
+            try:
+                source = inspect.getsource(obj)
+            except (OSError, TypeError):
+                source = f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+        sha.update(source.encode("utf-8"))
+    return sha.hexdigest()
+
+
+def stage_key(input_records: dict, params: Optional[dict], code: str) -> str:
+    """
+    Combine input digests, parameter hash and code version into the stage key.
+    """
+    payload = json.dumps({
+        "inputs": {path: record["digest"] for path, record in sorted(input_records.items())},
+        "params": hash_params(params),
+        "code": code,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path(name: str, cache_dir: Path = STAGE_CACHE_DIR) -> Path:
+    """
+    Return the manifest file of a stage (e.g. 'stage_cache/systemic_aggregate_2019.json').
+    """
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return cache_dir / f"{safe_name}.json"
+
+
+def read_manifest(name: str, cache_dir: Path = STAGE_CACHE_DIR) -> Optional[dict]:
+    """
+    Read the manifest of a stage, or return None if there is none (or it is unreadable).
+    """
+    path = manifest_path(name, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(name: str, key: str, input_records: dict, output_records: dict, cache_dir: Path = STAGE_CACHE_DIR) -> Path:
+    """
+    Atomically write the manifest of a completed stage.
+    """
+    path = manifest_path(name, cache_dir)
+    ensure_dir(path.parent)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"stage": name, "key": key, "inputs": input_records, "outputs": output_records}, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_stage(
+    name: str,
+    func: Callable[[], Any],
+    inputs: Iterable[Path] = (),
+    outputs: Iterable[Path] = (),
+    params: Optional[dict] = None,
+    code: Iterable[Any] = (),
+    load: Optional[Callable[[], Any]] = None,
+    force: bool = False,
+    cache_dir: Path = STAGE_CACHE_DIR
+) -> Any:
+    """
+    Run a pipeline stage unless its outputs are up to date.
+
+    The stage key is a hash of the content of all input artifacts, the stage parameters
+    and the source code of the functions/modules it depends on. The stage is skipped if
+    the key matches the stored manifest and every output still has the content recorded
+    when it was written. Otherwise func is run and a new manifest is written.
+
+    Parameters:
+        name (str): Unique stage name (include the year for per-year stages).
+        func (Callable): Computes the stage and writes its outputs; its return value is passed through.
+        inputs (Iterable[Path]): Files or directories the stage reads.
+        outputs (Iterable[Path]): Files the stage writes.
+        params (dict | None): Parameters that change the result (mappings, shock factors, ...).
+        code (Iterable): Functions/modules (or version strings) whose source defines the stage.
+        load (Callable | None): Called instead of func when the stage is skipped, e.g. to read the outputs back.
+        force (bool): Always recompute.
+        cache_dir (Path): Directory for the manifests (default: STAGE_CACHE_DIR).
+
+    Returns:
+        Any: func() if the stage ran, load() if it was skipped (None without a loader).
+    """
+    with stage(name) as record:
+        return _run_stage(name, func, inputs, outputs, params, code, load, force, cache_dir, record)
+
+
+def _run_stage(name, func, inputs, outputs, params, code, load, force, cache_dir, record: dict) -> Any:
+    inputs, outputs = list(inputs), list(outputs)
+    manifest = read_manifest(name, cache_dir) or {}
+
+    input_records = artifact_records(inputs, manifest.get("inputs"))
+    key = stage_key(input_records, params, code_version(*code))
+
+    if not force and stage_cache_enabled() and manifest.get("key") == key:
+        recorded = manifest.get("outputs", {})
+        current = artifact_records(outputs, recorded)
+        if current and all(
+            path in recorded and record["digest"] == recorded[path]["digest"]
+            for path, record in current.items()
+        ):
+            print(f"Skipping stage '{name}' (inputs, parameters and code unchanged).")
+            record["cached"] = True
+            return load() if load is not None else None
+
+    print(f"Running stage '{name}' ...")
+    for path in outputs:
+        ensure_dir(Path(path).parent)
+    result = func()
+
+    output_records = artifact_records(outputs)
+    missing = [path for path, record in output_records.items() if record["digest"] == "missing"]
+    if missing:
+        print(f"Stage '{name}' did not write {missing}; it will rerun next time.")
+    else:
+        # Re-fingerprint the inputs in case the stage created or touched them (e.g. a download)
+        input_records = artifact_records(inputs, input_records)
+        key = stage_key(input_records, params, code_version(*code))
+        write_manifest(name, key, input_records, output_records, cache_dir)
+
+    return result
@@ -0,0 +1,159 @@
+# shared/structural_paths.py
+
+import heapq
+import sys
+from pathlib import Path
+from typing import Iterable, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.linalg import lu_factor, lu_solve
+
+# Paths are only expanded while their whole subtree can still contribute at least this
+# share of the total impact (relative to the exact total of all paths)
+DEFAULT_RELATIVE_THRESHOLD = 1e-6
+
+# Hard cap on expanded nodes, so a very flat system cannot run away
+MAX_EXPANSIONS = 2_000_000
+
+
+def _label(key) -> str:
+    return "_".join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+
+def structural_path_analysis(
+    A: pd.DataFrame,
+    shocks: pd.Series,
+    endogenous: Optional[Iterable] = None,
+    weights: Optional[pd.Series] = None,
+    max_depth: int = 6,
+    top_k: int = 20,
+    relative_threshold: float = DEFAULT_RELATIVE_THRESHOLD,
+    max_expansions: int = MAX_EXPANSIONS
+) -> pd.DataFrame:
+    """
+    Top-K supplier -> intermediate -> final cost-push chains of a price shock.
+
+    In the Leontief price model with exogenous sectors X (shocked) and endogenous sectors E,
+    dP_E = (I - A_EE')^-1 A_XE' dP_X. Expanding the inverse as a power series splits the
+    (weighted) impact w' dP_E into paths x -> j1 -> ... -> jn with value
+
+        dP_X[x] * A[x, j1] * A[j1, j2] * ... * A[jn-1, jn] * w[jn].
+
+    The paths are enumerated best-first with a priority queue. The key of a partial path ending in j
+    is its exact subtree total value * ((I - A_EE)^-1 w)[j], the sum of all its extensions. A subtree
+    is dropped once that total falls below the threshold or below the K-th best path found so far,
+    so only a small part of the tree is visited, even on the full FIGARO system.
+
+    Parameters:
+        A (pd.DataFrame): Technical coefficients with identical row and column labels.
+        shocks (pd.Series): Nonnegative price shock per exogenous sector (labels of A).
+        endogenous (Iterable | None): Endogenous sectors (default: all sectors that are not shocked).
+        weights (pd.Series | None): Weight of the final sector of a path, e.g. CPI weights
+                                    (default: 1, i.e. the unweighted sum of price changes).
+        max_depth (int): Maximum number of links in a path.
+        top_k (int): Number of paths to return.
+        relative_threshold (float): Pruning threshold as a share of the total impact.
+        max_expansions (int): Maximum number of partial paths expanded.
+
+    Returns:
+        pd.DataFrame: One row per path, sorted by value: 'Rank', 'Source', 'Target', 'Path'
+                      (labels joined by ' -> '), 'Depth', 'Value' and 'Share' of the total impact.
+                      The exact total and the share covered by the listed paths are stored in
+                      df.attrs['total'] and df.attrs['coverage'].
+    """
+    if not A.index.equals(A.columns):
+        raise ValueError("A must have identical row and column labels.")
+
+    if (shocks < 0).any():
+        raise ValueError("Structural path analysis expects nonnegative price shocks.")
+    shocks = shocks[shocks != 0]
+    sources = A.index.get_indexer(shocks.index)
+    if (sources < 0).any():
+        raise ValueError(f"Shocked sectors not in A: {list(shocks.index[sources < 0])}")
+
+    if endogenous is None:
+        endo = np.setdiff1d(np.arange(len(A)), sources)
+    else:
+        endo = A.index.get_indexer(pd.Index(endogenous))
+        if (endo < 0).any():
+            raise ValueError("Endogenous sectors must be labels of A.")
+    labels = A.index[endo]
+
+    w = np.ones(len(endo)) if weights is None else weights.reindex(labels).fillna(0.0).to_numpy(dtype=np.float64)
+    values = A.to_numpy(dtype=np.float64)
+    A_EE = values[np.ix_(endo, endo)]
+    A_XE = values[np.ix_(sources, endo)]
+    s = shocks.to_numpy(dtype=np.float64)
+
+    # Exact total of all continuations from every endogenous sector
+    tail = lu_solve(lu_factor(np.eye(len(endo)) - A_EE), w)
+    total = float(s @ (A_XE @ tail))
+    threshold = abs(total) * relative_threshold
+
+    successors = sparse.csr_matrix(A_EE)
+    results = []   # min-heap of (value, path) holding the K best complete paths
+    queue = []     # max-heap (negated bound) of partial paths
+    counter = 0
+
+    def kth_best() -> float:
+        return results[0][0] if len(results) == top_k else threshold
+
+    for source_position, (shock, row) in enumerate(zip(s, A_XE)):
+        for j in np.flatnonzero(row):
+            value = shock * row[j]
+            bound = value * tail[j]
+            if bound > threshold:
+                heapq.heappush(queue, (-bound, counter, value, (-1 - source_position, j)))
+                counter += 1
+
+    expansions = 0
+    while queue and expansions < max_expansions:
+        negative_bound, _, value, path = heapq.heappop(queue)
+        if -negative_bound <= kth_best():
+            break
+        expansions += 1
+
+        node = path[-1]
+        path_value = value * w[node]
+        if path_value > kth_best():
+            heapq.heappush(results, (path_value, path))
+            if len(results) > top_k:
+                heapq.heappop(results)
+
+        if len(path) - 1 >= max_depth:
+            continue
+        start, stop = successors.indptr[node], successors.indptr[node + 1]
+        children, coefficients = successors.indices[start:stop], successors.data[start:stop]
+        child_values = value * coefficients
+        child_bounds = child_values * tail[children]
+        limit = kth_best()
+        for child, child_value, child_bound in zip(children, child_values, child_bounds):
+            if child_bound > limit:
+                heapq.heappush(queue, (-child_bound, counter, child_value, path + (child,)))
+                counter += 1
+
+    if expansions >= max_expansions:
+        print(f"Structural path search stopped after {max_expansions} expansions; increase the threshold or lower max_depth.")
+
+    rows = []
+    for rank, (path_value, path) in enumerate(sorted(results, key=lambda item: -item[0]), start=1):
+        source = shocks.index[-1 - path[0]]
+        chain = [_label(source)] + [_label(labels[node]) for node in path[1:]]
+        rows.append({
+            "Rank": rank,
+            "Source": _label(source),
+            "Target": chain[-1],
+            "Path": " -> ".join(chain),
+            "Depth": len(path) - 1,
+            "Value": path_value,
+            "Share": path_value / total if total else np.nan,
+        })
+
+    result = pd.DataFrame(rows, columns=["Rank", "Source", "Target", "Path", "Depth", "Value", "Share"])
+    result.attrs["total"] = total
+    result.attrs["coverage"] = float(result["Share"].sum()) if len(result) else 0.0
+    return result
@@ -1,36 +1,63 @@
 import numpy as np
 import pandas as pd
+from typing import Optional
 
 
 
 
-def calculate_technical_coefficients(Z: pd.DataFrame, X: pd.Series) -> pd.DataFrame:
+def calculate_technical_coefficients(
+    Z: pd.DataFrame,
+    X: pd.Series,
+    inplace: bool = False,
+    dtype: Optional[np.dtype] = None
+) -> pd.DataFrame:
     """
     Calculate the technical coefficients matrix A = Z / X,
     where each column j is divided by X_j.
-    
-    If X_j = 0, the entire column j in A is set to 0.
+
+    If X_j = 0 (or np.isclose to 0), the entire column j in A is set to 0.
+    Remaining NaNs (from NaN flows) are set to 0 as well.
+
+    The division is one broadcast over the whole matrix. With inplace=True the result
+    is written into Z's buffer (Z is returned and no longer holds the flows), which
+    avoids a second matrix-sized allocation.
 
     Parameters:
         Z (pd.DataFrame): Interindustry flow matrix with MultiIndex columns and rows.
         X (pd.Series): Gross output vector with the same index as Z.columns.
+        inplace (bool): Overwrite Z with A instead of allocating a new matrix (default: False).
+        dtype (np.dtype | None): Output dtype, e.g. np.float32 to halve memory (default: float64,
+                                 or Z's dtype when inplace). Not combinable with inplace.
 
     Returns:
         pd.DataFrame: Technical coefficients matrix A.
     """
     if not Z.columns.equals(X.index):
         raise ValueError("Mismatch: Z.columns and X.index must be identical.")
+    if inplace and dtype is not None:
+        raise ValueError("inplace=True writes into Z's buffer and cannot change the dtype.")
 
-    A = Z.copy()
+    x = X.to_numpy(dtype=np.float64)
+    zero_output = np.isclose(x, 0.0)
+    safe_x = np.where(zero_output, 1.0, x)
 
-    for col in Z.columns:
-        x_val = X[col]
-        if x_val == 0 or np.isclose(x_val, 0.0):
-            A[col] = 0.0
-        else:
-            A[col] = Z[col] / x_val
+    if inplace:
+        if Z.dtypes.nunique() != 1 or not np.issubdtype(Z.dtypes.iloc[0], np.floating):
+            raise ValueError("inplace=True requires Z to have a single floating point dtype.")
+        # A view on Z's data if Z is one consolidated block, otherwise a copy written back below
+        values = Z.to_numpy(copy=False)
+    else:
+        values = Z.to_numpy(dtype=dtype or np.float64, copy=True)
+
+    np.divide(values, safe_x, out=values, casting="same_kind")
+    values[:, zero_output] = 0.0
 
     # Final cleanup to ensure no NaNs
-    A = A.fillna(0.0)
+    np.copyto(values, 0.0, where=np.isnan(values))
+
+    if inplace:
+        if not np.shares_memory(values, Z.values):
+            Z.iloc[:, :] = values
+        return Z
 
-    return A
+    return pd.DataFrame(values, index=Z.index, columns=Z.columns, copy=False)
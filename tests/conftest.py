@@ -0,0 +1,15 @@
+# tests/conftest.py
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# Same import layout as the pipelines: config and shared from the root, part modules by bare name
+for path in (
+    ROOT_DIR,
+    ROOT_DIR / "part_gas_price_shock" / "src",
+    ROOT_DIR / "part_systemically_significant_prices" / "src",
+):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,64 @@
+# tests/test_binary_store.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.binary_store import (
+    binary_frame_exists, close_binary_frame_writer, labels_path_for, load_binary_frame,
+    open_binary_frame_writer, save_binary_frame, write_axis_labels,
+)
+
+
+def _frame(countries: list[str], scale: float = 1.0) -> pd.DataFrame:
+    labels = pd.MultiIndex.from_product([countries, ["A01", "C19"]], names=["Country", "Sector"])
+    values = np.arange(len(labels) ** 2, dtype=np.float64).reshape(len(labels), -1) * scale
+    return pd.DataFrame(values, index=labels, columns=labels)
+
+
+def test_round_trip(tmp_path):
+    df = _frame(["AT", "DE"])
+    path = save_binary_frame(df, tmp_path / "Z_2010.npy")
+    pd.testing.assert_frame_equal(load_binary_frame(path), df)
+
+
+def test_failed_values_write_keeps_the_old_pair(tmp_path, monkeypatch):
+    path = tmp_path / "Z_2010.npy"
+    old = _frame(["AT", "DE"])
+    save_binary_frame(old, path)
+
+    def failing_save(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError):
+        save_binary_frame(_frame(["FR", "IT"], scale=2.0), path)
+    monkeypatch.undo()
+
+    assert binary_frame_exists(path)
+    pd.testing.assert_frame_equal(load_binary_frame(path), old)
+
+
+def test_streamed_writer_writes_labels_on_close(tmp_path):
+    path = tmp_path / "Z_2010.npy"
+    old = _frame(["AT"])
+    save_binary_frame(old, path)
+    df = _frame(["FR", "IT"])
+
+    # Until the writer is closed, the previous matrix stays readable with its own labels
+    values = open_binary_frame_writer(path, df.index, df.columns)
+    pd.testing.assert_frame_equal(load_binary_frame(path), old)
+    values[:] = df.to_numpy()
+    close_binary_frame_writer(path, values, df.index, df.columns)
+
+    pd.testing.assert_frame_equal(load_binary_frame(path), df)
+
+
+def test_mismatched_labels_are_rejected(tmp_path):
+    path = save_binary_frame(_frame(["AT", "DE"]), tmp_path / "Z_2010.npy")
+    other = _frame(["AT"])
+    write_axis_labels(path, other.index, other.columns)
+
+    assert labels_path_for(path).exists()
+    with pytest.raises(ValueError, match="labels describe"):
+        load_binary_frame(path)
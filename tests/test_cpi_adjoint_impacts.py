@@ -0,0 +1,77 @@
+# tests/test_cpi_adjoint_impacts.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyze_unweighted_shocks import compute_unweighted_shocks
+from cpi_adjoint_impacts import compute_cpi_weighted_impacts
+from shared.cpi_weights import new_apply_all_available_cpi_weights
+
+YEAR = 2015
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    """
+    Small A, a volatility table with zero, NaN and out-of-A entries, and two CPI weighting schemes.
+    """
+    labels = pd.MultiIndex.from_product([["AT", "DE", "IT"], ["A01", "C19", "D35"]], names=["Country", "Sector"])
+    rng = np.random.default_rng(1)
+    A = pd.DataFrame(rng.random((len(labels), len(labels))) * 0.1, index=labels, columns=labels)
+
+    volatility = pd.Series(rng.random(len(labels)) * 0.2, index=labels)
+    volatility[("AT", "C19")] = 0.0
+    volatility[("DE", "A01")] = np.nan
+    volatility[("XX", "A01")] = 0.3
+    price_vol = volatility.to_frame("price_volatility")
+    price_vol.index.names = ["Country", "Sector"]
+    price_vol_path = tmp_path / "price_volatility.csv"
+    price_vol.to_csv(price_vol_path)
+
+    weights_root = tmp_path / "cpi_weights"
+    schemes = {
+        "eu28": {("EU28", "cpi_weight"): rng.random(len(labels)), ("ROW", "cpi_weight"): rng.random(len(labels))},
+        "north_south": {("North", "cpi_weight"): rng.random(len(labels)), ("South", "cpi_weight"): rng.random(len(labels))},
+    }
+    for tag, columns in schemes.items():
+        (weights_root / tag).mkdir(parents=True)
+        pd.DataFrame(columns, index=labels).to_csv(weights_root / tag / f"cpi_weights_{tag}_{YEAR}.csv")
+
+    return A, price_vol, price_vol_path, weights_root
+
+
+def test_fast_path_matches_two_step_path(inputs, tmp_path):
+    A, price_vol, price_vol_path, weights_root = inputs
+
+    two_step_dir = tmp_path / "two_step"
+    compute_unweighted_shocks(A, YEAR, price_vol=price_vol, output_dir=two_step_dir)
+    new_apply_all_available_cpi_weights(
+        YEAR, two_step_dir / f"unweighted_shock_impacts_{YEAR}.csv", price_vol_path, weights_root, two_step_dir
+    )
+    fast_dir = tmp_path / "fast"
+    compute_cpi_weighted_impacts(A, YEAR, price_vol, weights_root, output_dir=fast_dir)
+
+    for tag in ("eu28", "north_south"):
+        expected = pd.read_csv(two_step_dir / f"weighted_impacts_{tag}_{YEAR}.csv")
+        result = pd.read_csv(fast_dir / f"weighted_impacts_{tag}_{YEAR}.csv")
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-10)
+
+        # Zero, NaN and out-of-A volatilities are not shocked; ROW is left out
+        shocked = set(zip(result["Country"], result["Sector"]))
+        assert len(shocked) == 7
+        assert not shocked & {("AT", "C19"), ("DE", "A01"), ("XX", "A01")}
+        assert "ROW" not in set(result["Region"])
+        assert result.notna().all().all()
+
+
+def test_scheme_without_weights_for_every_sector_is_skipped(inputs, tmp_path):
+    A, price_vol, _, weights_root = inputs
+    path = weights_root / "eu28" / f"cpi_weights_eu28_{YEAR}.csv"
+    weights = pd.read_csv(path, header=[0, 1], index_col=[0, 1])
+    weights.drop(index=("IT", "D35")).to_csv(path)
+
+    compute_cpi_weighted_impacts(A, YEAR, price_vol, weights_root, output_dir=tmp_path / "fast")
+
+    assert not (tmp_path / "fast" / f"weighted_impacts_eu28_{YEAR}.csv").exists()
+    assert (tmp_path / "fast" / f"weighted_impacts_north_south_{YEAR}.csv").exists()
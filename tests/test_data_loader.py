@@ -0,0 +1,99 @@
+# tests/test_data_loader.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from shared.data_loader import download_figaro_file, download_file
+
+PAYLOAD = b"".join(f"row {i},{i * 0.5}\n".encode() for i in range(2000))
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serves PAYLOAD for every path and honours 'Range: bytes=<start>-' like a file server.
+    """
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if start >= len(PAYLOAD):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(PAYLOAD)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        body = PAYLOAD[start:]
+        self.send_response(206 if range_header else 200)
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+def _url(server, path="/figaro.csv"):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_fresh_download_via_base_url(server, tmp_path):
+    path = download_figaro_file(2015, base_url=_url(server, "/matrix_{year}.csv"), raw_dir=tmp_path)
+
+    assert path == tmp_path / "figaro_matrix_2015.csv"
+    assert path.read_bytes() == PAYLOAD
+    assert not (tmp_path / "figaro_matrix_2015.csv.part").exists()
+    assert server.requests == [("/matrix_2015.csv", None)]
+
+
+def test_resumes_partial_download(server, tmp_path):
+    target = tmp_path / "figaro.csv"
+    (tmp_path / "figaro.csv.part").write_bytes(PAYLOAD[:1000])
+
+    download_file(_url(server), target)
+
+    assert target.read_bytes() == PAYLOAD
+    assert not (tmp_path / "figaro.csv.part").exists()
+    assert server.requests == [("/figaro.csv", "bytes=1000-")]
+
+
+def test_416_with_complete_part_file_is_renamed(server, tmp_path):
+    target = tmp_path / "figaro.csv"
+    (tmp_path / "figaro.csv.part").write_bytes(PAYLOAD)
+
+    download_file(_url(server), target)
+
+    assert target.read_bytes() == PAYLOAD
+    assert not (tmp_path / "figaro.csv.part").exists()
+    assert server.requests == [("/figaro.csv", f"bytes={len(PAYLOAD)}-")]
+
+
+def test_416_with_oversized_part_file_restarts(server, tmp_path):
+    target = tmp_path / "figaro.csv"
+    (tmp_path / "figaro.csv.part").write_bytes(PAYLOAD + b"stale tail\n")
+
+    download_file(_url(server), target)
+
+    assert target.read_bytes() == PAYLOAD
+    assert server.requests == [("/figaro.csv", f"bytes={len(PAYLOAD) + 11}-"), ("/figaro.csv", None)]
@@ -0,0 +1,60 @@
+# tests/test_exiobase3_loader.py
+
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pymrio = pytest.importorskip("pymrio")
+
+from exiobase3_loader import preprocess_exiobase3, read_aggregated_exiobase3
+
+
+@pytest.fixture
+def exiobase_zip(tmp_path):
+    """
+    Small EXIOBASE3-style archive: real ExioNames (so the NACE concordance applies, including
+    sectors that merge), an ISO3 region code and a rest-of-world region.
+    """
+    sectors = [
+        "Cultivation of paddy rice",
+        "Cultivation of wheat",
+        "Extraction of natural gas and services related to natural gas extraction, excluding surveying",
+        "Extraction, liquefaction, and regasification of other petroleum and gaseous materials",
+        "Production of electricity by gas",
+    ]
+    index = pd.MultiIndex.from_product([["AT", "DEU", "WWA"], sectors], names=["region", "sector"])
+    categories = ["Final consumption expenditure by households", "Changes in inventories"]
+    y_columns = pd.MultiIndex.from_product([["AT", "DEU", "WWA"], categories], names=["region", "category"])
+
+    rng = np.random.default_rng(0)
+    io = pymrio.IOSystem(
+        Z=pd.DataFrame(rng.random((len(index), len(index))), index=index, columns=index),
+        Y=pd.DataFrame(rng.random((len(index), len(y_columns))), index=index, columns=y_columns),
+        name="synthetic",
+    )
+    system_dir = tmp_path / "IOT_2021_ixi"
+    io.save_all(system_dir)
+
+    zip_path = tmp_path / "IOT_2021_ixi.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for path in system_dir.iterdir():
+            zf.write(path, f"IOT_2021_ixi/{path.name}")
+    return zip_path
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_streamed_aggregation_matches_pymrio(exiobase_zip):
+    expected = preprocess_exiobase3(pymrio.parse_exiobase3(path=str(exiobase_zip)))
+    Z, Y = read_aggregated_exiobase3(exiobase_zip, chunksize=4)
+
+    pd.testing.assert_frame_equal(Z, expected.Z, check_names=False, check_exact=False, rtol=1e-12)
+    pd.testing.assert_frame_equal(Y, expected.Y, check_names=False, check_exact=False, rtol=1e-12)
+
+
+def test_aggregated_dtype_follows_chunk_dtype(exiobase_zip):
+    Z, Y = read_aggregated_exiobase3(exiobase_zip, dtype=np.float32)
+
+    assert (Z.dtypes == np.float32).all()
+    assert (Y.dtypes == np.float32).all()
@@ -0,0 +1,63 @@
+# tests/test_monte_carlo.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from monte_carlo import bootstrap_volatility_draws, impact_coefficients, lognormal_volatility_draws, run_monte_carlo
+
+
+@pytest.fixture
+def model():
+    labels = pd.MultiIndex.from_product([["AT", "DE"], ["A01", "C19", "D35"]], names=["Country", "Sector"])
+    rng = np.random.default_rng(3)
+    A = pd.DataFrame(rng.random((len(labels), len(labels))) * 0.1, index=labels, columns=labels)
+    weights = pd.DataFrame({("EU28", "cpi_weight"): rng.dirichlet(np.ones(len(labels)))}, index=labels)
+
+    # Two years of price changes: a bootstrap draw that picks one year twice has zero volatility,
+    # and a large offset makes E[x^2] - E[x]^2 cancel badly
+    changes = pd.DataFrame(1e4 + rng.random((len(labels), 2)), index=labels, columns=[2011, 2012])
+    price_vol = changes.std(axis=1, ddof=0).to_frame("price_volatility")
+    return A, price_vol, weights, changes
+
+
+def test_bands_match_the_draws(model):
+    A, price_vol, weights, changes = model
+    n_draws, chunk_size, seed = 400, 64, 5
+    result = run_monte_carlo(
+        A, price_vol, weights, n_draws=n_draws, chunk_size=chunk_size, price_changes=changes,
+        quantiles=(0.05, 0.5, 0.95), seed=seed,
+    )
+
+    draws = np.vstack(list(bootstrap_volatility_draws(
+        changes.to_numpy(), n_draws, chunk_size, np.random.default_rng(seed)
+    )))
+    impacts = draws[:, :, None] * impact_coefficients(A.to_numpy(), weights.to_numpy())[None]
+    zero_share = (draws == 0).mean(axis=0)
+    assert (zero_share > 0.3).all()
+
+    for m, metric in enumerate(["Unweighted", "EU28"]):
+        rows = result[result["Metric"] == metric]
+        np.testing.assert_allclose(rows["Mean"], impacts[:, :, m].mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(rows["Std"], impacts[:, :, m].std(axis=0), rtol=1e-9)
+
+        # About half of the draws are zero: the lower band is exactly zero, not exp(-4) x point
+        assert (rows["Q5"] == 0).all()
+        assert (rows["Q95"] > 0).all()
+        np.testing.assert_allclose(rows["Q95"], np.quantile(impacts[:, :, m], 0.95, axis=0), rtol=0.02)
+
+
+def test_std_of_tightly_clustered_draws(model):
+    A, price_vol, weights, _ = model
+    n_draws, chunk_size, seed, sigma = 300, 64, 7, 1e-6
+    result = run_monte_carlo(
+        A, price_vol, weights, n_draws=n_draws, chunk_size=chunk_size, method="lognormal", sigma=sigma, seed=seed,
+    )
+
+    point = price_vol["price_volatility"].to_numpy()
+    draws = np.vstack(list(lognormal_volatility_draws(point, n_draws, chunk_size, np.random.default_rng(seed), sigma)))
+    impacts = draws[:, :, None] * impact_coefficients(A.to_numpy(), weights.to_numpy())[None]
+
+    for m, metric in enumerate(["Unweighted", "EU28"]):
+        std = result.loc[result["Metric"] == metric, "Std"]
+        np.testing.assert_allclose(std, impacts[:, :, m].std(axis=0), rtol=1e-6)
@@ -0,0 +1,51 @@
+# tests/test_panel.py
+
+import numpy as np
+import pytest
+from scipy import linalg
+
+from shared.panel import (
+    panel_cpi_weighted_indirect_impacts, panel_leontief_inverse_diagonal, panel_leontief_solve,
+)
+
+N_YEARS, N, N_REGIONS = 3, 7, 2
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(2)
+    A = rng.random((N_YEARS, N, N)) * 0.12
+    shocks = rng.random((N_YEARS, N)) * 0.2
+    weights = rng.dirichlet(np.ones(N), size=(N_YEARS, N_REGIONS)).transpose(0, 2, 1)
+    return A, shocks, weights
+
+
+def test_leontief_solve_matches_per_year_solves(panel):
+    A, shocks, weights = panel
+    for transpose in (False, True):
+        solved = panel_leontief_solve(A, weights, transpose=transpose, batch_years=2)
+        for year in range(N_YEARS):
+            system = np.eye(N) - (A[year].T if transpose else A[year])
+            np.testing.assert_allclose(solved[year], linalg.solve(system, weights[year]), rtol=1e-12)
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 512])
+def test_inverse_diagonal_matches_per_year_inverse(panel, block_size):
+    A, _, _ = panel
+    diagonal = panel_leontief_inverse_diagonal(A, block_size=block_size)
+    for year in range(N_YEARS):
+        np.testing.assert_allclose(diagonal[year], np.diag(linalg.inv(np.eye(N) - A[year])), rtol=1e-12)
+
+
+@pytest.mark.parametrize("block_size", [3, 512])
+def test_cpi_weighted_indirect_impacts_match_per_sector_solves(panel, block_size):
+    A, shocks, weights = panel
+    indirect = panel_cpi_weighted_indirect_impacts(A, shocks, weights, block_size=block_size)
+
+    for year in range(N_YEARS):
+        for k in range(N):
+            # Sector k exogenous: (I - A_EE') dP = a_k * s_k, weighted by the other sectors' CPI weights
+            others = np.delete(np.arange(N), k)
+            A_EE = A[year][np.ix_(others, others)]
+            dP = linalg.solve(np.eye(N - 1) - A_EE.T, A[year][k, others] * shocks[year, k])
+            np.testing.assert_allclose(indirect[year, k], weights[year][others].T @ dP, rtol=1e-10)
@@ -0,0 +1,157 @@
+# tests/test_query_service.py
+
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared.query_service as query_service
+
+YEAR = 2019
+
+
+@pytest.fixture
+def systemic_files(tmp_path, monkeypatch):
+    """
+    Small systemic A matrix and one CPI weighting scheme, with the service pointed at them.
+    """
+    labels = pd.MultiIndex.from_product([["AT", "DE", "IT"], ["A01", "C19", "D35"]], names=["Country", "Sector"])
+    rng = np.random.default_rng(0)
+    A = pd.DataFrame(rng.random((len(labels), len(labels))) * 0.1, index=labels, columns=labels)
+
+    a_dir = tmp_path / "A_matrix"
+    a_dir.mkdir()
+    A.to_csv(a_dir / f"A_{YEAR}.csv")
+
+    weights = pd.DataFrame(
+        {("EU28", "cpi_weight"): np.full(len(labels), 1.0 / len(labels)), ("ROW", "cpi_weight"): 0.0},
+        index=labels,
+    )
+    weights_dir = tmp_path / "cpi_weights" / "eu28"
+    weights_dir.mkdir(parents=True)
+    weights.to_csv(weights_dir / f"cpi_weights_eu28_{YEAR}.csv")
+
+    monkeypatch.setattr(query_service, "SYSTEMIC_A_MATRIX_DIR", a_dir)
+    monkeypatch.setattr(query_service, "SYSTEMIC_CPI_WEIGHTS_DIR", tmp_path / "cpi_weights")
+    return A
+
+
+async def _request(port: int, method: str, path: str, body: bytes = b"") -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+def _run_with_service(scenario, window_ms: float = 100.0):
+    """
+    Start the service on a free port, run scenario(port) against it and return its result.
+    """
+    async def main():
+        service = query_service._ShockQueryService(window_ms)
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        async with server:
+            return await scenario(server.sockets[0].getsockname()[1])
+
+    return asyncio.run(main())
+
+
+def _shock_body(shocks: dict) -> bytes:
+    return json.dumps({"model": "systemic", "year": YEAR, "shocks": shocks, "top": 100}).encode()
+
+
+def test_concurrent_queries_are_coalesced(systemic_files):
+    A = systemic_files
+    queries = [{"IT_C19": 0.1}, {"DE_D35": 0.2}, {"IT_C19": 0.05, "AT_A01": -0.3}]
+
+    async def scenario(port):
+        # Load the model first so that all queries arrive within one coalescing window
+        await _request(port, "GET", f"/labels?model=systemic&year={YEAR}")
+        return await asyncio.gather(*(_request(port, "POST", "/shock", _shock_body(q)) for q in queries))
+
+    responses = _run_with_service(scenario)
+
+    values = A.to_numpy()
+    label_strings = ["_".join(key) for key in A.index]
+    for query, (status, answer) in zip(queries, responses):
+        assert status == 200
+        assert answer["batch_size"] == len(queries)
+
+        # Reference: shocked sectors exogenous, (I - A_EE') dP_E = A_XE' dP_X
+        exogenous = np.array([label_strings.index(label) for label in query])
+        endogenous = np.setdiff1d(np.arange(len(values)), exogenous)
+        dP_X = np.array(list(query.values()))
+        dP_E = np.linalg.solve(
+            np.eye(len(endogenous)) - values[np.ix_(endogenous, endogenous)].T,
+            values[np.ix_(exogenous, endogenous)].T @ dP_X,
+        )
+        expected = dict(zip(np.array(label_strings)[endogenous], dP_E))
+        returned = {item["label"]: item["price_change"] for item in answer["top"] if item["label"] in expected}
+        assert returned == pytest.approx(expected, rel=1e-10, abs=1e-14)
+
+        weight = 1.0 / len(values)
+        eu28 = answer["impacts"]["eu28"]["EU28"]
+        assert eu28["direct"] == pytest.approx(weight * dP_X.sum())
+        assert eu28["indirect"] == pytest.approx(weight * dP_E.sum())
+
+
+def test_bad_requests_are_rejected(systemic_files):
+    async def scenario(port):
+        return [
+            await _request(port, "POST", "/shock", b"[1, 2]"),
+            await _request(port, "POST", "/shock", b"not json"),
+            await _request(port, "POST", "/shock", _shock_body({"XX_C19": 0.1})),
+            await _request(port, "POST", "/shock", json.dumps({"year": YEAR, "shocks": {}}).encode()),
+            await _request(port, "GET", "/nothing"),
+        ]
+
+    statuses = [status for status, _ in _run_with_service(scenario)]
+    assert statuses == [400, 400, 400, 400, 404]
+
+
+def test_failed_batch_solve_answers_every_query_and_service_recovers(systemic_files, monkeypatch):
+    solve = query_service.solve_shock_batch
+    calls = []
+
+    def failing_once(state, shocks):
+        calls.append(len(shocks))
+        if len(calls) == 1:
+            raise RuntimeError("solver failed")
+        return solve(state, shocks)
+
+    monkeypatch.setattr(query_service, "solve_shock_batch", failing_once)
+
+    async def scenario(port):
+        await _request(port, "GET", f"/labels?model=systemic&year={YEAR}")
+        failed = await asyncio.gather(
+            _request(port, "POST", "/shock", _shock_body({"IT_C19": 0.1})),
+            _request(port, "POST", "/shock", _shock_body({"DE_D35": 0.1})),
+        )
+        return failed, await _request(port, "POST", "/shock", _shock_body({"IT_C19": 0.1}))
+
+    failed, (status, answer) = _run_with_service(scenario)
+    assert [status for status, _ in failed] == [500, 500]
+    assert all(payload["error"] == "RuntimeError: solver failed" for _, payload in failed)
+    assert calls == [2, 1]
+    assert status == 200 and answer["batch_size"] == 1
+
+
+def test_cancelled_query_does_not_break_its_batch(systemic_files):
+    async def scenario():
+        service = query_service._ShockQueryService()
+        state = await service.model("systemic", YEAR)
+        positions, sizes = query_service.parse_shock_query(state, {"shocks": {"IT_C19": 0.1}})
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in range(3)]
+        futures[1].cancel()
+        await service._solve(state, [(positions, sizes, future) for future in futures])
+        return futures
+
+    futures = asyncio.run(scenario())
+    assert futures[1].cancelled()
+    assert [future.result()[1] for future in (futures[0], futures[2])] == [3, 3]
@@ -0,0 +1,91 @@
+# tests/test_results_store.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import shared.results_store as results_store
+from shared.results_store import build_results_store, list_partitions, query_results
+
+YEARS = [2018, 2019]
+SCHEMES = {"eu28": ["EU28"], "north_south": ["North", "South"]}
+
+
+def _weighted_table(regions: list[str], offset: float) -> pd.DataFrame:
+    labels = pd.MultiIndex.from_product([["AT", "DE"], ["A01", "C19", "D35"]])
+    direct = np.arange(len(labels) * len(regions), dtype=np.float64) + offset
+    return pd.DataFrame({
+        "Country": np.repeat(labels.get_level_values(0), len(regions)),
+        "Sector": np.repeat(labels.get_level_values(1), len(regions)),
+        "Region": np.tile(regions, len(labels)),
+        "Direct Impact": direct,
+        "Indirect Impact": direct / 10,
+        "Total Impact": direct * 1.1,
+    })
+
+
+@pytest.fixture
+def result_files(tmp_path, monkeypatch):
+    weighted_dir = tmp_path / "weighted_impacts"
+    weighted_dir.mkdir()
+    tables = {}
+    for year in YEARS:
+        for scheme, regions in SCHEMES.items():
+            tables[year, scheme] = _weighted_table(regions, offset=year)
+            tables[year, scheme].to_csv(weighted_dir / f"weighted_impacts_{scheme}_{year}.csv", index=False)
+
+    monkeypatch.setattr(results_store, "SYSTEMIC_WEIGHTED_IMPACTS_DIR", weighted_dir)
+    monkeypatch.setattr(results_store, "SYSTEMIC_UNWEIGHTED_IMPACTS_DIR", tmp_path / "unweighted_impacts")
+    return weighted_dir, tables, tmp_path / "store"
+
+
+def test_round_trip_with_filters(result_files):
+    _, tables, store = result_files
+    written = build_results_store(gas_year=None, store_dir=store)
+
+    assert len(written) == len(YEARS) * len(SCHEMES)
+    assert sorted(map(tuple, list_partitions(store).to_numpy())) == sorted(
+        ("systemic_weighted", year, scheme) for year in YEARS for scheme in SCHEMES
+    )
+
+    everything = query_results("systemic_weighted", store_dir=store)
+    assert len(everything) == sum(len(table) for table in tables.values())
+
+    # NumPy scalars (as taken from a frame) work like Python ones
+    result = query_results(
+        "systemic_weighted", years=np.int64(2019), schemes=["north_south"],
+        filters={"Region": np.str_("South"), "Sector": ["C19", "D35"]}, columns=["Country", "Sector", "Total Impact"],
+        store_dir=store,
+    )
+    table = tables[2019, "north_south"]
+    expected = table[(table["Region"] == "South") & table["Sector"].isin(["C19", "D35"])]
+
+    assert list(result.columns) == ["year", "scheme", "Country", "Sector", "Total Impact"]
+    assert (result["year"] == 2019).all() and (result["scheme"] == "north_south").all()
+    assert isinstance(result["Sector"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(
+        result[["Country", "Sector", "Total Impact"]].astype({"Country": str, "Sector": str}).reset_index(drop=True),
+        expected[["Country", "Sector", "Total Impact"]].reset_index(drop=True),
+    )
+
+
+def test_rebuild_replaces_existing_partitions(result_files):
+    weighted_dir, tables, store = result_files
+    build_results_store(gas_year=None, store_dir=store)
+
+    # Rerun of one year and scheme with fewer rows
+    rerun = _weighted_table(["EU28"], offset=-1.0).iloc[:4]
+    rerun.to_csv(weighted_dir / "weighted_impacts_eu28_2018.csv", index=False)
+    build_results_store(years=[2018], gas_year=None, store_dir=store)
+
+    replaced = query_results("systemic_weighted", years=[2018], schemes="eu28", store_dir=store)
+    np.testing.assert_array_equal(replaced["Direct Impact"], rerun["Direct Impact"])
+
+    untouched = query_results("systemic_weighted", years=2019, schemes="eu28", store_dir=store)
+    np.testing.assert_array_equal(untouched["Direct Impact"], tables[2019, "eu28"]["Direct Impact"])
+
+    # No staging or renamed-aside copies are left next to the partitions
+    assert not [path for path in store.rglob(".*")]
+    assert len(list_partitions(store)) == len(YEARS) * len(SCHEMES)
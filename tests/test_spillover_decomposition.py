@@ -0,0 +1,97 @@
+# tests/test_spillover_decomposition.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyze_unweighted_shocks import compute_unweighted_shocks
+from shared.spillover_decomposition import DECOMPOSITION_COLUMNS, country_blocks, decompose_price_change
+
+YEAR = 2015
+COUNTRIES = ["AT", "DE", "IT"]
+SECTORS = ["A01", "C19", "D35"]
+
+
+def _system(trade: bool) -> tuple[pd.DataFrame, pd.DataFrame]:
+    labels = pd.MultiIndex.from_product([COUNTRIES, SECTORS], names=["Country", "Sector"])
+    rng = np.random.default_rng(6)
+    values = rng.random((len(labels), len(labels))) * 0.1
+    if not trade:
+        countries = labels.get_level_values("Country").to_numpy()
+        values[countries[:, None] != countries[None, :]] = 0.0
+    A = pd.DataFrame(values, index=labels, columns=labels)
+
+    volatility = pd.Series(rng.random(len(labels)) * 0.2 + 0.01, index=labels)
+    volatility[("DE", "D35")] = 0.0
+    return A, volatility.to_frame("price_volatility")
+
+
+def _run(A: pd.DataFrame, price_vol: pd.DataFrame, output_dir) -> tuple[pd.DataFrame, pd.DataFrame]:
+    compute_unweighted_shocks(A, YEAR, price_vol=price_vol, output_dir=output_dir, decompose=True)
+    impacts = pd.read_csv(output_dir / f"unweighted_shock_impacts_{YEAR}.csv", header=[0, 1], index_col=[0, 1])
+    split = pd.read_csv(output_dir / f"unweighted_shock_decomposition_{YEAR}.csv")
+    return impacts, split
+
+
+def test_components_add_up_to_the_unweighted_impacts(tmp_path):
+    A, price_vol = _system(trade=True)
+    impacts, split = _run(A, price_vol, tmp_path)
+
+    assert len(split) == len(impacts) * (len(A) - 1)
+    assert ("DE", "D35") not in set(zip(split["Exogenous Country"], split["Exogenous Sector"]))
+    expected = [
+        impacts.loc[(row["Exogenous Country"], row["Exogenous Sector"]), (row["Country"], row["Sector"])]
+        for _, row in split.iterrows()
+    ]
+    np.testing.assert_allclose(split["Price Change"], expected, rtol=1e-12)
+    np.testing.assert_allclose(split[DECOMPOSITION_COLUMNS].sum(axis=1), split["Price Change"], rtol=1e-10, atol=1e-15)
+    assert (split["Foreign Input"].abs() > 0).any() and (split["Feedback"].abs() > 0).any()
+
+    # Same split as decomposing each scenario's own system (I - A_EE') dP = A_XE' s
+    values = A.to_numpy()
+    for k, exogenous in enumerate(A.index):
+        if price_vol.loc[exogenous, "price_volatility"] == 0:
+            continue
+        others = np.delete(np.arange(len(A)), k)
+        M = values[np.ix_(others, others)].T
+        b = values[k, others] * price_vol.loc[exogenous, "price_volatility"]
+        reference = decompose_price_change(M, b, np.linalg.solve(np.eye(len(others)) - M, b), country_blocks(A.index[others]))
+
+        rows = split[(split["Exogenous Country"] == exogenous[0]) & (split["Exogenous Sector"] == exogenous[1])]
+        order = pd.MultiIndex.from_frame(rows[["Country", "Sector"]]).get_indexer(A.index[others])
+        for name in DECOMPOSITION_COLUMNS:
+            np.testing.assert_allclose(rows[name].to_numpy()[order], reference[name], rtol=1e-10, atol=1e-15)
+
+
+def test_no_trade_means_no_foreign_input_or_feedback(tmp_path):
+    A, price_vol = _system(trade=False)
+    _, split = _run(A, price_vol, tmp_path)
+
+    # F x is taken as M x - D x, so "zero" is up to rounding, far below the price changes
+    assert split["Price Change"].abs().max() > 1e-3
+    np.testing.assert_allclose(split["Feedback"], 0.0, atol=1e-15)
+    np.testing.assert_allclose(split["Foreign Input"], 0.0, atol=1e-15)
+    np.testing.assert_allclose(split["Domestic"], split["Price Change"], rtol=1e-12)
+
+    # Without trade, a shock stays in its own country
+    abroad = split["Exogenous Country"] != split["Country"]
+    assert (split.loc[abroad, "Price Change"] == 0).all()
+    assert (split.loc[~abroad, "Price Change"] > 0).all()
+
+
+def test_decompose_price_change_matches_its_definition():
+    A, _ = _system(trade=True)
+    M = A.to_numpy().T
+    b = np.random.default_rng(7).random((len(A), 2))
+    dP = np.linalg.solve(np.eye(len(A)) - M, b)
+    blocks = country_blocks(A.index)
+    components = decompose_price_change(M, b, dP, blocks)
+
+    D = np.zeros_like(M)
+    for block in blocks:
+        D[np.ix_(block, block)] = M[np.ix_(block, block)]
+    L_D = np.linalg.inv(np.eye(len(A)) - D)
+    F = M - D
+    assert components["Domestic"] == pytest.approx(L_D @ b, rel=1e-12)
+    assert components["Foreign Input"] == pytest.approx(L_D @ F @ L_D @ b, rel=1e-10)
+    assert components["Feedback"] == pytest.approx(L_D @ F @ (dP - L_D @ b), rel=1e-10)
@@ -0,0 +1,79 @@
+# tests/test_structural_paths.py
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.structural_paths import structural_path_analysis
+
+SHOCKS = {("AT", "C19"): 0.3, ("DE", "B"): 0.1}
+
+
+@pytest.fixture
+def system():
+    labels = pd.MultiIndex.from_product([["AT", "DE"], ["A01", "B", "C19", "D35"]], names=["Country", "Sector"])
+    rng = np.random.default_rng(4)
+    A = pd.DataFrame(rng.random((len(labels), len(labels))) ** 3 * 0.4, index=labels, columns=labels)
+    weights = pd.Series(rng.dirichlet(np.ones(len(labels))), index=labels)
+    return A, pd.Series(SHOCKS), weights
+
+
+def _brute_force(A: pd.DataFrame, shocks: pd.Series, weights: pd.Series, max_depth: int) -> dict[str, float]:
+    """
+    Value of every path of 1..max_depth links from a shocked sector through the other sectors.
+    """
+    values = A.to_numpy()
+    sources = A.index.get_indexer(shocks.index)
+    endo = np.setdiff1d(np.arange(len(A)), sources)
+    label = lambda position: "_".join(A.index[position])
+
+    paths = {}
+    for source, shock in zip(sources, shocks):
+        for depth in range(1, max_depth + 1):
+            for chain in itertools.product(endo, repeat=depth):
+                nodes = (source,) + chain
+                value = shock * np.prod(values[nodes[:-1], nodes[1:]]) * weights.iloc[chain[-1]]
+                paths[" -> ".join(map(label, nodes))] = value
+    return paths
+
+
+def _top(paths: dict[str, float], k: int) -> list[tuple[str, float]]:
+    return sorted(paths.items(), key=lambda item: -item[1])[:k]
+
+
+def test_every_path_is_found_when_top_k_covers_the_tree(system):
+    A, shocks, weights = system
+    paths = _brute_force(A, shocks, weights, max_depth=2)
+
+    result = structural_path_analysis(A, shocks, weights=weights, max_depth=2, top_k=len(paths), relative_threshold=0.0)
+
+    assert list(result["Path"]) == [path for path, _ in _top(paths, len(paths))]
+    np.testing.assert_allclose(result["Value"], [value for _, value in _top(paths, len(paths))], rtol=1e-12)
+
+
+def test_top_paths_match_brute_force(system, capsys):
+    A, shocks, weights = system
+    max_depth, top_k = 5, 15
+    paths = _brute_force(A, shocks, weights, max_depth)
+    expected = _top(paths, top_k)
+
+    # Far fewer expansions than partial paths in the tree: only the K-th best bound ends the search
+    max_expansions = len(paths) // 20
+    result = structural_path_analysis(
+        A, shocks, weights=weights, max_depth=max_depth, top_k=top_k, relative_threshold=0.0,
+        max_expansions=max_expansions,
+    )
+
+    assert "stopped after" not in capsys.readouterr().out
+    assert list(result["Path"]) == [path for path, _ in expected]
+    np.testing.assert_allclose(result["Value"], [value for _, value in expected], rtol=1e-12)
+    assert list(result["Depth"]) == [path.count("->") for path, _ in expected]
+
+    # Exact total of all paths of any length: w' (I - A_EE')^-1 A_XE' s
+    endo = ~A.index.isin(shocks.index)
+    A_EE, A_XE = A.loc[endo, endo].to_numpy(), A.loc[shocks.index, endo].to_numpy()
+    total = weights[endo].to_numpy() @ np.linalg.solve(np.eye(endo.sum()) - A_EE.T, A_XE.T @ shocks.to_numpy())
+    assert result.attrs["total"] == pytest.approx(total, rel=1e-12)
+    np.testing.assert_allclose(result["Share"], result["Value"] / total, rtol=1e-12)